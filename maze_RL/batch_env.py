@@ -0,0 +1,109 @@
+import numpy as np
+
+from maze_env import NUM_ACTIONS
+
+
+class BatchMazeEnv:
+    """N parallel episodes on one MazeEnv, stepped in lockstep as NumPy arrays"""
+
+    def __init__(self, env, num_envs, max_steps):
+        if max_steps < 1:
+            # Every step() advances each active episode, so an episode can't end after zero steps
+            raise ValueError(f"max_steps must be at least 1, got {max_steps}")
+        self.env = env
+        self.num_envs = num_envs
+        self.max_steps = max_steps
+
+        # Per-episode state
+        self.states = np.full(num_envs, env.start_state, dtype=np.int64)
+        self.steps = np.zeros(num_envs, dtype=np.int64)
+        self.episode_reward = np.zeros(num_envs, dtype=np.float64)
+        self.hit_trap = np.zeros(num_envs, dtype=bool)
+        # Slots that are running an episode (cleared once the episode budget is used up)
+        self.active = np.ones(num_envs, dtype=bool)
+
+    def reset(self, mask):
+        """Restart the episodes selected by a boolean mask"""
+        self.states[mask] = self.env.start_state
+        self.steps[mask] = 0
+        self.episode_reward[mask] = 0
+        self.hit_trap[mask] = False
+
+    def step(self, actions):
+        """Advance every active episode by one action
+
+        Returns (idx, states, next_states, rewards, reached_treasure, finished), where idx holds
+        the indices of the active slots and the other arrays are aligned with it; finished covers
+        both reaching the treasure and running out of steps.
+        """
+        idx = np.flatnonzero(self.active)
+        states = self.states[idx]
+        next_states = self.env.next_state[states, actions[idx]]
+        rewards = self.env.reward[next_states]
+        reached = next_states == self.env.treasure_pos
+
+        self.states[idx] = next_states
+        self.steps[idx] += 1
+        self.episode_reward[idx] += rewards
+        self.hit_trap[idx] |= self.env.is_trap[next_states]
+
+        finished = reached | (self.steps[idx] >= self.max_steps)
+        return idx, states, next_states, rewards, reached, finished
+
+
+def train_batch(env, Q, episodes, num_envs, alpha, gamma, epsilon, max_steps, rng=None):
+    """Q-learning over a BatchMazeEnv sharing one Q-table
+
+    Updates from agents that hit the same (state, action) pair in the same step are not
+    accumulated; the last write wins, as with any lock-free shared table.
+    Returns the same statistics start_training collects, in episode completion order.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    num_envs = max(1, min(num_envs, episodes))
+    batch = BatchMazeEnv(env, num_envs, max_steps)
+
+    episode_rewards = np.empty(episodes, dtype=np.float64)
+    episode_steps = np.empty(episodes, dtype=np.int64)
+    successful_episodes = 0
+    trap_hits = 0
+    started = num_envs
+    completed = 0
+
+    actions = np.zeros(num_envs, dtype=np.int64)
+    while completed < episodes:
+        # Epsilon-greedy action selection for the whole batch
+        explore = rng.random(num_envs) < epsilon
+        actions[:] = np.argmax(Q[batch.states], axis=1)
+        actions[explore] = rng.integers(NUM_ACTIONS, size=int(explore.sum()))
+
+        idx, states, next_states, rewards, reached, finished = batch.step(actions)
+
+        # Q-learning update
+        a = actions[idx]
+        next_max = Q[next_states].max(axis=1)
+        Q[states, a] = (1 - alpha) * Q[states, a] + alpha * (rewards + gamma * next_max)
+
+        if finished.any():
+            done_idx = idx[finished]
+            n = len(done_idx)
+            episode_rewards[completed:completed + n] = batch.episode_reward[done_idx]
+            episode_steps[completed:completed + n] = batch.steps[done_idx]
+            successful_episodes += int(reached[finished].sum())
+            trap_hits += int(batch.hit_trap[done_idx].sum())
+            completed += n
+
+            # Auto-reset finished slots while the episode budget lasts
+            restart = done_idx[:max(0, episodes - started)]
+            started += len(restart)
+            batch.active[done_idx[len(restart):]] = False
+            mask = np.zeros(num_envs, dtype=bool)
+            mask[restart] = True
+            batch.reset(mask)
+
+    return {
+        'episode_rewards': episode_rewards,
+        'episode_steps': episode_steps,
+        'successful_episodes': successful_episodes,
+        'trap_hits': trap_hits,
+    }
@@ -0,0 +1,71 @@
+"""Episodes/sec of the batched trainer against the one-episode-at-a-time loop
+
+    python maze_RL/bench_batch.py [--episodes 2000] [--num-envs 1024]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from batch_env import train_batch
+from maze_env import NUM_ACTIONS, MazeEnv
+
+
+def make_env(grid_size, trap_density, rng):
+    num_states = grid_size * grid_size
+    num_traps = int((num_states - 2) * trap_density)
+    trap_pos = rng.choice(np.arange(1, num_states - 1), size=num_traps, replace=False)
+    return MazeEnv(grid_size, [(int(pos), -10) for pos in trap_pos], num_states - 1, 10)
+
+
+def train_sequential(env, Q, episodes, alpha, gamma, epsilon, max_steps):
+    """The start_training loop, one episode at a time"""
+    for _ in range(episodes):
+        state = env.start_state
+        done = False
+        steps = 0
+        while not done and steps < max_steps:
+            if np.random.uniform(0, 1) < epsilon:
+                action = np.random.randint(NUM_ACTIONS)
+            else:
+                action = np.argmax(Q[state])
+            next_state = env.next_state[state, action]
+            reward = env.reward[next_state]
+            done = (next_state == env.treasure_pos)
+            old_value = Q[state, action]
+            next_max = np.max(Q[next_state])
+            Q[state, action] = (1 - alpha) * old_value + alpha * (reward + gamma * next_max)
+            state = next_state
+            steps += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--grid-sizes', type=int, nargs='+', default=[4, 16, 64])
+    parser.add_argument('--episodes', type=int, default=2000)
+    parser.add_argument('--num-envs', type=int, default=1024)
+    parser.add_argument('--trap-density', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'grid':>6} {'max_steps':>9} {'loop ep/s':>12} {'batch ep/s':>12} {'speedup':>8}")
+    for grid_size in args.grid_sizes:
+        rng = np.random.default_rng(args.seed)
+        env = make_env(grid_size, args.trap_density, rng)
+        max_steps = 4 * grid_size
+        q_shape = (env.num_states, NUM_ACTIONS)
+
+        np.random.seed(args.seed)
+        start = time.perf_counter()
+        train_sequential(env, np.zeros(q_shape), args.episodes, 0.1, 0.99, 0.1, max_steps)
+        loop_rate = args.episodes / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        train_batch(env, np.zeros(q_shape), args.episodes, args.num_envs, 0.1, 0.99, 0.1, max_steps, rng)
+        batch_rate = args.episodes / (time.perf_counter() - start)
+
+        print(f"{grid_size:>6} {max_steps:>9} {loop_rate:>12.0f} {batch_rate:>12.0f} {batch_rate / loop_rate:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Single-agent episodes/sec of the compiled learning kernels against the interpreted loop
+
+    python maze_RL/bench_kernels.py [--episodes 2000] [--grid-sizes 4 16 64]
+
+The Q-learning row also checks that the kernel reproduces the interpreted loop's
+episode rewards and Q-table exactly for the same seed.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from bench_batch import make_env
+from maze_algorithms import ALGORITHMS, HAVE_NUMBA
+from maze_env import NUM_ACTIONS
+
+
+def train_loop(env, Q, episodes, alpha, gamma, epsilon, max_steps, rng):
+    """The per-step interpreted Q-learning loop the kernels replace; returns episode rewards"""
+    episode_rewards = []
+    for _ in range(episodes):
+        state = env.start_state
+        done = False
+        episode_reward = 0
+        steps = 0
+        while not done and steps < max_steps:
+            if rng.random() < epsilon:
+                action = rng.integers(NUM_ACTIONS)
+            else:
+                action = np.argmax(Q[state])
+            next_state = env.next_state[state, action]
+            reward = env.reward[next_state]
+            done = (next_state == env.treasure_pos)
+            old_value = Q[state, action]
+            next_max = np.max(Q[next_state])
+            Q[state, action] = (1 - alpha) * old_value + alpha * (reward + gamma * next_max)
+            episode_reward += reward
+            state = next_state
+            steps += 1
+        episode_rewards.append(episode_reward)
+    return np.array(episode_rewards)
+
+
+def run_kernel(kernel, env, Q, episodes, alpha, gamma, epsilon, lam, max_steps, rng):
+    rewards = np.empty(episodes)
+    steps = np.empty(episodes, dtype=np.int64)
+    flags = np.empty(episodes, dtype=bool), np.empty(episodes, dtype=bool)
+    kernel(rng, Q, Q.copy(), env.next_state, env.reward, env.is_trap, env.start_state, env.treasure_pos,
+           alpha, gamma, epsilon, lam, max_steps, rewards, steps, *flags,
+           np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool), False)
+    return rewards
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--grid-sizes', type=int, nargs='+', default=[4, 16, 64])
+    parser.add_argument('--episodes', type=int, default=2000)
+    parser.add_argument('--trap-density', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    alpha, gamma, epsilon, lam = 0.1, 0.99, 0.1, 0.9
+
+    print(f"Numba: {'yes' if HAVE_NUMBA else 'no (interpreted fallback)'}")
+    print(f"{'grid':>6} {'algorithm':>15} {'ep/s':>12} {'speedup':>8} {'matches loop':>12}")
+    for grid_size in args.grid_sizes:
+        env = make_env(grid_size, args.trap_density, np.random.default_rng(args.seed))
+        max_steps = 4 * grid_size
+        q_shape = (env.num_states, NUM_ACTIONS)
+
+        loop_Q = np.zeros(q_shape)
+        start = time.perf_counter()
+        loop_rewards = train_loop(env, loop_Q, args.episodes, alpha, gamma, epsilon, max_steps,
+                                  np.random.default_rng(args.seed))
+        loop_rate = args.episodes / (time.perf_counter() - start)
+        print(f"{grid_size:>6} {'loop':>15} {loop_rate:>12.0f} {'1.0x':>8} {'':>12}")
+
+        for name, kernel in ALGORITHMS.items():
+            # Compile outside the timed region
+            run_kernel(kernel, env, np.zeros(q_shape), 0, alpha, gamma, epsilon, lam, max_steps,
+                       np.random.default_rng(args.seed))
+            Q = np.zeros(q_shape)
+            start = time.perf_counter()
+            rewards = run_kernel(kernel, env, Q, args.episodes, alpha, gamma, epsilon, lam, max_steps,
+                                 np.random.default_rng(args.seed))
+            rate = args.episodes / (time.perf_counter() - start)
+            matches = ''
+            if name == 'q_learning':
+                matches = 'yes' if np.array_equal(rewards, loop_rewards) and np.array_equal(Q, loop_Q) else 'NO'
+            print(f"{grid_size:>6} {name:>15} {rate:>12.0f} {rate / loop_rate:>7.1f}x {matches:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Episodes (and real steps) to convergence: Q-learning against Dyna-Q and prioritized sweeping
+
+    python maze_RL/bench_planning.py [--grid-sizes 16 64] [--seeds 0 1 2]
+
+A run has converged at the first episode after which the greedy policy's regret at the
+start state (against value iteration) stays below --tol for --patience episodes.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from maze_algorithms import q_learning
+from maze_engine import TrainingConfig, build_env, make_layout
+from maze_env import NUM_ACTIONS
+from maze_planning import PlanningModel, dyna_q, prioritized_sweeping
+from maze_solvers import regret, value_iteration
+
+CONTENDERS = {
+    'q_learning': (q_learning, None),
+    'dyna_q': (dyna_q, False),
+    'prioritized_sweeping': (prioritized_sweeping, True),
+}
+
+
+def episodes_to_convergence(kernel, prioritized, env, config, V_star, max_episodes, tol, patience, rng):
+    """Return (episodes, real steps, planning backups) at convergence; episodes is None if it never converged"""
+    Q = np.zeros((env.num_states, NUM_ACTIONS))
+    extra_args = ()
+    model = None
+    if prioritized is not None:
+        model = PlanningModel(env.num_states, prioritized)
+        extra_args = model.kernel_args(config.planning_steps, config.priority_threshold)
+    rewards = np.empty(1)
+    steps = np.empty(1, dtype=np.int64)
+    succeeded, trapped = np.empty(1, dtype=bool), np.empty(1, dtype=bool)
+    no_tracking = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool), False
+
+    real_steps = 0
+    converged_at = converged_steps = None
+    for episode in range(1, max_episodes + 1):
+        kernel(rng, Q, Q, env.next_state, env.reward, env.is_trap, env.start_state, env.treasure_pos,
+               config.alpha, config.gamma, config.epsilon, config.lam, config.max_steps,
+               rewards, steps, succeeded, trapped, *no_tracking, *extra_args)
+        real_steps += int(steps[0])
+        if regret(env, Q, V_star, config.gamma) <= tol:
+            if converged_at is None:
+                converged_at, converged_steps = episode, real_steps
+            elif episode - converged_at >= patience:
+                break
+        else:
+            converged_at = None
+    backups = model.planning_backups if model is not None else 0
+    return converged_at, converged_steps, backups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--grid-sizes', type=int, nargs='+', default=[16, 64])
+    parser.add_argument('--trap-density', type=float, default=0.1)
+    parser.add_argument('--seeds', type=int, nargs='+', default=[0, 1, 2])
+    parser.add_argument('--alpha', type=float, default=0.5)
+    parser.add_argument('--planning-steps', type=int, default=TrainingConfig.planning_steps)
+    parser.add_argument('--max-episodes', type=int, default=20000)
+    parser.add_argument('--tol', type=float, default=1e-6)
+    parser.add_argument('--patience', type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'grid':>5} {'seed':>4} {'algorithm':>21} {'episodes':>9} {'real steps':>11} "
+          f"{'backups':>10} {'seconds':>8}")
+    for grid_size in args.grid_sizes:
+        for seed in args.seeds:
+            config = TrainingConfig(grid_size=grid_size, num_traps=int(args.trap_density * (grid_size ** 2 - 2)),
+                                    alpha=args.alpha, max_steps=grid_size * grid_size,
+                                    planning_steps=args.planning_steps, seed=seed)
+            env = build_env(config, make_layout(config))
+            V_star = value_iteration(env, config.gamma).V
+            for name, (kernel, prioritized) in CONTENDERS.items():
+                start = time.perf_counter()
+                episodes, real_steps, backups = episodes_to_convergence(
+                    kernel, prioritized, env, config, V_star, args.max_episodes, args.tol, args.patience,
+                    np.random.default_rng(seed))
+                elapsed = time.perf_counter() - start
+                if episodes is None:
+                    print(f"{grid_size:>5} {seed:>4} {name:>21} {'>' + str(args.max_episodes):>9} {'-':>11} "
+                          f"{backups:>10} {elapsed:>8.2f}")
+                else:
+                    print(f"{grid_size:>5} {seed:>4} {name:>21} {episodes:>9} {real_steps:>11} "
+                          f"{backups:>10} {elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
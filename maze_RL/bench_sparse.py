@@ -0,0 +1,46 @@
+"""Memory and episodes/sec of the sparse Q-table + implicit maze against the dense arrays
+
+    python maze_RL/bench_sparse.py [--grid-sizes 64 512 2048 100000] [--max-dense-states 5000000]
+
+Grids above --max-dense-states are only run sparse (the dense tables wouldn't fit).
+"""
+import argparse
+
+from maze_engine import TrainingConfig, train
+
+
+def env_nbytes(env):
+    if hasattr(env, 'nbytes'):
+        return env.nbytes
+    return env.next_state.nbytes + env.reward.nbytes + env.is_trap.nbytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--grid-sizes', type=int, nargs='+', default=[64, 512, 2048, 100000])
+    parser.add_argument('--trap-density', type=float, default=1e-4)
+    parser.add_argument('--episodes', type=int, default=100000)
+    parser.add_argument('--max-steps', type=int, default=64)
+    parser.add_argument('--max-dense-states', type=int, default=5_000_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'grid':>7} {'q_table':>7} {'Q MiB':>10} {'env MiB':>10} {'rows':>9} {'ep/s':>10}")
+    for grid_size in args.grid_sizes:
+        for q_table in ('dense', 'sparse'):
+            if q_table == 'dense' and grid_size * grid_size > args.max_dense_states:
+                print(f"{grid_size:>7} {q_table:>7} {grid_size * grid_size * 32 / 2 ** 20:>10.1f} "
+                      f"{grid_size * grid_size * 41 / 2 ** 20:>10.1f} {'(skipped)':>9} {'-':>10}")
+                continue
+            config = TrainingConfig(grid_size=grid_size, num_traps=int(args.trap_density * grid_size ** 2),
+                                    episodes=args.episodes, max_steps=args.max_steps, seed=args.seed,
+                                    q_table=q_table)
+            result = train(config)
+            rows = len(result.Q) if q_table == 'sparse' else grid_size * grid_size
+            rate = result.episodes / result.training_time
+            print(f"{grid_size:>7} {q_table:>7} {result.Q.nbytes / 2 ** 20:>10.2f} "
+                  f"{env_nbytes(result.env) / 2 ** 20:>10.2f} {rows:>9} {rate:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""Reproducible benchmarks for the training and rendering hot paths, runnable headless
+
+    python maze_RL/benchmark.py --output bench.json
+    python maze_RL/benchmark.py --compare bench.json   # Flag regressions against a stored run
+
+Cases (each with fixed seeds, warmup runs and repeated trials reported as median/p95):
+
+    train/...         train() episodes/sec and steps/sec per grid size and trap density
+    layout/...        initialize_environment's layout generation and env compilation
+    optimal_path/...  MazeRL.get_optimal_path on a trained Q-table (cached policy index)
+    policy_index/...  Rebuilding that index, and routes from every state in one batch query
+    draw/...          MazeRL.show_initial_state (cold maze raster) and show_results (cached
+                      maze + path), drawn on a stand-in canvas instead of a display
+
+Drawing goes through the real MazeRenderer, including PPM encoding; only Tk's own image
+decoding and compositing are left out.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+from maze_engine import TrainingConfig, make_layout, train
+from maze_RL_PRO import VIEW_MODES, MazeRL
+from maze_renderer import CANVAS_SIZE, MazeRenderer
+
+try:
+    import numba
+    NUMBA_VERSION = numba.__version__
+except ImportError:
+    NUMBA_VERSION = None
+
+MIN_TRIAL_SECONDS = 0.02
+
+
+class HeadlessCanvas:
+    """Stand-in for tk.Canvas that only keeps track of item IDs"""
+
+    def __init__(self):
+        self.items = {}
+        self._next_id = 1
+
+    def _create(self, kind, *args, **kwargs):
+        item = self._next_id
+        self._next_id += 1
+        self.items[item] = (kind, kwargs.get('tags'))
+        return item
+
+    def create_image(self, *args, **kwargs):
+        return self._create('image', *args, **kwargs)
+
+    def create_line(self, *args, **kwargs):
+        return self._create('line', *args, **kwargs)
+
+    def create_oval(self, *args, **kwargs):
+        return self._create('oval', *args, **kwargs)
+
+    def delete(self, tag):
+        if tag == 'all':
+            self.items.clear()
+        else:
+            self.items = {item: value for item, value in self.items.items() if item != tag and value[1] != tag}
+
+    def coords(self, item, *args):
+        pass
+
+    def itemconfig(self, item, **kwargs):
+        pass
+
+    def tag_raise(self, tag):
+        pass
+
+
+class HeadlessPhotoImage:
+    """Stand-in for tk.PhotoImage; holds the encoded data so the encoding isn't optimised away"""
+
+    def __init__(self, data=None, format=None):
+        self.data = data
+
+
+class _Value:
+    """Stand-in for a Tk variable"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+class HeadlessMazeRL(MazeRL):
+    """MazeRL with its widgets replaced by stand-ins, so the view code runs without a display"""
+
+    def __init__(self, view="Maze"):
+        self._view = view
+        super().__init__()
+
+    def setup_gui(self):
+        self.view_var = _Value(self._view)
+        self.arrows_var = _Value(True)
+        self.canvas = HeadlessCanvas()
+        self.renderer = MazeRenderer(self.canvas, CANVAS_SIZE, photo_image=HeadlessPhotoImage)
+
+
+def timed_trials(run, trials, warmup, setup=None):
+    """Seconds per call of run over warmup + trials trials, the warmup ones dropped
+
+    Calls too fast to time singly are repeated within a trial until it lasts MIN_TRIAL_SECONDS.
+    With setup, each call is preceded by an untimed setup() and timed on its own.
+    """
+    loops = 1
+    if setup is None:
+        start = time.perf_counter()
+        run()
+        loops = max(1, int(MIN_TRIAL_SECONDS / max(time.perf_counter() - start, 1e-9)))
+    durations = []
+    for trial in range(warmup + trials):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        elapsed = (time.perf_counter() - start) / loops
+        if trial >= warmup:
+            durations.append(elapsed)
+    return durations
+
+
+def summarize(durations, **extra):
+    durations = np.asarray(durations)
+    return {'unit': 's', 'median': float(np.median(durations)), 'p95': float(np.percentile(durations, 95)),
+            'trials': durations.tolist(), **extra}
+
+
+def bench_training(grid_size, density, args):
+    config = TrainingConfig(grid_size=grid_size, num_traps=int(density * (grid_size * grid_size - 2)),
+                            episodes=args.episodes, max_steps=4 * grid_size, seed=args.seed,
+                            episode_history=False)
+    layout = make_layout(config)
+    results = []
+
+    def run():
+        results.append(train(config, layout=layout))
+
+    durations = timed_trials(run, args.trials, args.warmup)
+    result = results[-1]
+    steps = result.metrics.steps.mean * result.episodes
+    median = float(np.median(durations))
+    return summarize(durations, episodes_per_sec=result.episodes / median, steps_per_sec=steps / median), result
+
+
+def bench_layout(grid_size, density, args):
+    """The work initialize_environment does: generate the layout and compile its tables"""
+    app = HeadlessMazeRL()
+    config = TrainingConfig(grid_size=grid_size, num_traps=int(density * (grid_size * grid_size - 2)),
+                            seed=args.seed)
+
+    def run():
+        app.apply_config(config)
+        app.set_layout(make_layout(config))
+
+    return summarize(timed_trials(run, args.trials, args.warmup))
+
+
+def bench_views(grid_size, result, args):
+    """get_optimal_path, show_initial_state and show_results on a trained Q-table"""
+    app = HeadlessMazeRL(view=args.view)
+    app.apply_config(TrainingConfig(grid_size=grid_size))
+    app.set_layout(result.layout)
+    app.Q = result.Q
+
+    cases = {f'optimal_path/grid={grid_size}': summarize(
+        timed_trials(app.get_optimal_path, args.trials, args.warmup))}
+
+    def invalidate():
+        app.Q = app.Q
+
+    cases[f'policy_index/build/grid={grid_size}'] = summarize(
+        timed_trials(app.policy_index, args.trials, args.warmup, setup=invalidate))
+    index = app.policy_index()
+    every_state = np.arange(app.NUM_STATES)
+    cases[f'policy_index/all_paths/grid={grid_size}'] = summarize(
+        timed_trials(lambda: index.paths(every_state), args.trials, args.warmup))
+    # A fresh env object makes draw_maze rasterise again, as after Initialize
+    cases[f'draw/show_initial_state/grid={grid_size}'] = summarize(
+        timed_trials(app.show_initial_state, args.trials, args.warmup, setup=app.compile_environment))
+    app.show_initial_state()
+    cases[f'draw/show_results/grid={grid_size}'] = summarize(
+        timed_trials(app.show_results, args.trials, args.warmup))
+    return cases
+
+
+def run_suite(args):
+    cases = {}
+    for grid_size in args.grid_sizes:
+        for density in args.trap_densities:
+            tag = f'grid={grid_size}/density={density}'
+            cases[f'train/q_learning/{tag}'], result = bench_training(grid_size, density, args)
+            cases[f'layout/{tag}'] = bench_layout(grid_size, density, args)
+        cases.update(bench_views(grid_size, result, args))
+    return {
+        'meta': {
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'numba': NUMBA_VERSION,
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'args': {name: value for name, value in vars(args).items() if name not in ('output', 'compare')},
+        },
+        'results': cases,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Print median ratios against the baseline; returns the names of regressed cases
+
+    A case regresses when its median is more than threshold slower than the baseline median
+    and also slower than the baseline p95, so run-to-run noise on tiny cases isn't flagged.
+    """
+    regressions = []
+    print(f"{'case':<50} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, case in current['results'].items():
+        if name not in baseline['results']:
+            print(f"{name:<50} {'-':>10} {case['median']:>10.5f} {'new':>7}")
+            continue
+        base = baseline['results'][name]
+        ratio = case['median'] / base['median'] if base['median'] > 0 else float('inf')
+        flag = ''
+        if ratio > 1 + threshold and case['median'] > base['p95']:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:<50} {base['median']:>10.5f} {case['median']:>10.5f} {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--grid-sizes', type=int, nargs='+', default=[8, 32, 128])
+    parser.add_argument('--trap-densities', type=float, nargs='+', default=[0.05, 0.2])
+    parser.add_argument('--episodes', type=int, default=2000)
+    parser.add_argument('--trials', type=int, default=7)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--view', choices=list(VIEW_MODES), default="Maze", help="View mode for the draw cases")
+    parser.add_argument('--output', help="Write results to this JSON file")
+    parser.add_argument('--compare', help="Baseline JSON to compare medians against")
+    parser.add_argument('--threshold', type=float, default=0.20,
+                        help="Flag cases whose median is this fraction slower than the baseline")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+            return 1
+        return 0
+
+    print(f"{'case':<50} {'median':>10} {'p95':>10} {'ep/s':>10}")
+    for name, case in report['results'].items():
+        rate = f"{case['episodes_per_sec']:.0f}" if 'episodes_per_sec' in case else ''
+        print(f"{name:<50} {case['median']:>10.5f} {case['p95']:>10.5f} {rate:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,27 +15,22 @@ EPISODES = 1000  # 训练轮数
 # 初始化Q表 (状态 x 动作)
 Q = np.zeros((NUM_STATES, NUM_ACTIONS))
 
-# 定义奖励函数
-def get_reward(state):
-    if state == 15:  # 宝藏位置（4x4网格的右下角）
-        return 10
-    elif state == 5:  # 陷阱位置
-        return -10
-    else:
-        return -1
+# 奖励表：进入每个状态获得的奖励
+TREASURE = 15  # 宝藏位置（4x4网格的右下角）
+TRAP = 5  # 陷阱位置
+REWARD = np.full(NUM_STATES, -1.0)
+REWARD[TREASURE] = 10
+REWARD[TRAP] = -10
 
-# 状态转移函数
-def move(state, action):
-    x, y = state // GRID_SIZE, state % GRID_SIZE
-    if action == 'up' and x > 0:
-        x -= 1
-    elif action == 'down' and x < GRID_SIZE-1:
-        x += 1
-    elif action == 'left' and y > 0:
-        y -= 1
-    elif action == 'right' and y < GRID_SIZE-1:
-        y += 1
-    return x * GRID_SIZE + y
+# 状态转移表 NEXT_STATE[状态, 动作]，撞墙时停在原地
+_states = np.arange(NUM_STATES)
+_x, _y = _states // GRID_SIZE, _states % GRID_SIZE
+NEXT_STATE = np.stack([
+    np.where(_x > 0, _states - GRID_SIZE, _states),              # up
+    np.where(_x < GRID_SIZE - 1, _states + GRID_SIZE, _states),  # down
+    np.where(_y > 0, _states - 1, _states),                      # left
+    np.where(_y < GRID_SIZE - 1, _states + 1, _states),          # right
+], axis=1)
 
 # Q-learning 训练过程
 for episode in range(EPISODES):
@@ -43,20 +38,20 @@ for episode in range(EPISODES):
     done = False
     
     while not done:
-        # Epsilon-greedy 选择动作
+        # Epsilon-greedy 选择动作（动作用整数编号表示）
         if np.random.uniform(0, 1) < EPSILON:
-            action = np.random.choice(ACTIONS)
+            action = np.random.randint(NUM_ACTIONS)
         else:
-            action = ACTIONS[np.argmax(Q[state])]
+            action = np.argmax(Q[state])
         
         # 执行动作，获得下一个状态和奖励
-        next_state = move(state, action)
-        reward = get_reward(next_state)
-        done = (next_state == 15)  # 终止条件
+        next_state = NEXT_STATE[state, action]
+        reward = REWARD[next_state]
+        done = (next_state == TREASURE)  # 终止条件
         
         # 更新Q表
-        Q[state, ACTIONS.index(action)] += ALPHA * (
-            reward + GAMMA * np.max(Q[next_state]) - Q[state, ACTIONS.index(action)]
+        Q[state, action] += ALPHA * (
+            reward + GAMMA * np.max(Q[next_state]) - Q[state, action]
         )
         
         state = next_state
@@ -1,9 +1,27 @@
 import numpy as np
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
+import queue
+import threading
 import time
 from typing import List, Tuple
 
+from maze_engine import ALGORITHMS, ChangeTracker, TrainingConfig, TrainingControl, build_env, make_layout, train
+from maze_incremental import retrain
+from maze_layouts import LAYOUT_KINDS, load_layout, uniform_traps
+from maze_model_io import Q_DTYPES, load_model, save_model
+from maze_multiagent import MODES as AGENT_MODES, MultiAgentResult, train_agents
+from maze_policy import DEAD_END, GOAL, LOOP, PolicyIndex, indexable, walk_route
+from maze_profiling import NULL_TIMER, PhaseTimer, format_profile
+from maze_renderer import CANVAS_SIZE, HeatmapView, MazeRenderer
+
+PROGRESS_POLL_MS = 33  # GUI refresh period while training (~30 fps)
+PROGRESS_INTERVAL = 0.1  # Seconds between progress snapshots from the worker
+PROGRESS_QUEUE_SIZE = 8
+HEATMAP_REFRESH_INTERVAL = 0.2  # Seconds between live heatmap redraws
+VIEW_MODES = {"Maze": None, "State values": 'values', "Visit counts": 'visits'}
+AGENT_COLOURS = ['blue', 'magenta', 'dark green', 'orange red', 'purple', 'saddle brown', 'deep sky blue', 'olive drab']
+
 class MazeRL:
     def __init__(self):
         # Environment parameters
@@ -18,22 +36,40 @@ class MazeRL:
         self.EPSILON = 0.1  # Exploration rate
         self.EPISODES = 1000  # Training episodes
         
-        # Initialize Q-table (state x action)
+        # Initialize Q-table (state x action); assigning self.Q bumps q_version
+        self.q_version = 0
+        self._policy_cache = None  # (q_version, env, PolicyIndex)
         self.Q = np.zeros((self.NUM_STATES, self.NUM_ACTIONS))
+        # Every agent's table after a multi-agent run; used while its first entry is self.Q
+        self.agent_Qs = []
         
         # Initialize traps and treasure
-        self.traps = []  # Will be populated during training
-        self.treasure_pos = 15
+        self.layout = uniform_traps(self.GRID_SIZE, 0, -10, np.random.default_rng())  # Replaced on Initialize
+        self.treasure_pos = self.layout.treasure_pos
+        self.treasure_reward = 10
+        self.step_reward = -1  # Only a loaded model changes this
+        
+        # Compiled environment model (transition/reward/trap tables)
+        self.env = None
         
         # Training time
         self.training_time = 0
         
-        # Debug information
-        self.episode_rewards = []
-        self.episode_steps = []
-        self.successful_episodes = 0
-        self.trap_hits = 0
+        # Training statistics (maze_metrics.EpisodeMetrics of the last run)
+        self.metrics = None
         
+        # Background training state
+        self.training_thread = None
+        self.training_control = None
+        self.progress_queue = None
+        self.gui_timer = NULL_TIMER  # Times GUI refreshes while a profiled run trains
+        
+        # Live heatmap state
+        self.tracker = None
+        self.heatmap = None
+        self.last_heatmap_refresh = 0.0
+        
+        self.compile_environment()
         self.setup_gui()
     
     def setup_gui(self):
@@ -80,6 +116,12 @@ class MazeRL:
         self.gamma_var = tk.StringVar(value="0.99")
         ttk.Entry(control_frame, textvariable=self.gamma_var, width=10).grid(row=2, column=3, padx=5, pady=5)
         
+        # Update rule
+        ttk.Label(control_frame, text="Algorithm:").grid(row=1, column=4, padx=5, pady=5)
+        self.algorithm_var = tk.StringVar(value='q_learning')
+        ttk.Combobox(control_frame, textvariable=self.algorithm_var, values=list(ALGORITHMS),
+                     state='readonly', width=14).grid(row=2, column=4, padx=5, pady=5)
+        
         # Episodes and Max Steps Input
         ttk.Label(control_frame, text="Training Episodes:").grid(row=3, column=0, padx=5, pady=5)
         self.episodes_var = tk.StringVar(value="1000")
@@ -89,18 +131,78 @@ class MazeRL:
         self.max_steps_var = tk.StringVar(value="8")
         ttk.Entry(control_frame, textvariable=self.max_steps_var, width=10).grid(row=3, column=3, padx=5, pady=5)
         
+        # Seed Q from value iteration before training
+        self.warm_start_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(control_frame, text="Warm start (value iteration)",
+                        variable=self.warm_start_var).grid(row=3, column=4, padx=5, pady=5)
+        
+        # Keep the Q-table across maze edits, re-planning only the states the edit affects
+        self.incremental_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(control_frame, text="Incremental",
+                        variable=self.incremental_var).grid(row=7, column=4, padx=5, pady=5)
+        
         # Buttons
         ttk.Button(control_frame, text="Initialize", command=self.initialize_environment).grid(row=4, column=0, columnspan=2, pady=10)
-        ttk.Button(control_frame, text="Start Training", command=self.start_training).grid(row=4, column=2, columnspan=2, pady=10)
-        ttk.Button(control_frame, text="Show Results", command=self.show_results).grid(row=5, column=0, columnspan=4, pady=10)
+        self.train_button = ttk.Button(control_frame, text="Start Training", command=self.start_training)
+        self.train_button.grid(row=4, column=2, columnspan=2, pady=10)
+        ttk.Button(control_frame, text="Show Results", command=self.show_results).grid(row=5, column=0, columnspan=2, pady=10)
+        self.pause_button = ttk.Button(control_frame, text="Pause", command=self.toggle_pause, state='disabled')
+        self.pause_button.grid(row=5, column=2, pady=10)
+        self.cancel_button = ttk.Button(control_frame, text="Cancel", command=self.cancel_training, state='disabled')
+        self.cancel_button.grid(row=5, column=3, pady=10)
+        
+        # View mode: plain maze or a live heatmap of state values / visit counts
+        self.view_var = tk.StringVar(value="Maze")
+        view_box = ttk.Combobox(control_frame, textvariable=self.view_var, values=list(VIEW_MODES),
+                                state='readonly', width=14)
+        view_box.grid(row=4, column=4, padx=5, pady=5)
+        view_box.bind('<<ComboboxSelected>>', self.change_view)
+        self.arrows_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(control_frame, text="Greedy arrows", variable=self.arrows_var,
+                        command=self.change_view).grid(row=5, column=4, padx=5, pady=5)
+        
+        # Model persistence
+        ttk.Button(control_frame, text="Save Model", command=self.save_model).grid(row=6, column=0, pady=5)
+        self.model_dtype_var = tk.StringVar(value='float32')
+        ttk.Combobox(control_frame, textvariable=self.model_dtype_var, values=list(Q_DTYPES),
+                     state='readonly', width=8).grid(row=6, column=1, padx=5, pady=5)
+        ttk.Button(control_frame, text="Load Model", command=self.load_model).grid(row=6, column=2, columnspan=2, pady=5)
+        self.profile_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(control_frame, text="Profile phases",
+                        variable=self.profile_var).grid(row=6, column=4, padx=5, pady=5)
         
         # Status Label
         self.status_label = ttk.Label(control_frame, text="")
-        self.status_label.grid(row=6, column=0, columnspan=4, pady=5)
+        self.status_label.grid(row=7, column=0, columnspan=4, pady=5)
+        
+        # Layout Frame: generator, seed and custom layout files
+        layout_frame = ttk.LabelFrame(self.root, text="Maze Layout", padding="5")
+        layout_frame.pack(fill="x", padx=5, pady=5)
+        ttk.Label(layout_frame, text="Generator:").grid(row=0, column=0, padx=5, pady=5)
+        self.layout_var = tk.StringVar(value=LAYOUT_KINDS[0])
+        ttk.Combobox(layout_frame, textvariable=self.layout_var, values=list(LAYOUT_KINDS),
+                     state='readonly', width=10).grid(row=0, column=1, padx=5, pady=5)
+        ttk.Label(layout_frame, text="Seed:").grid(row=0, column=2, padx=5, pady=5)
+        self.seed_var = tk.StringVar(value="")
+        ttk.Entry(layout_frame, textvariable=self.seed_var, width=10).grid(row=0, column=3, padx=5, pady=5)
+        ttk.Button(layout_frame, text="Load Layout File", command=self.load_layout_file).grid(row=0, column=4, padx=5, pady=5)
+        
+        # Multi-agent training: agents > 1 train in worker processes on the same maze
+        agents_frame = ttk.LabelFrame(self.root, text="Multi-Agent", padding="5")
+        agents_frame.pack(fill="x", padx=5, pady=5)
+        ttk.Label(agents_frame, text="Agents:").grid(row=0, column=0, padx=5, pady=5)
+        self.agents_var = tk.StringVar(value="1")
+        ttk.Entry(agents_frame, textvariable=self.agents_var, width=10).grid(row=0, column=1, padx=5, pady=5)
+        ttk.Label(agents_frame, text="Q-tables:").grid(row=0, column=2, padx=5, pady=5)
+        self.agent_mode_var = tk.StringVar(value=AGENT_MODES[0])
+        ttk.Combobox(agents_frame, textvariable=self.agent_mode_var, values=list(AGENT_MODES),
+                     state='readonly', width=12).grid(row=0, column=3, padx=5, pady=5)
         
         # Canvas for maze visualization
-        self.canvas = tk.Canvas(self.root, width=400, height=400, bg='white')
+        self.canvas = tk.Canvas(self.root, width=CANVAS_SIZE, height=CANVAS_SIZE, bg='white')
         self.canvas.pack(pady=10)
+        self.canvas.bind('<Button-1>', self.show_route_from_click)
+        self.renderer = MazeRenderer(self.canvas, CANVAS_SIZE)
         
         # Initialize max traps label
         self.update_max_traps()
@@ -119,296 +221,423 @@ class MazeRL:
         except ValueError:
             pass
     
+    def read_config(self):
+        """Build a TrainingConfig from the control panel (raises ValueError on bad input)"""
+        return TrainingConfig(
+            grid_size=int(self.grid_size_var.get()),
+            num_traps=int(self.num_traps_var.get()),
+            treasure_reward=int(self.treasure_reward_var.get()),
+            trap_penalty=int(self.trap_penalty_var.get()),
+            step_reward=self.step_reward,
+            algorithm=self.algorithm_var.get(),
+            alpha=float(self.alpha_var.get()),
+            gamma=float(self.gamma_var.get()),
+            epsilon=self.EPSILON,
+            episodes=int(self.episodes_var.get()),
+            max_steps=int(self.max_steps_var.get()),
+            warm_start='value_iteration' if self.warm_start_var.get() else None,
+            layout=self.layout_var.get(),
+            seed=int(self.seed_var.get()) if self.seed_var.get().strip() else None,
+            episode_history=False,  # The view only shows running statistics
+            profile=self.profile_var.get(),
+        )
+    
+    def apply_config(self, config):
+        """Mirror a TrainingConfig onto the view's attributes"""
+        self.GRID_SIZE = config.grid_size
+        self.NUM_STATES = config.num_states
+        self.treasure_reward = config.treasure_reward
+        self.trap_penalty = config.trap_penalty
+        self.step_reward = config.step_reward
+        self.ALPHA = config.alpha
+        self.GAMMA = config.gamma
+        self.EPISODES = config.episodes
+    
     def initialize_environment(self):
+        if self.training_thread is not None:
+            messagebox.showwarning("Training Running", "Cancel or wait for the current training run first")
+            return
         try:
             # Update parameters from GUI
-            self.GRID_SIZE = int(self.grid_size_var.get())
-            self.NUM_STATES = self.GRID_SIZE * self.GRID_SIZE
-            self.treasure_pos = self.NUM_STATES - 1  # Always in bottom-right corner
-            num_traps = int(self.num_traps_var.get())
-            
-            # Validate number of traps
-            max_traps = self.NUM_STATES - 2  # Total cells minus start and treasure
-            if num_traps > max_traps:
-                messagebox.showerror("Error", f"Number of traps must be less than or equal to {max_traps}")
-                return
-            
-            self.treasure_reward = int(self.treasure_reward_var.get())
-            self.trap_penalty = int(self.trap_penalty_var.get())
-            
-            # Reset Q-table
-            self.Q = np.zeros((self.NUM_STATES, self.NUM_ACTIONS))
-            
-            # Generate random traps
-            self.traps = []
-            available_positions = list(range(self.NUM_STATES))
-            available_positions.remove(self.treasure_pos)  # Remove treasure position from possible trap positions
-            available_positions.remove(0)  # Remove start position from possible trap positions
-            
-            for _ in range(num_traps):
-                if not available_positions:
-                    break
-                trap_pos = np.random.choice(available_positions)
-                available_positions.remove(trap_pos)
-                self.traps.append((trap_pos, self.trap_penalty))
-            
-            # Show initial state
-            self.show_initial_state()
-            
-            self.status_label.config(text="Environment initialized successfully")
-            messagebox.showinfo("Success", "Environment initialized successfully")
-            
+            config = self.read_config()
         except ValueError as e:
             messagebox.showerror("Error", "Please enter valid numbers for all parameters")
+            return
+        
+        try:
+            layout = make_layout(config)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        
+        old_env, old_Q = self.env, self.Q
+        self.apply_config(config)
+        self.set_layout(layout)
+        
+        # Reset Q-table, or re-plan the part of it the new layout affects
+        incremental = self.carry_over_q(old_env, old_Q)
+        
+        if incremental is not None:
+            self.show_results()
+            self.status_label.config(text=incremental.summary())
+            return
+        # Show initial state
+        self.show_initial_state()
+        
+        self.status_label.config(text="Environment initialized successfully")
+        messagebox.showinfo("Success", "Environment initialized successfully")
     
     def show_initial_state(self):
-        self.canvas.delete("all")
-        
-        # Calculate cell size
-        cell_size = 400 / self.GRID_SIZE
-        
-        # Draw grid
-        for i in range(self.GRID_SIZE + 1):
-            self.canvas.create_line(i * cell_size, 0, i * cell_size, 400, fill='black')
-            self.canvas.create_line(0, i * cell_size, 400, i * cell_size, fill='black')
-        
-        # Draw traps
-        for trap_pos, _ in self.traps:
-            x, y = trap_pos // self.GRID_SIZE, trap_pos % self.GRID_SIZE
-            self.canvas.create_rectangle(
-                y * cell_size, x * cell_size,
-                (y + 1) * cell_size, (x + 1) * cell_size,
-                fill='black'
-            )
-        
-        # Draw treasure (simple golden circle)
-        treasure_x, treasure_y = self.treasure_pos // self.GRID_SIZE, self.treasure_pos % self.GRID_SIZE
-        center_x = (treasure_y + 0.5) * cell_size
-        center_y = (treasure_x + 0.5) * cell_size
-        radius = cell_size * 0.3
-        
-        # Draw the golden circle
-        self.canvas.create_oval(
-            center_x - radius, center_y - radius,
-            center_x + radius, center_y + radius,
-            fill='gold',
-            outline='orange'
-        )
+        self.renderer.draw_maze(self.env)
+        self.renderer.clear('path')
+        self.reset_heatmap()
+    
+    def change_view(self, event=None):
+        self.renderer.draw_maze(self.env)
+        self.reset_heatmap()
+    
+    def reset_heatmap(self):
+        """Rebuild the heatmap overlay for the current view mode, Q-table and layout"""
+        if self.heatmap is not None:
+            self.heatmap.clear()
+            self.heatmap = None
+        mode = VIEW_MODES.get(self.view_var.get())
+        if mode is None:
+            return
+        visits = self.tracker.visits if self.tracker is not None else np.zeros(self.NUM_STATES, dtype=np.int64)
+        self.heatmap = HeatmapView(self.renderer, mode, show_arrows=self.arrows_var.get())
+        self.heatmap.reset(self.env, self.Q, visits)
+        self.last_heatmap_refresh = time.time()
+    
+    def refresh_heatmap(self, force=False):
+        """Recolour only the cells whose Q-rows changed, at most every HEATMAP_REFRESH_INTERVAL"""
+        if self.heatmap is None or self.tracker is None:
+            return
+        now = time.time()
+        if not force and now - self.last_heatmap_refresh < HEATMAP_REFRESH_INTERVAL:
+            return
+        self.last_heatmap_refresh = now
+        self.heatmap.update(self.Q, self.tracker.visits, self.tracker.collect())
+    
+    def carry_over_q(self, old_env, old_Q):
+        """Set self.Q for the newly compiled self.env; returns the IncrementalResult if re-planned
+
+        With Incremental off (or nothing learned yet) Q restarts from zeros. Otherwise the
+        states old_env -> self.env affects are re-planned from old_Q (see maze_incremental);
+        its summary flags an old_Q too far from converged for the re-plan to be exact.
+        """
+        if not self.incremental_var.get() or old_env is None or not old_Q.any():
+            self.Q = np.zeros((self.NUM_STATES, self.NUM_ACTIONS))
+            return None
+        result = retrain(old_env, self.env, old_Q, self.GAMMA, compare=False)
+        self.Q = result.Q
+        return result
+    
+    def set_layout(self, layout):
+        """Adopt a MazeLayout and compile its tables"""
+        self.layout = layout
+        self.GRID_SIZE = layout.grid_size
+        self.NUM_STATES = layout.num_states
+        self.treasure_pos = layout.treasure_pos
+        self.compile_environment()
+    
+    def compile_environment(self):
+        """Build the transition/reward/trap tables for the current layout"""
+        self.env = build_env(TrainingConfig(treasure_reward=self.treasure_reward, step_reward=self.step_reward),
+                             self.layout)
+    
+    def load_layout_file(self):
+        if self.training_thread is not None:
+            messagebox.showwarning("Training Running", "Cancel or wait for the current training run first")
+            return
+        path = filedialog.askopenfilename(title="Load Layout",
+                                          filetypes=[("Layout text", "*.txt"), ("NumPy array", "*.npy"),
+                                                     ("All files", "*")])
+        if not path:
+            return
+        try:
+            layout = load_layout(path, int(self.trap_penalty_var.get()))
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Could not load layout: {e}")
+            return
+        
+        self.set_layout(layout)
+        self.Q = np.zeros((self.NUM_STATES, self.NUM_ACTIONS))
+        self.tracker = None
+        self.grid_size_var.set(str(layout.grid_size))
+        self.num_traps_var.set(str(len(layout.trap_pos)))
+        self.update_max_traps()
+        self.show_initial_state()
+        self.status_label.config(text=f"Layout loaded from {path}")
     
     def get_reward(self, state):
-        if state == self.treasure_pos:
-            return self.treasure_reward
-        for trap_pos, penalty in self.traps:
-            if state == trap_pos:
-                return penalty
-        return -1
+        return self.env.reward[state]
     
     def move(self, state, action):
-        x, y = state // self.GRID_SIZE, state % self.GRID_SIZE
-        new_x, new_y = x, y
-        
-        if action == 'up' and x > 0:
-            new_x = x - 1
-        elif action == 'down' and x < self.GRID_SIZE-1:
-            new_x = x + 1
-        elif action == 'left' and y > 0:
-            new_y = y - 1
-        elif action == 'right' and y < self.GRID_SIZE-1:
-            new_y = y + 1
-            
-        return new_x * self.GRID_SIZE + new_y
+        if isinstance(action, str):
+            action = self.ACTIONS.index(action)
+        return self.env.next_state[state, action]
     
     def start_training(self):
+        if self.training_thread is not None:
+            return
         try:
             # Update parameters from GUI
-            self.GRID_SIZE = int(self.grid_size_var.get())
-            self.NUM_STATES = self.GRID_SIZE * self.GRID_SIZE
-            self.EPISODES = int(self.episodes_var.get())
-            self.treasure_pos = self.NUM_STATES - 1  # Always in bottom-right corner
-            self.treasure_reward = int(self.treasure_reward_var.get())
-            self.trap_penalty = int(self.trap_penalty_var.get())
-            self.ALPHA = float(self.alpha_var.get())
-            self.GAMMA = float(self.gamma_var.get())
-            max_steps = int(self.max_steps_var.get())
-            
-            # Reset Q-table and debug information
-            self.Q = np.zeros((self.NUM_STATES, self.NUM_ACTIONS))
-            self.episode_rewards = []
-            self.episode_steps = []
-            self.successful_episodes = 0
-            self.trap_hits = 0
-            
-            # Start training
-            start_time = time.time()
-            
-            for episode in range(self.EPISODES):
-                state = 0
-                done = False
-                episode_reward = 0
-                steps = 0
-                hit_trap = False
-                
-                while not done and steps < max_steps:  # Use user-defined max steps
-                    # Epsilon-greedy action selection
-                    if np.random.uniform(0, 1) < self.EPSILON:
-                        action = np.random.choice(self.ACTIONS)
-                    else:
-                        action = self.ACTIONS[np.argmax(self.Q[state])]
-                    
-                    # Take action and observe result
-                    next_state = self.move(state, action)
-                    reward = self.get_reward(next_state)
-                    done = (next_state == self.treasure_pos)
-                    
-                    # Check if hit trap
-                    if next_state in [trap[0] for trap in self.traps]:
-                        hit_trap = True
-                    
-                    # Q-learning update
-                    old_value = self.Q[state, self.ACTIONS.index(action)]
-                    next_max = np.max(self.Q[next_state])
-                    new_value = (1 - self.ALPHA) * old_value + self.ALPHA * (reward + self.GAMMA * next_max)
-                    self.Q[state, self.ACTIONS.index(action)] = new_value
-                    
-                    episode_reward += reward
-                    state = next_state
-                    steps += 1
-                
-                self.episode_rewards.append(episode_reward)
-                self.episode_steps.append(steps)
-                if done:
-                    self.successful_episodes += 1
-                if hit_trap:
-                    self.trap_hits += 1
-                
-                # Update status every 100 episodes
-                if (episode + 1) % 100 == 0:
-                    success_rate = (self.successful_episodes / (episode + 1)) * 100
-                    trap_rate = (self.trap_hits / (episode + 1)) * 100
-                    avg_reward = np.mean(self.episode_rewards[-100:])
-                    avg_steps = np.mean(self.episode_steps[-100:])
-                    self.status_label.config(text=f"Episode {episode + 1}/{self.EPISODES}\n"
-                                                f"Success Rate: {success_rate:.1f}%\n"
-                                                f"Trap Rate: {trap_rate:.1f}%\n"
-                                                f"Avg Reward: {avg_reward:.1f}\n"
-                                                f"Avg Steps: {avg_steps:.1f}")
-                    self.root.update()
-            
-            self.training_time = time.time() - start_time
-            final_success_rate = (self.successful_episodes / self.EPISODES) * 100
-            final_trap_rate = (self.trap_hits / self.EPISODES) * 100
-            final_avg_reward = np.mean(self.episode_rewards)
-            final_avg_steps = np.mean(self.episode_steps)
-            
-            status_message = f"Training completed in {self.training_time:.2f} seconds\n"
-            status_message += f"Final Success Rate: {final_success_rate:.1f}%\n"
-            status_message += f"Final Trap Rate: {final_trap_rate:.1f}%\n"
-            status_message += f"Final Average Reward: {final_avg_reward:.1f}\n"
-            status_message += f"Final Average Steps: {final_avg_steps:.1f}"
-            
-            self.status_label.config(text=status_message)
-            messagebox.showinfo("Training Complete", status_message)
-            
+            config = self.read_config()
+            agents = int(self.agents_var.get())
+            if agents < 1:
+                raise ValueError
         except ValueError as e:
             messagebox.showerror("Error", "Please enter valid numbers for all parameters")
+            return
+        
+        old_env, old_Q = self.env, self.Q
+        self.apply_config(config)
+        if self.layout.grid_size != config.grid_size:
+            # Grid size was edited without re-initializing; generate a matching layout
+            try:
+                self.set_layout(make_layout(config))
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+        else:
+            self.compile_environment()
+        incremental = self.carry_over_q(old_env, old_Q)
+        self.tracker = ChangeTracker(self.NUM_STATES)
+        self.renderer.draw_maze(self.env)
+        self.renderer.clear('path')
+        self.reset_heatmap()
+        
+        self.training_control = TrainingControl()
+        self.gui_timer = PhaseTimer() if config.profile else NULL_TIMER
+        self.progress_queue = queue.Queue(maxsize=PROGRESS_QUEUE_SIZE)
+        if agents > 1:
+            # Worker processes can't be paused or cancelled between blocks
+            self.training_thread = threading.Thread(
+                target=self.run_agents, args=(config, self.layout, agents, self.agent_mode_var.get()), daemon=True)
+        else:
+            self.training_thread = threading.Thread(
+                target=self.run_training, args=(config, self.layout), daemon=True)
+        
+        self.train_button.config(state='disabled')
+        if agents == 1:
+            self.pause_button.config(state='normal', text="Pause")
+            self.cancel_button.config(state='normal')
+        status = "Training started..." if agents == 1 else f"Training {agents} agents..."
+        if incremental is not None:
+            status = incremental.summary() + "\n" + status
+        self.status_label.config(text=status)
+        
+        self.training_thread.start()
+        self.root.after(PROGRESS_POLL_MS, self.poll_training)
     
-    def get_optimal_path(self):
-        """Get the optimal path from start to goal"""
-        path = []
-        current_state = 0  # Start state
-        visited = set()
-        
-        while current_state != self.treasure_pos and current_state not in visited:
-            visited.add(current_state)
-            path.append(current_state)
-            
-            # Get the best action for current state
-            best_action_idx = np.argmax(self.Q[current_state])
-            best_action = self.ACTIONS[best_action_idx]
-            
-            # Move to next state
-            next_state = self.move(current_state, best_action)
-            
-            # If we can't move or we're stuck, break
-            if next_state == current_state:
+    def run_training(self, config, layout):
+        """Worker thread body: train and hand the outcome to the GUI through the queue"""
+        try:
+            result = train(config, layout=layout, progress=self.queue_progress,
+                           progress_interval=PROGRESS_INTERVAL, control=self.training_control,
+                           Q=self.Q, tracker=self.tracker)
+            self.progress_queue.put(('done', result))
+        except Exception as e:
+            self.progress_queue.put(('error', e))
+    
+    def run_agents(self, config, layout, agents, mode):
+        """Worker thread body for a multi-agent run"""
+        try:
+            self.progress_queue.put(('done', train_agents(config, layout, agents=agents, mode=mode, Q=self.Q)))
+        except Exception as e:
+            self.progress_queue.put(('error', e))
+    
+    def queue_progress(self, progress):
+        """Progress callback on the worker thread; drops snapshots if the GUI falls behind"""
+        try:
+            self.progress_queue.put_nowait(('progress', progress))
+        except queue.Full:
+            pass
+    
+    def poll_training(self):
+        """Drain the progress queue on the Tk main thread"""
+        latest = None
+        while True:
+            try:
+                kind, payload = self.progress_queue.get_nowait()
+            except queue.Empty:
                 break
-                
-            current_state = next_state
+            if kind == 'progress':
+                latest = payload
+            else:
+                self.finish_training(kind, payload)
+                return
         
-        # Add the final state (treasure) to the path if we reached it
-        if current_state == self.treasure_pos:
-            path.append(current_state)
+        if latest is not None:
+            with self.gui_timer.phase('status'):
+                self.status_label.config(text=latest.status_text())
+        with self.gui_timer.phase('heatmap'):
+            self.refresh_heatmap()
+        self.root.after(PROGRESS_POLL_MS, self.poll_training)
+    
+    def finish_training(self, kind, payload):
+        self.training_thread.join()
+        self.training_thread = None
+        self.train_button.config(state='normal')
+        self.pause_button.config(state='disabled', text="Pause")
+        self.cancel_button.config(state='disabled')
+        
+        if kind == 'error':
+            self.status_label.config(text="Training failed")
+            messagebox.showerror("Error", str(payload))
+            return
+        
+        result = payload
+        if isinstance(result, MultiAgentResult):
+            self.Q = result.Qs[0]
+            self.agent_Qs = result.Qs
+            self.training_time = result.wall_time
+            self.metrics = None
+            self.reset_heatmap()
+            self.show_results()
+            status_message = result.summary()
+            self.status_label.config(text=status_message)
+            messagebox.showinfo("Training Complete", status_message)
+            return
+        
+        self.Q = result.Q
+        self.refresh_heatmap(force=True)
+        self.training_time = result.training_time
+        self.metrics = result.metrics
+        
+        status_message = result.summary()
+        if result.profile is not None:
+            result.profile['gui'] = self.gui_timer.summary()
+            status_message += "\n" + format_profile(result.profile, lines=3)
+        self.status_label.config(text=status_message)
+        messagebox.showinfo("Training Cancelled" if result.cancelled else "Training Complete", status_message)
+    
+    def toggle_pause(self):
+        if self.training_control is None or self.training_thread is None:
+            return
+        if self.training_control.paused:
+            self.training_control.resume()
+            self.pause_button.config(text="Pause")
+        else:
+            self.training_control.pause()
+            self.pause_button.config(text="Resume")
+    
+    def cancel_training(self):
+        if self.training_control is not None:
+            self.training_control.cancel()
+    
+    def save_model(self):
+        path = filedialog.asksaveasfilename(title="Save Model", defaultextension=".mazeq",
+                                            filetypes=[("Maze model", "*.mazeq"), ("All files", "*")])
+        if not path:
+            return
+        try:
+            save_model(path, self.Q, self.env, dtype=self.model_dtype_var.get())
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Could not save model: {e}")
+            return
+        self.status_label.config(text=f"Model saved to {path}")
+    
+    def load_model(self):
+        if self.training_thread is not None:
+            messagebox.showwarning("Training Running", "Cancel or wait for the current training run first")
+            return
+        path = filedialog.askopenfilename(title="Load Model",
+                                          filetypes=[("Maze model", "*.mazeq"), ("All files", "*")])
+        if not path:
+            return
+        try:
+            model = load_model(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Could not load model: {e}")
+            return
+        
+        # The Q-table stays memory-mapped; only rows that get read are paged in
+        self.Q = model.Q
+        self.treasure_reward = model.treasure_reward
+        self.step_reward = model.step_reward
+        self.set_layout(model.layout)
+        self.tracker = None
+        
+        self.grid_size_var.set(str(model.grid_size))
+        self.num_traps_var.set(str(len(model.trap_pos)))
+        self.treasure_reward_var.set(f"{model.treasure_reward:g}")
+        if len(model.trap_penalty):
+            self.trap_penalty_var.set(f"{model.trap_penalty[0]:g}")
+        self.update_max_traps()
         
-        return path
+        self.show_results()
+        self.status_label.config(text=f"Model loaded from {path}")
+    
+    @property
+    def Q(self):
+        return self._Q
+    
+    @Q.setter
+    def Q(self, Q):
+        self._Q = Q
+        self.q_version += 1  # Invalidates the cached policy index
+    
+    def policy_index(self):
+        """PolicyIndex of self.Q on self.env, rebuilt only after self.Q or the env changes
+        
+        While training runs, Q changes in place, so the index is rebuilt on every call.
+        """
+        if self.training_thread is not None:
+            return PolicyIndex(self.env, self.Q)
+        cache = self._policy_cache
+        if cache is None or cache[0] != self.q_version or cache[1] is not self.env:
+            self._policy_cache = (self.q_version, self.env, PolicyIndex(self.env, self.Q))
+        return self._policy_cache[2]
+    
+    def get_optimal_path(self, Q=None, start=None):
+        """Greedy path from start (default the layout's start state) to the goal, in Q (default self.Q)
+        
+        The path includes the treasure if reached and stops at a dead end or before a loop
+        would revisit a state. Tables too big for a PolicyIndex are walked step by step.
+        """
+        if start is None:
+            start = self.env.start_state
+        if not indexable(self.env, self.Q if Q is None else Q):
+            return walk_route(self.env, self.Q if Q is None else Q, start)[0]
+        index = self.policy_index() if Q is None else PolicyIndex(self.env, Q)
+        return index.path(start)
     
     def show_results(self):
-        self.canvas.delete("all")
-        
-        # Calculate cell size
-        cell_size = 400 / self.GRID_SIZE
-        
-        # Draw grid
-        for i in range(self.GRID_SIZE + 1):
-            self.canvas.create_line(i * cell_size, 0, i * cell_size, 400, fill='black')
-            self.canvas.create_line(0, i * cell_size, 400, i * cell_size, fill='black')
-        
-        # Draw traps
-        for trap_pos, _ in self.traps:
-            x, y = trap_pos // self.GRID_SIZE, trap_pos % self.GRID_SIZE
-            self.canvas.create_rectangle(
-                y * cell_size, x * cell_size,
-                (y + 1) * cell_size, (x + 1) * cell_size,
-                fill='black'
-            )
-        
-        # Draw treasure (simple golden circle)
-        treasure_x, treasure_y = self.treasure_pos // self.GRID_SIZE, self.treasure_pos % self.GRID_SIZE
-        center_x = (treasure_y + 0.5) * cell_size
-        center_y = (treasure_x + 0.5) * cell_size
-        radius = cell_size * 0.3
-        
-        # Draw the golden circle
-        self.canvas.create_oval(
-            center_x - radius, center_y - radius,
-            center_x + radius, center_y + radius,
-            fill='gold',
-            outline='orange'
-        )
-        
-        # Get and draw the optimal path
-        optimal_path = self.get_optimal_path()
-        for i in range(len(optimal_path) - 1):
-            current_state = optimal_path[i]
-            next_state = optimal_path[i + 1]
-            
-            # Calculate positions
-            current_x, current_y = current_state // self.GRID_SIZE, current_state % self.GRID_SIZE
-            next_x, next_y = next_state // self.GRID_SIZE, next_state % self.GRID_SIZE
-            
-            # Calculate centers
-            current_center_x = (current_y + 0.5) * cell_size
-            current_center_y = (current_x + 0.5) * cell_size
-            next_center_x = (next_y + 0.5) * cell_size
-            next_center_y = (next_x + 0.5) * cell_size
-            
-            # Draw arrow
-            arrow_length = cell_size * 0.3
-            if next_x < current_x:  # Up
-                self.canvas.create_line(current_center_x, current_center_y, 
-                                      current_center_x, current_center_y - arrow_length, 
-                                      arrow=tk.LAST, fill='blue', width=2)
-            elif next_x > current_x:  # Down
-                self.canvas.create_line(current_center_x, current_center_y, 
-                                      current_center_x, current_center_y + arrow_length, 
-                                      arrow=tk.LAST, fill='blue', width=2)
-            elif next_y < current_y:  # Left
-                self.canvas.create_line(current_center_x, current_center_y, 
-                                      current_center_x - arrow_length, current_center_y, 
-                                      arrow=tk.LAST, fill='blue', width=2)
-            else:  # Right
-                self.canvas.create_line(current_center_x, current_center_y, 
-                                      current_center_x + arrow_length, current_center_y, 
-                                      arrow=tk.LAST, fill='blue', width=2)
+        if self.renderer.draw_maze(self.env):
+            self.reset_heatmap()
+        
+        # Get and draw the optimal path, or every agent's path after a multi-agent run
+        if len(self.agent_Qs) > 1 and self.agent_Qs[0] is self.Q:
+            self.renderer.clear('path')
+            spacing = min(3.0, self.renderer.cell_size / (2 * len(self.agent_Qs)))
+            for agent, Q in enumerate(self.agent_Qs):
+                # Offset each agent's path slightly so overlapping paths stay visible
+                offset = (agent - (len(self.agent_Qs) - 1) / 2) * spacing
+                self.renderer.draw_path(self.get_optimal_path(Q), color=AGENT_COLOURS[agent % len(AGENT_COLOURS)],
+                                        clear=False, offset=offset)
+        else:
+            self.renderer.draw_path(self.get_optimal_path())
+    
+    def show_route_from_click(self, event):
+        """Draw the greedy route from the clicked cell"""
+        if self.env is None or self.renderer.env is None:
+            return
+        row = int(event.y // self.renderer.cell_size)
+        col = int(event.x // self.renderer.cell_size)
+        if not (0 <= row < self.GRID_SIZE and 0 <= col < self.GRID_SIZE):
+            return
+        start = row * self.GRID_SIZE + col
+        if indexable(self.env, self.Q):
+            index = self.policy_index()
+            route, outcome = index.path(start), index.outcome[start]
+        else:
+            route, outcome = walk_route(self.env, self.Q, start)
+        self.renderer.draw_path(route)
+        outcome = {GOAL: "reaches the treasure", DEAD_END: "ends at a dead end",
+                   LOOP: "runs into a loop"}[outcome]
+        self.status_label.config(text=f"Route from ({row}, {col}): {len(route)} states, {outcome}")
     
     def run(self):
         self.root.mainloop()
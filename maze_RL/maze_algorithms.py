@@ -0,0 +1,404 @@
+"""Compiled tabular learning kernels: Q-learning, SARSA, Expected SARSA, Double Q and Q(λ)
+
+Each kernel runs a whole block of episodes on the integer MazeEnv tables without
+returning to the interpreter. With Numba installed they are compiled to machine code
+(cached on disk after the first run); without it the same functions run as plain
+Python/NumPy, which is slow but gives identical results.
+
+Randomness comes from the np.random.Generator passed in. Numba draws from the same
+bit generator as NumPy, so a seed produces the same episodes whether or not the kernel
+is compiled, and the same episodes as the interpreted Q-learning loop it replaces.
+
+All kernels share one signature so callers can swap them freely:
+
+    kernel(rng, Q, Q2, next_state, reward, is_trap, start_state, treasure_pos,
+           alpha, gamma, epsilon, lam, max_steps,
+           episode_rewards, episode_steps, succeeded, trapped, visits, dirty, track)
+
+The number of episodes is len(episode_rewards); the four per-episode output arrays are
+filled in. Q2 is the second table for Double Q-learning and is ignored by the others,
+lam is only used by Q(λ). When track is true, visits[state] counts updates and
+dirty[state] flags every Q-row written (see maze_engine.ChangeTracker).
+
+striped_q_learning takes one more argument, an array of spinlocks, for several
+processes updating one shared Q-table (see maze_multiagent).
+
+The '# Phase: <name>' comments split each step into action selection, the move, the
+reward and the Q update for the sampling profiler (see maze_profiling.line_phase).
+"""
+import numpy as np
+
+from maze_env import NUM_ACTIONS
+
+try:
+    from numba import njit
+    from numba.core import cgutils, types
+    from numba.extending import intrinsic
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit that leaves the function interpreted"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda function: function
+
+TRACE_CUTOFF = 1e-6  # Q(λ) drops eligibility traces that have decayed below this
+
+if HAVE_NUMBA:
+    @intrinsic
+    def compare_and_swap(typingctx, array, index, expected, value):
+        """Atomically set array[index] = value if it equals expected; returns the old value (acquire)"""
+        def codegen(context, builder, signature, args):
+            array_type = signature.args[0]
+            data, idx, old, new = args
+            pointer = cgutils.get_item_pointer(context, builder, array_type,
+                                               context.make_array(array_type)(context, builder, data), [idx])
+            return builder.extract_value(builder.cmpxchg(pointer, old, new, 'acquire', 'monotonic'), 0)
+        return types.int64(array, index, types.int64, types.int64), codegen
+
+    @intrinsic
+    def atomic_store(typingctx, array, index, value):
+        """array[index] = value with release ordering, publishing earlier writes first"""
+        def codegen(context, builder, signature, args):
+            array_type = signature.args[0]
+            data, idx, new = args
+            pointer = cgutils.get_item_pointer(context, builder, array_type,
+                                               context.make_array(array_type)(context, builder, data), [idx])
+            builder.store_atomic(new, pointer, 'release', 8)
+            return context.get_dummy_value()
+        return types.void(array, index, types.int64), codegen
+else:
+    def compare_and_swap(array, index, expected, value):
+        """Interpreted stand-in: only atomic within one process"""
+        old = array[index]
+        if old == expected:
+            array[index] = value
+        return old
+
+    def atomic_store(array, index, value):
+        array[index] = value
+
+
+@njit(cache=True)
+def epsilon_greedy(rng, values, epsilon):
+    """Random action with probability epsilon, else the first action with the highest value"""
+    if rng.random() < epsilon:
+        return rng.integers(0, NUM_ACTIONS)
+    return np.argmax(values)
+
+
+@njit(cache=True)
+def argmax_sum(first, second):
+    """np.argmax(first + second) without allocating the sum"""
+    best = 0
+    best_value = first[0] + second[0]
+    for action in range(1, NUM_ACTIONS):
+        value = first[action] + second[action]
+        if value > best_value:
+            best, best_value = action, value
+    return best
+
+
+@njit(cache=True)
+def q_learning(rng, Q, Q2, next_state, reward, is_trap, start_state, treasure_pos,
+               alpha, gamma, epsilon, lam, max_steps,
+               episode_rewards, episode_steps, succeeded, trapped, visits, dirty, track):
+    """Off-policy TD control bootstrapping from max_a Q(s', a)"""
+    for episode in range(episode_rewards.shape[0]):
+        state = start_state
+        done = False
+        total = 0.0
+        steps = 0
+        hit_trap = False
+        while not done and steps < max_steps:
+            # Phase: action selection
+            action = epsilon_greedy(rng, Q[state], epsilon)
+            # Phase: move
+            new_state = next_state[state, action]
+            # Phase: reward
+            r = reward[new_state]
+            done = new_state == treasure_pos
+            if is_trap[new_state]:
+                hit_trap = True
+
+            # Phase: Q update
+            Q[state, action] = (1 - alpha) * Q[state, action] + alpha * (r + gamma * np.max(Q[new_state]))
+            if track:
+                visits[state] += 1
+                dirty[state] = True
+
+            # Phase: other
+            total += r
+            state = new_state
+            steps += 1
+        episode_rewards[episode] = total
+        episode_steps[episode] = steps
+        succeeded[episode] = done
+        trapped[episode] = hit_trap
+
+
+@njit(cache=True)
+def sarsa(rng, Q, Q2, next_state, reward, is_trap, start_state, treasure_pos,
+          alpha, gamma, epsilon, lam, max_steps,
+          episode_rewards, episode_steps, succeeded, trapped, visits, dirty, track):
+    """On-policy TD control bootstrapping from the action actually taken next"""
+    for episode in range(episode_rewards.shape[0]):
+        state = start_state
+        action = epsilon_greedy(rng, Q[state], epsilon)  # Phase: action selection
+        done = False
+        total = 0.0
+        steps = 0
+        hit_trap = False
+        while not done and steps < max_steps:
+            # Phase: move
+            new_state = next_state[state, action]
+            # Phase: reward
+            r = reward[new_state]
+            done = new_state == treasure_pos
+            if is_trap[new_state]:
+                hit_trap = True
+
+            # Phase: Q update
+            target = r
+            new_action = action
+            if not done:
+                new_action = epsilon_greedy(rng, Q[new_state], epsilon)  # Phase: action selection
+                target += gamma * Q[new_state, new_action]
+            Q[state, action] += alpha * (target - Q[state, action])
+            if track:
+                visits[state] += 1
+                dirty[state] = True
+
+            # Phase: other
+            total += r
+            state = new_state
+            action = new_action
+            steps += 1
+        episode_rewards[episode] = total
+        episode_steps[episode] = steps
+        succeeded[episode] = done
+        trapped[episode] = hit_trap
+
+
+@njit(cache=True)
+def expected_sarsa(rng, Q, Q2, next_state, reward, is_trap, start_state, treasure_pos,
+                   alpha, gamma, epsilon, lam, max_steps,
+                   episode_rewards, episode_steps, succeeded, trapped, visits, dirty, track):
+    """TD control bootstrapping from the expected value of the epsilon-greedy policy at s'"""
+    for episode in range(episode_rewards.shape[0]):
+        state = start_state
+        done = False
+        total = 0.0
+        steps = 0
+        hit_trap = False
+        while not done and steps < max_steps:
+            # Phase: action selection
+            action = epsilon_greedy(rng, Q[state], epsilon)
+            # Phase: move
+            new_state = next_state[state, action]
+            # Phase: reward
+            r = reward[new_state]
+            done = new_state == treasure_pos
+            if is_trap[new_state]:
+                hit_trap = True
+
+            # Phase: Q update
+            target = r
+            if not done:
+                row = Q[new_state]
+                target += gamma * ((1 - epsilon) * np.max(row) + epsilon * np.mean(row))
+            Q[state, action] += alpha * (target - Q[state, action])
+            if track:
+                visits[state] += 1
+                dirty[state] = True
+
+            # Phase: other
+            total += r
+            state = new_state
+            steps += 1
+        episode_rewards[episode] = total
+        episode_steps[episode] = steps
+        succeeded[episode] = done
+        trapped[episode] = hit_trap
+
+
+@njit(cache=True)
+def double_q_learning(rng, Q, Q2, next_state, reward, is_trap, start_state, treasure_pos,
+                      alpha, gamma, epsilon, lam, max_steps,
+                      episode_rewards, episode_steps, succeeded, trapped, visits, dirty, track):
+    """Two tables, each updated towards the other's value of its own greedy action
+
+    Actions are epsilon-greedy on Q + Q2; a coin flip picks the table to update.
+    """
+    for episode in range(episode_rewards.shape[0]):
+        state = start_state
+        done = False
+        total = 0.0
+        steps = 0
+        hit_trap = False
+        while not done and steps < max_steps:
+            # Phase: action selection
+            if rng.random() < epsilon:
+                action = rng.integers(0, NUM_ACTIONS)
+            else:
+                action = argmax_sum(Q[state], Q2[state])
+            # Phase: move
+            new_state = next_state[state, action]
+            # Phase: reward
+            r = reward[new_state]
+            done = new_state == treasure_pos
+            if is_trap[new_state]:
+                hit_trap = True
+
+            # Phase: Q update
+            if rng.random() < 0.5:
+                updated, other = Q, Q2
+            else:
+                updated, other = Q2, Q
+            target = r
+            if not done:
+                target += gamma * other[new_state, np.argmax(updated[new_state])]
+            updated[state, action] += alpha * (target - updated[state, action])
+            if track:
+                visits[state] += 1
+                dirty[state] = True
+
+            # Phase: other
+            total += r
+            state = new_state
+            steps += 1
+        episode_rewards[episode] = total
+        episode_steps[episode] = steps
+        succeeded[episode] = done
+        trapped[episode] = hit_trap
+
+
+@njit(cache=True)
+def q_lambda(rng, Q, Q2, next_state, reward, is_trap, start_state, treasure_pos,
+             alpha, gamma, epsilon, lam, max_steps,
+             episode_rewards, episode_steps, succeeded, trapped, visits, dirty, track):
+    """Watkins's Q(λ) with accumulating eligibility traces
+
+    Traces live in a list of (state, action, eligibility) entries in visit order instead of
+    a (S, A) array, so each step costs O(live traces) rather than O(S). All entries decay at
+    the same rate, so the oldest are dropped from the front once below TRACE_CUTOFF, and the
+    whole list is cut after an exploratory action.
+    """
+    trace_states = np.empty(max_steps, dtype=np.int64)
+    trace_actions = np.empty(max_steps, dtype=np.int64)
+    trace_values = np.empty(max_steps, dtype=np.float64)
+    decay = gamma * lam
+    for episode in range(episode_rewards.shape[0]):
+        first = 0
+        count = 0
+        state = start_state
+        action = epsilon_greedy(rng, Q[state], epsilon)  # Phase: action selection
+        done = False
+        total = 0.0
+        steps = 0
+        hit_trap = False
+        while not done and steps < max_steps:
+            # Phase: move
+            new_state = next_state[state, action]
+            # Phase: reward
+            r = reward[new_state]
+            done = new_state == treasure_pos
+            if is_trap[new_state]:
+                hit_trap = True
+
+            # Phase: Q update
+            target = r
+            new_action = action
+            greedy = True
+            if not done:
+                new_action = epsilon_greedy(rng, Q[new_state], epsilon)  # Phase: action selection
+                best = np.argmax(Q[new_state])
+                greedy = Q[new_state, new_action] == Q[new_state, best]
+                target += gamma * Q[new_state, best]
+            delta = target - Q[state, action]
+
+            trace_states[count] = state
+            trace_actions[count] = action
+            trace_values[count] = 1.0
+            count += 1
+            for i in range(first, count):
+                Q[trace_states[i], trace_actions[i]] += alpha * delta * trace_values[i]
+                trace_values[i] *= decay
+                if track:
+                    dirty[trace_states[i]] = True
+            if track:
+                visits[state] += 1
+
+            if not greedy:
+                first = count
+            while first < count and trace_values[first] < TRACE_CUTOFF:
+                first += 1
+
+            # Phase: other
+            total += r
+            state = new_state
+            action = new_action
+            steps += 1
+        episode_rewards[episode] = total
+        episode_steps[episode] = steps
+        succeeded[episode] = done
+        trapped[episode] = hit_trap
+
+
+@njit(cache=True)
+def striped_q_learning(rng, Q, Q2, next_state, reward, is_trap, start_state, treasure_pos,
+                       alpha, gamma, epsilon, lam, max_steps,
+                       episode_rewards, episode_steps, succeeded, trapped, visits, dirty, track, locks):
+    """q_learning for a Q-table shared between processes, writing each row under a spinlock
+
+    locks is an int64 array (0 free, 1 held) in memory the writers share; state s uses
+    stripe s % len(locks). Reads stay lock-free, as in Hogwild.
+    """
+    stripes = locks.shape[0]
+    for episode in range(episode_rewards.shape[0]):
+        state = start_state
+        done = False
+        total = 0.0
+        steps = 0
+        hit_trap = False
+        while not done and steps < max_steps:
+            # Phase: action selection
+            action = epsilon_greedy(rng, Q[state], epsilon)
+            # Phase: move
+            new_state = next_state[state, action]
+            # Phase: reward
+            r = reward[new_state]
+            done = new_state == treasure_pos
+            if is_trap[new_state]:
+                hit_trap = True
+
+            # Phase: Q update
+            target = r + gamma * np.max(Q[new_state])
+            stripe = state % stripes
+            while compare_and_swap(locks, stripe, 0, 1) != 0:
+                pass
+            Q[state, action] = (1 - alpha) * Q[state, action] + alpha * target
+            atomic_store(locks, stripe, 0)
+            if track:
+                visits[state] += 1
+                dirty[state] = True
+
+            # Phase: other
+            total += r
+            state = new_state
+            steps += 1
+        episode_rewards[episode] = total
+        episode_steps[episode] = steps
+        succeeded[episode] = done
+        trapped[episode] = hit_trap
+
+
+ALGORITHMS = {
+    'q_learning': q_learning,
+    'sarsa': sarsa,
+    'expected_sarsa': expected_sarsa,
+    'double_q': double_q_learning,
+    'q_lambda': q_lambda,
+}
@@ -0,0 +1,509 @@
+"""GUI-free maze environment setup and tabular RL training
+
+    python maze_RL/maze_engine.py --grid-size 8 --num-traps 6 --episodes 5000
+"""
+import argparse
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+import numpy as np
+
+from maze_algorithms import ALGORITHMS as MODEL_FREE_ALGORITHMS, striped_q_learning
+from maze_env import NUM_ACTIONS, MazeEnv
+from maze_layouts import LAYOUT_KINDS, MazeLayout, generate_layout, load_layout
+from maze_metrics import EpisodeMetrics, open_sink
+from maze_model_io import Q_DTYPES, save_model
+from maze_planning import PLANNING_ALGORITHMS, PlanningModel
+from maze_profiling import NULL_TIMER, LineProfiler, PhaseTimer, format_profile, interpreted
+from maze_sparse import ImplicitMazeEnv, SparseQTable, sparse_q_learning
+from maze_solvers import policy_iteration, regret, value_iteration
+
+ALGORITHMS = {**MODEL_FREE_ALGORITHMS, **PLANNING_ALGORITHMS}
+Q_TABLES = ('dense', 'sparse')
+WARM_START_SOLVERS = {
+    'value_iteration': value_iteration,
+    'policy_iteration': policy_iteration,
+}
+CHUNK_SECONDS = 0.05  # Target wall time per kernel call; bounds pause/cancel and progress latency
+
+
+@dataclass
+class TrainingConfig:
+    # Environment parameters
+    grid_size: int = 4
+    num_traps: int = 1
+    treasure_reward: int = 10
+    trap_penalty: int = -10
+    step_reward: int = -1
+
+    # Hyperparameters
+    algorithm: str = 'q_learning'  # Update rule, see ALGORITHMS
+    alpha: float = 0.1  # Learning rate
+    gamma: float = 0.99  # Discount factor
+    epsilon: float = 0.1  # Exploration rate
+    episodes: int = 1000  # Training episodes
+    max_steps: int = 8  # Step limit per episode
+    lam: float = 0.9  # Eligibility trace decay (q_lambda only)
+    planning_steps: int = 10  # Model backups per real step (dyna_q, prioritized_sweeping)
+    priority_threshold: float = 1e-4  # Smallest TD error prioritized sweeping queues
+
+    # Layout generator (see maze_layouts.GENERATORS) or a custom layout file, which wins
+    layout: str = 'uniform'
+    layout_file: Optional[str] = None
+
+    seed: Optional[int] = None
+    # 'sparse' stores Q-rows only for visited states and computes the maze on demand
+    # (open layouts and q_learning only), for grids too big to tabulate
+    q_table: str = 'dense'
+
+    # Metrics: per-episode arrays are preallocated when kept; turn off for very long runs to
+    # keep only running statistics. metrics_file streams metrics_chunk-episode aggregates
+    # to .csv, .jsonl or .parquet.
+    episode_history: bool = True
+    metrics_file: Optional[str] = None
+    metrics_chunk: int = 1000
+    warm_start: Optional[str] = None  # 'value_iteration' or 'policy_iteration' to seed Q exactly
+
+    # Profiling: per-phase timers, and a line profiler over a sample of sample_episodes
+    # episodes from sample_start, which run interpreted so time resolves to kernel source lines
+    profile: bool = False
+    sample_start: int = 0
+    sample_episodes: int = 0
+
+    @property
+    def num_states(self):
+        return self.grid_size * self.grid_size
+
+
+@dataclass
+class TrainingResult:
+    Q: np.ndarray
+    env: MazeEnv
+    layout: MazeLayout
+    metrics: EpisodeMetrics = field(default_factory=EpisodeMetrics)
+    training_time: float = 0.0
+    cancelled: bool = False
+    planning_backups: int = 0  # Simulated updates made by the planning algorithms
+    profile: Optional[dict] = None  # Phase timings, counters and sampled step phases when config.profile is on
+
+    @property
+    def episodes(self):
+        return self.metrics.episodes
+
+    @property
+    def total_steps(self):
+        return self.metrics.total_steps
+
+    @property
+    def successful_episodes(self):
+        return self.metrics.successes
+
+    @property
+    def trap_hits(self):
+        return self.metrics.trap_hits
+
+    @property
+    def success_rate(self):
+        return self.metrics.success_rate
+
+    @property
+    def trap_rate(self):
+        return self.metrics.trap_rate
+
+    @property
+    def avg_reward(self):
+        return self.metrics.avg_reward
+
+    @property
+    def avg_steps(self):
+        return self.metrics.avg_steps
+
+    @property
+    def episode_rewards(self):
+        """Per-episode rewards (empty when config.episode_history is off)"""
+        return self.metrics.episode_rewards
+
+    @property
+    def episode_steps(self):
+        return self.metrics.episode_steps
+
+    def summary(self):
+        if self.cancelled:
+            return (f"Training cancelled after {self.episodes} episodes ({self.training_time:.2f} seconds)\n"
+                    f"Success Rate: {self.success_rate:.1f}%\n"
+                    f"Trap Rate: {self.trap_rate:.1f}%\n"
+                    f"Average Reward: {self.avg_reward:.1f}\n"
+                    f"Average Steps: {self.avg_steps:.1f}")
+        return (f"Training completed in {self.training_time:.2f} seconds\n"
+                f"Final Success Rate: {self.success_rate:.1f}%\n"
+                f"Final Trap Rate: {self.trap_rate:.1f}%\n"
+                f"Final Average Reward: {self.avg_reward:.1f}\n"
+                f"Final Average Steps: {self.avg_steps:.1f}")
+
+
+@dataclass
+class TrainingProgress:
+    """Snapshot sent to the progress callback; rates are cumulative, averages cover the last window"""
+    episode: int
+    episodes: int
+    success_rate: float
+    trap_rate: float
+    avg_reward: float
+    avg_steps: float
+    elapsed: float
+
+    def status_text(self):
+        return (f"Episode {self.episode}/{self.episodes}\n"
+                f"Success Rate: {self.success_rate:.1f}%\n"
+                f"Trap Rate: {self.trap_rate:.1f}%\n"
+                f"Avg Reward: {self.avg_reward:.1f}\n"
+                f"Avg Steps: {self.avg_steps:.1f}")
+
+
+class TrainingControl:
+    """Thread-safe pause/cancel switches checked by train() between episodes"""
+
+    def __init__(self):
+        self._running = threading.Event()
+        self._running.set()
+        self.cancelled = False
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def pause(self):
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def cancel(self):
+        self.cancelled = True
+        self._running.set()  # Wake a paused worker so it can exit
+
+    def wait_if_paused(self):
+        self._running.wait()
+
+
+class ChangeTracker:
+    """Visit counts and a dirty mask of Q-rows written by train(), for live views
+
+    The training thread only sets flags; a reader calls collect() to get the states that
+    changed since its last call.
+    """
+
+    def __init__(self, num_states):
+        self.visits = np.zeros(num_states, dtype=np.int64)
+        self.dirty = np.zeros(num_states, dtype=bool)
+
+    def collect(self):
+        """States whose Q-row changed since the last call
+
+        Flags are cleared before the caller reads Q, so a write racing with this call is
+        either included in the values read now or flagged again for the next call.
+        """
+        states = np.flatnonzero(self.dirty)
+        self.dirty[states] = False
+        return states
+
+    def mark_all(self):
+        self.dirty[:] = True
+
+
+def make_layout(config, rng=None):
+    """The maze layout for a config: loaded from config.layout_file or generated by config.layout"""
+    if config.layout_file:
+        return load_layout(config.layout_file, config.trap_penalty)
+    if rng is None:
+        rng = np.random.default_rng(config.seed)
+    return generate_layout(config.layout, config.grid_size, config.num_traps, config.trap_penalty, rng=rng)
+
+
+def build_env(config, layout):
+    """Compile the environment tables for a layout (or wrap it implicitly for a sparse Q-table)"""
+    if config.q_table == 'sparse':
+        return ImplicitMazeEnv.from_layout(layout, config.treasure_reward, config.step_reward)
+    return MazeEnv.from_layout(layout, config.treasure_reward, config.step_reward)
+
+
+def train(config: TrainingConfig, layout: Optional[MazeLayout] = None, progress: Optional[Callable] = None,
+          progress_interval=0.25, progress_window=100, control: Optional[TrainingControl] = None,
+          Q: Optional[np.ndarray] = None, tracker: Optional[ChangeTracker] = None,
+          locks: Optional[np.ndarray] = None):
+    """Run config.algorithm for config.episodes episodes and return a TrainingResult
+
+    layout defaults to make_layout(config). If progress is given it is called
+    with a TrainingProgress at most once every progress_interval seconds (and once at the end),
+    so its cost doesn't depend on how fast episodes run. control lets another thread pause or
+    cancel the run between blocks of episodes. Q, if given, is the initial (NUM_STATES, NUM_ACTIONS)
+    table and is updated in place, e.g. a view onto shared memory. tracker, if given, records
+    visit counts and the Q-rows touched, for live visualisation. locks, if given, is an int64
+    spinlock array shared with other processes training the same Q (q_learning only; see
+    maze_multiagent).
+
+    Episodes run inside a compiled kernel (see maze_algorithms) in blocks sized to take about
+    CHUNK_SECONDS, so progress, pause and cancel are handled between blocks. With
+    config.profile the time spent in each phase is reported in result.profile (see maze_profiling).
+    """
+    if config.algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown algorithm '{config.algorithm}', expected one of {sorted(ALGORITHMS)}")
+    if config.algorithm == 'prioritized_sweeping' and config.planning_steps < 1:
+        raise ValueError("prioritized_sweeping only learns through planning; planning_steps must be at least 1")
+    if config.max_steps < 1:
+        raise ValueError(f"max_steps must be at least 1, got {config.max_steps}")
+    if config.metrics_chunk < 1:
+        raise ValueError(f"metrics_chunk must be at least 1, got {config.metrics_chunk}")
+    if config.q_table not in Q_TABLES:
+        raise ValueError(f"Unknown Q-table '{config.q_table}', expected one of {Q_TABLES}")
+    sparse = config.q_table == 'sparse'
+    if sparse and (config.algorithm != 'q_learning' or config.warm_start or tracker is not None):
+        raise ValueError("Sparse Q-tables support q_learning without warm start or live tracking")
+    if locks is not None and (sparse or config.algorithm != 'q_learning'):
+        raise ValueError("Striped locking is only implemented for dense q_learning")
+    rng = np.random.default_rng(config.seed)
+    if layout is None:
+        layout = make_layout(config, rng)
+    env = build_env(config, layout)
+
+    if Q is None:
+        Q = SparseQTable(env.num_states) if sparse else np.zeros((env.num_states, NUM_ACTIONS))
+    elif sparse != isinstance(Q, SparseQTable):
+        raise ValueError(f"Q must be a {'SparseQTable' if sparse else 'NumPy array'} for q_table='{config.q_table}'")
+    elif Q.shape != (env.num_states, NUM_ACTIONS):
+        raise ValueError(f"Q-table shape {Q.shape} doesn't match ({env.num_states}, {NUM_ACTIONS})")
+    if config.warm_start:
+        if config.warm_start not in WARM_START_SOLVERS:
+            raise ValueError(f"Unknown warm start '{config.warm_start}', expected one of {sorted(WARM_START_SOLVERS)}")
+        Q[:] = WARM_START_SOLVERS[config.warm_start](env, config.gamma).Q
+    metrics = EpisodeMetrics(window=progress_window, history=config.episodes if config.episode_history else None,
+                             chunk_episodes=config.metrics_chunk)
+    result = TrainingResult(Q=Q, env=env, layout=layout, metrics=metrics)
+
+    kernel = ALGORITHMS[config.algorithm] if locks is None else striped_q_learning
+    # Double Q-learning's second table starts from the same estimate; the others ignore it
+    Q2 = Q.copy() if config.algorithm == 'double_q' else np.zeros((0, NUM_ACTIONS))
+    if tracker is not None:
+        visits, dirty = tracker.visits, tracker.dirty
+    else:
+        visits, dirty = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool)
+    model = None
+    extra_args = ()
+    if config.algorithm in PLANNING_ALGORITHMS:
+        model = PlanningModel(env.num_states, prioritized=config.algorithm == 'prioritized_sweeping')
+        extra_args = model.kernel_args(config.planning_steps, config.priority_threshold)
+    if locks is not None:
+        extra_args = (locks,)
+
+    def run_block(count, sampled=False):
+        rewards = np.empty(count)
+        steps = np.empty(count, dtype=np.int64)
+        succeeded = np.empty(count, dtype=bool)
+        trapped = np.empty(count, dtype=bool)
+        if sparse:
+            sparse_kernel = interpreted(sparse_q_learning) if sampled else sparse_q_learning
+            done = 0
+            while done < count:
+                # The kernel stops at an episode boundary once the hash might overfill
+                Q.reserve(config.max_steps)
+                done += sparse_kernel(
+                    rng, Q.keys, Q.values, Q.counts, Q.default, Q.max_fill, env.grid_size, env.trap_pos,
+                    env.trap_penalty, float(env.step_reward), env.start_state, env.treasure_pos,
+                    float(env.treasure_reward), config.alpha, config.gamma, config.epsilon, config.max_steps,
+                    rewards[done:], steps[done:], succeeded[done:], trapped[done:])
+            return rewards, steps, succeeded, trapped
+        run = interpreted(kernel) if sampled else kernel
+        run(rng, Q, Q2, env.next_state, env.reward, env.is_trap, env.start_state, env.treasure_pos,
+            config.alpha, config.gamma, config.epsilon, config.lam, config.max_steps,
+            rewards, steps, succeeded, trapped, visits, dirty, tracker is not None, *extra_args)
+        return rewards, steps, succeeded, trapped
+
+    timer = PhaseTimer() if config.profile else NULL_TIMER
+    with timer.phase('compile'):
+        run_block(0)  # Compile (or load the cached) kernel outside the timed region
+    sampler = None
+    if config.profile and config.sample_episodes:
+        sampler = LineProfiler([sparse_q_learning if sparse else kernel])
+    sample_end = config.sample_start + config.sample_episodes
+
+    start_time = time.time()
+    next_report = start_time + progress_interval
+    block = 1
+
+    if config.metrics_file:
+        metrics.sink = open_sink(config.metrics_file)
+    try:
+        while result.episodes < config.episodes:
+            count = min(block, config.episodes - result.episodes)
+            sampling = sampler is not None and config.sample_start <= result.episodes < sample_end
+            if sampler is not None:
+                # Blocks end at the sampling window's edges
+                edge = sample_end if sampling else config.sample_start
+                if edge > result.episodes:
+                    count = min(count, edge - result.episodes)
+            block_start = time.time()
+            if sampling:
+                sampler.start()
+                with timer.phase('sampled'):
+                    rewards, steps, succeeded, trapped = run_block(count, sampled=True)
+                sampler.stop()
+            else:
+                with timer.phase('kernel'):
+                    rewards, steps, succeeded, trapped = run_block(count)
+            block_time = time.time() - block_start
+            # Grow or shrink the block towards CHUNK_SECONDS of work
+            if block_time < CHUNK_SECONDS / 2:
+                block *= 2
+            elif block_time > CHUNK_SECONDS * 2 and block > 1:
+                block //= 2
+            if timer.enabled and not sampling:
+                timer.count('episodes', count)
+                timer.count('steps', int(steps.sum()))
+
+            with timer.phase('metrics'):
+                metrics.update(rewards, steps, succeeded, trapped, elapsed=time.time() - start_time)
+
+            if progress is not None and (time.time() >= next_report or result.episodes == config.episodes):
+                with timer.phase('progress'):
+                    progress(make_progress(result, config.episodes, time.time() - start_time))
+                next_report = time.time() + progress_interval
+
+            if control is not None:
+                if control.paused:
+                    paused_at = time.time()
+                    with timer.phase('paused'):
+                        control.wait_if_paused()
+                    start_time += time.time() - paused_at  # Don't count paused time
+                if control.cancelled:
+                    result.cancelled = True
+                    break
+    finally:
+        with timer.phase('metrics'):
+            metrics.close(elapsed=time.time() - start_time)
+        if sampler is not None:
+            sampler.stop()
+
+    if len(Q2):
+        # Act on the average of the two Double Q estimates
+        Q += Q2
+        Q *= 0.5
+    if model is not None:
+        result.planning_backups = model.planning_backups
+    result.training_time = time.time() - start_time
+    if timer.enabled:
+        result.profile = timer.summary()
+        if sampler is not None:
+            result.profile['sample_window'] = [config.sample_start, min(sample_end, result.episodes)]
+            result.profile['step_phases'] = sampler.phase_shares()
+            result.profile['lines'] = sampler.top()
+    return result
+
+
+def make_progress(result, episodes, elapsed):
+    metrics = result.metrics
+    return TrainingProgress(
+        episode=metrics.episodes,
+        episodes=episodes,
+        success_rate=metrics.success_rate,
+        trap_rate=metrics.trap_rate,
+        avg_reward=metrics.recent_rewards.mean(),
+        avg_steps=metrics.recent_steps.mean(),
+        elapsed=elapsed,
+    )
+
+
+def positive_int(text):
+    """argparse type for counts that must be at least 1"""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train a tabular RL agent on a random trap maze without the GUI")
+    defaults = TrainingConfig()
+    parser.add_argument('--grid-size', type=int, default=defaults.grid_size)
+    parser.add_argument('--num-traps', type=int, default=defaults.num_traps)
+    parser.add_argument('--treasure-reward', type=int, default=defaults.treasure_reward)
+    parser.add_argument('--trap-penalty', type=int, default=defaults.trap_penalty)
+    parser.add_argument('--step-reward', type=int, default=defaults.step_reward)
+    parser.add_argument('--algorithm', choices=sorted(ALGORITHMS), default=defaults.algorithm,
+                        help="Tabular update rule")
+    parser.add_argument('--alpha', type=float, default=defaults.alpha)
+    parser.add_argument('--gamma', type=float, default=defaults.gamma)
+    parser.add_argument('--epsilon', type=float, default=defaults.epsilon)
+    parser.add_argument('--episodes', type=int, default=defaults.episodes)
+    parser.add_argument('--max-steps', type=positive_int, default=defaults.max_steps)
+    parser.add_argument('--lam', type=float, default=defaults.lam, help="Eligibility trace decay for q_lambda")
+    parser.add_argument('--planning-steps', type=int, default=defaults.planning_steps,
+                        help="Model backups per real step for dyna_q and prioritized_sweeping")
+    parser.add_argument('--priority-threshold', type=float, default=defaults.priority_threshold,
+                        help="Smallest TD error queued by prioritized_sweeping")
+    parser.add_argument('--layout', choices=LAYOUT_KINDS, default=defaults.layout,
+                        help="Maze generator: uniform traps, DFS or Kruskal wall maze, or rooms")
+    parser.add_argument('--layout-file', help="Custom layout (text grid of . # T S G, or a .npy of codes)")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--q-table', choices=Q_TABLES, default=defaults.q_table,
+                        help="'sparse' only stores visited states, for very large open grids")
+    parser.add_argument('--metrics-file', help="Stream per-chunk training metrics to this .csv/.jsonl/.parquet file")
+    parser.add_argument('--metrics-chunk', type=positive_int, default=defaults.metrics_chunk,
+                        help="Episodes aggregated into each metrics row")
+    parser.add_argument('--no-episode-history', dest='episode_history', action='store_false',
+                        help="Keep only running statistics instead of per-episode arrays")
+    parser.add_argument('--warm-start', choices=sorted(WARM_START_SOLVERS),
+                        help="Initialise Q from an exact solver before training")
+    parser.add_argument('--regret', action='store_true',
+                        help="Report the greedy policy's regret at the start state against value iteration")
+    parser.add_argument('--profile', action='store_true', help="Time each phase of the training loop")
+    parser.add_argument('--profile-json',
+                        help="Write the profile (phases, counters, step phases, hot lines) to this JSON file")
+    parser.add_argument('--sample-start', type=int, default=defaults.sample_start,
+                        help="First episode of the line profiler's sample window")
+    parser.add_argument('--sample-episodes', type=int, default=defaults.sample_episodes,
+                        help="Episodes to time line by line (interpreted, so slower)")
+    parser.add_argument('--save-q', help="Write the trained Q-table to this .npy file (.npz of states/values if sparse)")
+    parser.add_argument('--save-model', help="Write the Q-table and maze layout to this model file")
+    parser.add_argument('--model-dtype', choices=Q_DTYPES, default='float32',
+                        help="Storage dtype for --save-model")
+    args = parser.parse_args(argv)
+
+    options = {'save_q', 'regret', 'save_model', 'model_dtype', 'profile_json'}
+    if args.profile_json or args.sample_episodes:
+        args.profile = True
+    config = TrainingConfig(**{name: value for name, value in vars(args).items() if name not in options})
+    if config.q_table == 'sparse' and (args.regret or args.save_model):
+        parser.error("--regret and --save-model need a dense Q-table")
+    try:
+        result = train(config)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(result.summary())
+    if result.planning_backups:
+        print(f"Planning backups: {result.planning_backups}")
+    if result.profile is not None:
+        print(format_profile(result.profile))
+        if args.profile_json:
+            with open(args.profile_json, 'w') as f:
+                json.dump(result.profile, f, indent=2)
+    if args.regret:
+        optimal = value_iteration(result.env, config.gamma)
+        start_regret = max(0.0, float(regret(result.env, result.Q, optimal.V, config.gamma)))  # Clamp rounding noise
+        print(f"Regret at start state: {start_regret:.3f}")
+    if args.save_q:
+        if isinstance(result.Q, SparseQTable):
+            states, rows = result.Q.states()
+            np.savez(args.save_q, states=states, values=rows)
+        else:
+            np.save(args.save_q, result.Q)
+    if args.save_model:
+        save_model(args.save_model, result.Q, result.env, dtype=args.model_dtype)
+    return result
+
+
+if __name__ == "__main__":
+    main()
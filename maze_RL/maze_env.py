@@ -0,0 +1,73 @@
+import numpy as np
+
+# Action IDs (index into ACTIONS and the columns of the Q-table)
+ACTIONS = ['up', 'down', 'left', 'right']
+UP, DOWN, LEFT, RIGHT = range(4)
+NUM_ACTIONS = len(ACTIONS)
+
+
+def build_transition_table(grid_size, walls=None):
+    """Build next_state[S, A] where moves into the border or a wall leave the agent in place"""
+    num_states = grid_size * grid_size
+    states = np.arange(num_states, dtype=np.int64)
+    x, y = states // grid_size, states % grid_size
+
+    next_state = np.empty((num_states, NUM_ACTIONS), dtype=np.int64)
+    next_state[:, UP] = np.where(x > 0, states - grid_size, states)
+    next_state[:, DOWN] = np.where(x < grid_size - 1, states + grid_size, states)
+    next_state[:, LEFT] = np.where(y > 0, states - 1, states)
+    next_state[:, RIGHT] = np.where(y < grid_size - 1, states + 1, states)
+    if walls is not None:
+        blocked = walls[next_state]
+        next_state[blocked] = np.broadcast_to(states[:, None], next_state.shape)[blocked]
+    return next_state
+
+
+class MazeEnv:
+    """Compiled grid world: integer transition, reward and trap tables built once per layout"""
+
+    def __init__(self, grid_size, traps, treasure_pos, treasure_reward, step_reward=-1, start_state=0,
+                 walls=None):
+        if len(traps):
+            trap_pos = np.array([pos for pos, _ in traps], dtype=np.int64)
+            trap_penalty = np.array([penalty for _, penalty in traps], dtype=np.float64)
+        else:
+            trap_pos, trap_penalty = np.zeros(0, dtype=np.int64), np.zeros(0)
+        self._compile(grid_size, trap_pos, trap_penalty, treasure_pos, treasure_reward, step_reward,
+                      start_state, walls)
+
+    @classmethod
+    def from_layout(cls, layout, treasure_reward, step_reward=-1):
+        """Compile a maze_layouts.MazeLayout without going through Python (pos, penalty) pairs"""
+        env = cls.__new__(cls)
+        env._compile(layout.grid_size, layout.trap_pos, layout.trap_penalty, layout.treasure_pos,
+                     treasure_reward, step_reward, layout.start_state, layout.walls)
+        return env
+
+    def _compile(self, grid_size, trap_pos, trap_penalty, treasure_pos, treasure_reward, step_reward,
+                 start_state, walls):
+        self.grid_size = grid_size
+        self.num_states = grid_size * grid_size
+        self.treasure_pos = treasure_pos
+        self.treasure_reward = treasure_reward
+        self.step_reward = step_reward
+        self.start_state = start_state
+        self.walls = walls if walls is not None and walls.any() else None
+
+        self.next_state = build_transition_table(grid_size, self.walls)
+
+        # Reward for entering each state, same precedence as the original get_reward()
+        self.reward = np.full(self.num_states, step_reward, dtype=np.float64)
+        self.is_trap = np.zeros(self.num_states, dtype=bool)
+        if len(trap_pos):
+            trap_pos = np.asarray(trap_pos, dtype=np.int64)
+            trap_penalty = np.broadcast_to(np.asarray(trap_penalty, dtype=np.float64), trap_pos.shape)
+            # Reversed so the first entry wins for duplicate positions, like the linear scan did
+            self.reward[trap_pos[::-1]] = trap_penalty[::-1]
+            self.is_trap[trap_pos] = True
+        self.reward[treasure_pos] = treasure_reward
+
+    def step(self, state, action):
+        """Return (next_state, reward, done, hit_trap) for an integer action ID"""
+        next_state = self.next_state[state, action]
+        return next_state, self.reward[next_state], next_state == self.treasure_pos, self.is_trap[next_state]
@@ -0,0 +1,266 @@
+"""Incremental re-planning of an existing Q-table after the maze changes
+
+Moving a couple of traps or changing a penalty leaves most of a trained Q-table valid.
+Instead of starting from zeros, retrain() works out which states the edit can affect
+and re-plans only those with value-iteration backups, seeded from the existing table:
+
+1. changed_states: cells whose reward, moves or terminal status differ between the old
+   and new environments (a grid resize maps rows across by (row, col) first, see remap_q)
+2. affected_region: the changed cells, every state within k steps of one, and every state
+   whose greedy path under the old Q runs through one
+3. replan: synchronous value-iteration backups on the region until it settles; the region
+   then grows into any neighbouring state whose value would still change by more than
+   tol, so an opened shortcut propagates as far as it matters and no further
+
+    result = retrain(old_env, new_env, Q, gamma=0.99, compare=True)
+    print(result.summary())  # Backups and time against a cold start from zeros
+
+    python maze_RL/maze_incremental.py --grid-size 64 --num-traps 400 --move-traps 2
+
+Re-planning only propagates the edit. Values outside the region are kept as they are, so
+the result is only as good as the seed: from a converged table (value iteration, or a
+training run that has settled) it matches a cold solve of the new maze, while a sampled,
+unconverged table keeps its error and its inconsistencies spread the region. The summary
+reports the seed's Bellman residual and flags tables that aren't converged.
+"""
+import argparse
+import time
+from dataclasses import dataclass, replace
+from typing import Optional
+
+import numpy as np
+
+from maze_engine import TrainingConfig, build_env, make_layout, train
+from maze_env import NUM_ACTIONS
+from maze_layouts import LAYOUT_KINDS
+from maze_solvers import q_from_values, regret, value_iteration
+
+
+@dataclass
+class IncrementalResult:
+    Q: np.ndarray
+    changed: int  # Cells that differ between the layouts
+    region: int  # States re-planned, including the ones the region grew into
+    initial_region: int  # States affected_region selected
+    sweeps: int
+    backups: int  # State-action backups made
+    time: float
+    # Filled in when compared with a cold start (value iteration from zeros)
+    cold_backups: Optional[int] = None
+    cold_time: Optional[float] = None
+    regret: Optional[float] = None  # Greedy policy's regret at the start state
+    seed_residual: Optional[float] = None  # Largest Bellman residual of the seed table on the old maze
+    tol: float = 1e-6
+
+    @property
+    def work_saved(self):
+        """Fraction of the cold start's backups avoided"""
+        if not self.cold_backups:
+            return None
+        return 1 - self.backups / self.cold_backups
+
+    @property
+    def seed_converged(self):
+        return self.seed_residual is None or self.seed_residual < self.tol
+
+    def summary(self):
+        text = (f"Incremental re-plan: {self.changed} changed cells, {self.region} states re-planned "
+                f"({self.initial_region} affected), {self.sweeps} sweeps, {self.backups} backups "
+                f"in {self.time * 1000:.1f} ms")
+        if self.cold_backups is not None:
+            text += (f"\nCold start: {self.cold_backups} backups in {self.cold_time * 1000:.1f} ms; "
+                     f"{self.work_saved:.1%} of the backups saved, {self.time / self.cold_time:.2f}x the "
+                     f"cold start's time\nRegret at start state: {self.regret:.3f}")
+        if not self.seed_converged:
+            text += (f"\nSeed table not converged (Bellman residual {self.seed_residual:.3g}): the re-plan "
+                     f"keeps its error, so it is not comparable to the cold start")
+        return text
+
+
+def _coordinates(states, grid_size):
+    return states // grid_size, states % grid_size
+
+
+def remap_q(Q, old_grid_size, new_grid_size):
+    """Q-table for a resized grid: rows of cells in both grids carried over by (row, col), zeros elsewhere"""
+    if old_grid_size == new_grid_size:
+        return Q.copy()
+    new_Q = np.zeros((new_grid_size * new_grid_size, NUM_ACTIONS))
+    size = min(old_grid_size, new_grid_size)
+    rows = np.arange(size)
+    old_states = (rows[:, None] * old_grid_size + rows[None, :]).ravel()
+    new_states = (rows[:, None] * new_grid_size + rows[None, :]).ravel()
+    new_Q[new_states] = Q[old_states]
+    return new_Q
+
+
+def changed_states(old_env, new_env):
+    """Boolean mask over new_env's states whose reward, moves or terminal status changed
+
+    Cells outside the old grid count as changed.
+    """
+    old_size, new_size = old_env.grid_size, new_env.grid_size
+    states = np.arange(new_env.num_states)
+    row, col = _coordinates(states, new_size)
+    inside = (row < old_size) & (col < old_size)
+    old_states = np.where(inside, row * old_size + col, 0)
+
+    changed = ~inside
+    changed |= inside & (old_env.reward[old_states] != new_env.reward)
+    old_terminal = old_states == old_env.treasure_pos
+    changed |= inside & (old_terminal != (states == new_env.treasure_pos))
+    # Compare moves as (row, col) targets so a resize doesn't count as every move changing
+    old_row, old_col = _coordinates(old_env.next_state[old_states], old_size)
+    new_row, new_col = _coordinates(new_env.next_state, new_size)
+    changed |= inside & ((old_row != new_row) | (old_col != new_col)).any(axis=1)
+    return changed
+
+
+def bellman_residual(env, Q, gamma):
+    """Largest change one value-iteration backup would make to max_a Q; 0 for a solved table"""
+    V = np.asarray(Q).max(axis=1)
+    V[env.treasure_pos] = 0
+    return float(np.max(np.abs(q_from_values(env, V, gamma).max(axis=1) - V)))
+
+
+def affected_region(env, Q, changed, k=3):
+    """States within k steps of a changed cell, plus those whose greedy path under Q passes one"""
+    # States whose backups read a region state within k steps
+    near = changed.copy()
+    for _ in range(k):
+        near |= near[env.next_state].any(axis=1)
+
+    # Pointer doubling along the greedy successor chain: after i rounds, hits[s] says whether
+    # one of the first 2**i states on s's path changed. The treasure absorbs.
+    states = np.arange(env.num_states)
+    succ = env.next_state[states, np.asarray(Q).argmax(axis=1)]
+    succ[env.treasure_pos] = env.treasure_pos
+    hits = changed.copy()
+    for _ in range(max(1, int(env.num_states - 1).bit_length())):
+        hits |= hits[succ]
+        succ = succ[succ]
+    return near | hits
+
+
+def replan(env, Q, region, gamma, tol=1e-6, max_sweeps=100000):
+    """Value-iteration backups on the region of Q, growing it while its edge still changes
+
+    Values outside the region are read from max_a Q[s]. A neighbouring state joins when its
+    backup under the re-planned values differs by tol or more from its backup under the
+    seed values. With a converged seed that is exactly where the edit still matters; with an
+    unconverged one, any region state whose seed value was off spreads it too.
+    Returns (Q, region, sweeps, backups); only rows of region states (and their
+    predecessors) are rewritten.
+    """
+    Q = np.array(Q, dtype=np.float64)
+    V = Q.max(axis=1)
+    V[env.treasure_pos] = 0
+    seed_V = V.copy()
+    region = region.copy()
+    sweeps = backups = 0
+
+    def bellman(states, V=V):
+        next_states = env.next_state[states]
+        values = (env.reward[next_states] + gamma * V[next_states]).max(axis=1)
+        values[states == env.treasure_pos] = 0
+        return values
+
+    while sweeps < max_sweeps:
+        states = np.flatnonzero(region)
+        while sweeps < max_sweeps:
+            sweeps += 1
+            backups += len(states) * NUM_ACTIONS
+            values = bellman(states)
+            delta = np.max(np.abs(values - V[states])) if len(states) else 0.0
+            V[states] = values
+            if delta < tol:
+                break
+        # States just outside whose backups the re-planning moved join the region
+        frontier = np.flatnonzero(~region & region[env.next_state].any(axis=1))
+        backups += len(frontier) * NUM_ACTIONS
+        grow = frontier[np.abs(bellman(frontier) - bellman(frontier, seed_V)) >= tol]
+        if len(grow) == 0:
+            break
+        region[grow] = True
+
+    # Rewrite the Q-rows of every state whose lookahead reads a re-planned value
+    rows = np.flatnonzero(region | region[env.next_state].any(axis=1))
+    next_states = env.next_state[rows]
+    Q[rows] = env.reward[next_states] + gamma * V[next_states]
+    Q[env.treasure_pos] = 0
+    return Q, region, sweeps, backups
+
+
+def retrain(old_env, new_env, Q, gamma, k=3, tol=1e-6, compare=False):
+    """Re-plan the part of Q (trained on old_env) that new_env's changes affect
+
+    If anything changed, also checks whether Q was converged on old_env (see
+    IncrementalResult.seed_converged). With compare, solves new_env from zeros as well to
+    report the work saved and the result's regret at the start state; that cold solve costs
+    more than the re-plan, so it is off unless asked for.
+    """
+    start = time.perf_counter()
+    seed = remap_q(Q, old_env.grid_size, new_env.grid_size)
+    changed = changed_states(old_env, new_env)
+    initial = affected_region(new_env, seed, changed, k)
+    new_Q, region, sweeps, backups = replan(new_env, seed, initial, gamma, tol)
+    result = IncrementalResult(Q=new_Q, changed=int(changed.sum()), region=int(region.sum()),
+                               initial_region=int(initial.sum()), sweeps=sweeps, backups=backups,
+                               time=time.perf_counter() - start, tol=tol)
+    if result.changed:
+        result.seed_residual = bellman_residual(old_env, Q, gamma)
+    if compare and result.changed:
+        start = time.perf_counter()
+        cold = value_iteration(new_env, gamma, tol)
+        result.cold_time = time.perf_counter() - start
+        result.cold_backups = cold.iterations * new_env.num_states * NUM_ACTIONS
+        result.regret = max(0.0, float(regret(new_env, new_Q, cold.V, gamma)))  # Clamp rounding noise
+    return result
+
+
+def move_traps(layout, count, rng):
+    """Copy of layout with count of its traps moved to random free cells"""
+    trap_pos = layout.trap_pos.copy()
+    blocked = np.zeros(layout.num_states, dtype=bool)
+    blocked[trap_pos] = True
+    blocked[[layout.start_state, layout.treasure_pos]] = True
+    if layout.walls is not None:
+        blocked |= layout.walls
+    count = min(count, len(trap_pos))
+    trap_pos[rng.choice(len(trap_pos), count, replace=False)] = rng.choice(
+        np.flatnonzero(~blocked), count, replace=False)
+    return replace(layout, trap_pos=trap_pos)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train on a maze, move some traps and re-plan incrementally")
+    defaults = TrainingConfig()
+    parser.add_argument('--grid-size', type=int, default=32)
+    parser.add_argument('--num-traps', type=int, default=100)
+    parser.add_argument('--layout', choices=LAYOUT_KINDS, default=defaults.layout)
+    parser.add_argument('--episodes', type=int, default=0,
+                        help="Seed from a training run of this many episodes (default: value iteration)")
+    parser.add_argument('--max-steps', type=int, default=256)
+    parser.add_argument('--gamma', type=float, default=defaults.gamma)
+    parser.add_argument('--move-traps', type=int, default=2, help="Traps moved between the two layouts")
+    parser.add_argument('--k', type=int, default=3, help="Steps around changed cells that are re-planned")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    config = TrainingConfig(grid_size=args.grid_size, num_traps=args.num_traps, layout=args.layout,
+                            episodes=args.episodes, max_steps=args.max_steps, gamma=args.gamma, seed=args.seed)
+    if args.episodes:
+        result = train(config)
+        print(result.summary())
+        layout, env, Q = result.layout, result.env, result.Q
+    else:
+        layout = make_layout(config)
+        env = build_env(config, layout)
+        Q = value_iteration(env, config.gamma).Q
+    new_layout = move_traps(layout, args.move_traps, np.random.default_rng(args.seed))
+    new_env = build_env(config, new_layout)
+    print(retrain(env, new_env, Q, config.gamma, k=args.k, compare=True).summary())
+
+
+if __name__ == "__main__":
+    main()
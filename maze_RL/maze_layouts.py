@@ -0,0 +1,279 @@
+"""Seeded maze layout generators and custom layout files
+
+Every generator returns a MazeLayout (flat NumPy arrays indexed by state) that
+MazeEnv.from_layout compiles, so random traps, wall mazes and loaded files all reach
+the environment through the same path.
+
+Layout text files use one character per cell, one row per line (the grid must be square):
+
+    .  empty      #  wall      T  trap      S  start      G  treasure
+
+If S or G is missing the start defaults to the top-left and the treasure to the
+bottom-right cell. A .npy file holding a square integer array uses the codes in
+CELL_CODES instead.
+"""
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+# Integer cell codes for .npy layout files
+EMPTY, WALL, TRAP, START, TREASURE = range(5)
+CELL_CODES = {'.': EMPTY, '#': WALL, 'T': TRAP, 'S': START, 'G': TREASURE}
+LAYOUT_KINDS = ('uniform', 'dfs', 'kruskal', 'rooms')
+
+
+@dataclass
+class MazeLayout:
+    grid_size: int
+    trap_pos: np.ndarray  # int64 positions
+    trap_penalty: np.ndarray  # float64, one per trap
+    treasure_pos: int
+    start_state: int = 0
+    walls: Optional[np.ndarray] = None  # bool mask over states, None for an open grid
+
+    @property
+    def num_states(self):
+        return self.grid_size * self.grid_size
+
+    @property
+    def traps(self):
+        """The traps as (position, penalty) pairs"""
+        return [(int(pos), penalty.item()) for pos, penalty in zip(self.trap_pos, self.trap_penalty)]
+
+    def wall_mask(self):
+        if self.walls is None:
+            return np.zeros(self.num_states, dtype=bool)
+        return self.walls
+
+
+def _skip_reserved(samples, reserved):
+    """Map samples from range(n - len(reserved)) onto range(n) minus the reserved positions"""
+    for pos in np.unique(reserved):
+        samples[samples >= pos] += 1
+    return samples
+
+
+def sample_traps(grid_size, num_traps, trap_penalty, rng, reserved=(0,), walls=None):
+    """Pick num_traps distinct trap cells, never on reserved cells or walls
+
+    On an open grid this samples indices without replacement with Generator.choice, which
+    is O(num_traps) for sparse traps, instead of materialising the list of free cells.
+    """
+    num_states = grid_size * grid_size
+    reserved = np.unique(np.asarray(reserved, dtype=np.int64))
+    if walls is None or not walls.any():
+        free = num_states - len(reserved)
+        if num_traps > free:
+            raise ValueError(f"Number of traps must be less than or equal to {free}")
+        samples = rng.choice(free, size=num_traps, replace=False).astype(np.int64)
+        trap_pos = _skip_reserved(samples, reserved)
+    else:
+        open_cells = np.flatnonzero(~walls)
+        open_cells = open_cells[~np.isin(open_cells, reserved)]
+        if num_traps > len(open_cells):
+            raise ValueError(f"Number of traps must be less than or equal to {len(open_cells)}")
+        trap_pos = rng.choice(open_cells, size=num_traps, replace=False).astype(np.int64)
+    return trap_pos, np.full(num_traps, trap_penalty, dtype=np.float64)
+
+
+def uniform_traps(grid_size, num_traps, trap_penalty, rng):
+    """Open grid with uniformly placed traps, start top-left and treasure bottom-right"""
+    treasure_pos = grid_size * grid_size - 1
+    trap_pos, penalties = sample_traps(grid_size, num_traps, trap_penalty, rng, reserved=(0, treasure_pos))
+    return MazeLayout(grid_size, trap_pos, penalties, treasure_pos)
+
+
+def _passage_grid(grid_size):
+    """Walls everywhere except the even (row, col) cells, which become maze nodes"""
+    walls = np.ones((grid_size, grid_size), dtype=bool)
+    walls[::2, ::2] = False
+    return walls
+
+
+def _finish_wall_maze(walls, grid_size, num_traps, trap_penalty, rng):
+    # On even grids the bottom-right cell isn't a node; join it to the nearest node
+    if grid_size % 2 == 0 and grid_size > 1:
+        walls[grid_size - 1, grid_size - 1] = False
+        walls[grid_size - 2, grid_size - 1] = False
+    walls = walls.ravel()
+    treasure_pos = grid_size * grid_size - 1
+    trap_pos, penalties = sample_traps(grid_size, num_traps, trap_penalty, rng,
+                                       reserved=(0, treasure_pos), walls=walls)
+    return MazeLayout(grid_size, trap_pos, penalties, treasure_pos, walls=walls)
+
+
+def dfs_maze(grid_size, num_traps, trap_penalty, rng):
+    """Perfect maze carved by randomized depth-first search (long winding corridors)"""
+    walls = _passage_grid(grid_size)
+    nodes = (grid_size + 1) // 2
+    visited = np.zeros((nodes, nodes), dtype=bool)
+    visited[0, 0] = True
+    stack = [(0, 0)]
+    steps = ((-1, 0), (1, 0), (0, -1), (0, 1))
+    while stack:
+        row, col = stack[-1]
+        options = [(row + dr, col + dc) for dr, dc in steps
+                   if 0 <= row + dr < nodes and 0 <= col + dc < nodes and not visited[row + dr, col + dc]]
+        if not options:
+            stack.pop()
+            continue
+        next_row, next_col = options[rng.integers(len(options))]
+        visited[next_row, next_col] = True
+        walls[row + next_row, col + next_col] = False  # Knock down the wall between the two nodes
+        stack.append((next_row, next_col))
+    return _finish_wall_maze(walls, grid_size, num_traps, trap_penalty, rng)
+
+
+def kruskal_maze(grid_size, num_traps, trap_penalty, rng):
+    """Perfect maze from randomized Kruskal (many short dead ends)"""
+    walls = _passage_grid(grid_size)
+    nodes = (grid_size + 1) // 2
+    node_ids = np.arange(nodes * nodes).reshape(nodes, nodes)
+    edges = np.concatenate([
+        np.stack([node_ids[:, :-1].ravel(), node_ids[:, 1:].ravel()], axis=1),
+        np.stack([node_ids[:-1, :].ravel(), node_ids[1:, :].ravel()], axis=1),
+    ])
+    edges = edges[rng.permutation(len(edges))]
+
+    parent = list(range(nodes * nodes))
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for a, b in edges.tolist():
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[root_a] = root_b
+            (row_a, col_a), (row_b, col_b) = divmod(a, nodes), divmod(b, nodes)
+            walls[row_a + row_b, col_a + col_b] = False
+    return _finish_wall_maze(walls, grid_size, num_traps, trap_penalty, rng)
+
+
+def rooms_maze(grid_size, num_traps, trap_penalty, rng, room_size=8):
+    """Square rooms separated by walls, with one random door in each shared wall"""
+    walls = np.zeros((grid_size, grid_size), dtype=bool)
+    dividers = np.arange(room_size, grid_size - 1, room_size + 1)
+    walls[dividers, :] = True
+    walls[:, dividers] = True
+
+    bounds = np.concatenate([[0], dividers + 1, [grid_size + 1]])  # Room spans are [bounds[i], bounds[i+1] - 1)
+    for divider in dividers:
+        for j in range(len(bounds) - 1):
+            low, high = bounds[j], bounds[j + 1] - 1
+            if high <= low:
+                continue
+            walls[divider, rng.integers(low, high)] = False  # Door between rooms stacked vertically
+            walls[rng.integers(low, high), divider] = False  # Door between rooms side by side
+
+    walls = walls.ravel()
+    treasure_pos = grid_size * grid_size - 1
+    walls[[0, treasure_pos]] = False
+    trap_pos, penalties = sample_traps(grid_size, num_traps, trap_penalty, rng,
+                                       reserved=(0, treasure_pos), walls=walls)
+    return MazeLayout(grid_size, trap_pos, penalties, treasure_pos, walls=walls)
+
+
+GENERATORS = {
+    'uniform': uniform_traps,
+    'dfs': dfs_maze,
+    'kruskal': kruskal_maze,
+    'rooms': rooms_maze,
+}
+
+
+def reachable_states(layout, avoid_traps=False):
+    """Boolean mask of cells reachable from the start by breadth-first search"""
+    grid_size = layout.grid_size
+    blocked = layout.wall_mask().copy()
+    if avoid_traps:
+        blocked[layout.trap_pos] = True
+        blocked[layout.treasure_pos] = False
+    reached = np.zeros(layout.num_states, dtype=bool)
+    reached[layout.start_state] = True
+    frontier = np.array([layout.start_state], dtype=np.int64)
+    while len(frontier):
+        row, col = frontier // grid_size, frontier % grid_size
+        neighbours = np.concatenate([
+            frontier[row > 0] - grid_size,
+            frontier[row < grid_size - 1] + grid_size,
+            frontier[col > 0] - 1,
+            frontier[col < grid_size - 1] + 1,
+        ])
+        neighbours = np.unique(neighbours[~blocked[neighbours] & ~reached[neighbours]])
+        reached[neighbours] = True
+        frontier = neighbours
+    return reached
+
+
+def is_solvable(layout, avoid_traps=False):
+    """True if the treasure can be reached from the start (optionally without entering a trap)"""
+    if layout.walls is None and not avoid_traps:
+        return True  # Traps can be walked through, so every cell of an open grid is reachable
+    return bool(reachable_states(layout, avoid_traps)[layout.treasure_pos])
+
+
+def generate_layout(kind, grid_size, num_traps, trap_penalty, seed=None, rng=None, ensure_solvable=True,
+                    max_attempts=100):
+    """Build a layout with one of GENERATORS, re-drawing until is_solvable() if requested"""
+    if kind not in GENERATORS:
+        raise ValueError(f"Unknown layout kind '{kind}', expected one of {LAYOUT_KINDS}")
+    if rng is None:
+        rng = np.random.default_rng(seed)
+    for _ in range(max_attempts):
+        layout = GENERATORS[kind](grid_size, num_traps, trap_penalty, rng)
+        if not ensure_solvable or is_solvable(layout):
+            return layout
+    raise ValueError(f"Could not generate a solvable '{kind}' layout in {max_attempts} attempts")
+
+
+def layout_from_codes(codes, trap_penalty):
+    """MazeLayout from a square integer array of CELL_CODES values"""
+    codes = np.asarray(codes)
+    if codes.ndim != 2 or codes.shape[0] != codes.shape[1]:
+        raise ValueError(f"Layout must be a square grid, got shape {codes.shape}")
+    grid_size = codes.shape[0]
+    flat = codes.ravel()
+    if not np.isin(flat, list(CELL_CODES.values())).all():
+        raise ValueError("Layout contains unknown cell codes")
+
+    starts = np.flatnonzero(flat == START)
+    treasures = np.flatnonzero(flat == TREASURE)
+    if len(starts) > 1 or len(treasures) > 1:
+        raise ValueError("Layout must have at most one start and one treasure")
+    start_state = int(starts[0]) if len(starts) else 0
+    treasure_pos = int(treasures[0]) if len(treasures) else grid_size * grid_size - 1
+    if start_state == treasure_pos:
+        raise ValueError("Start and treasure must be different cells")
+
+    walls = flat == WALL
+    if walls[start_state] or walls[treasure_pos]:
+        raise ValueError("Start and treasure can't be walls")
+    trap_pos = np.flatnonzero(flat == TRAP)
+    return MazeLayout(grid_size, trap_pos, np.full(len(trap_pos), trap_penalty, dtype=np.float64),
+                      treasure_pos, start_state=start_state, walls=walls if walls.any() else None)
+
+
+def load_layout(path, trap_penalty=-10):
+    """Read a custom layout from a text file or a .npy array of cell codes"""
+    if os.path.splitext(path)[1].lower() == '.npy':
+        return layout_from_codes(np.load(path), trap_penalty)
+
+    with open(path, encoding='utf-8') as f:
+        rows = [line.strip() for line in f if line.strip()]
+    if not rows:
+        raise ValueError(f"{path} contains no layout rows")
+    unknown = set(''.join(rows)) - set(CELL_CODES)
+    if unknown:
+        raise ValueError(f"{path} contains unknown cell characters: {''.join(sorted(unknown))}")
+    if len({len(row) for row in rows}) != 1:
+        raise ValueError(f"{path} has rows of different lengths")
+    lookup = np.zeros(128, dtype=np.int64)
+    for char, code in CELL_CODES.items():
+        lookup[ord(char)] = code
+    chars = np.frombuffer(''.join(rows).encode('ascii'), dtype=np.uint8)
+    return layout_from_codes(lookup[chars].reshape(len(rows), len(rows[0])), trap_penalty)
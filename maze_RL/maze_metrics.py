@@ -0,0 +1,293 @@
+"""Streaming training metrics: constant-memory statistics and export sinks
+
+EpisodeMetrics takes whole blocks of episode outcomes (as the training kernels produce
+them) and keeps:
+
+- running count/mean/variance (Welford, merged per block) of rewards and steps, and a reward EMA
+- success and trap counters
+- fixed-size ring buffers of the most recent rewards/steps for windowed averages
+- optionally, per-episode reward/step arrays preallocated for a known episode count
+
+Nothing grows with the number of episodes unless history is requested. A sink receives
+one aggregate row per chunk_episodes episodes for offline plotting:
+
+    sink = open_sink('run.csv')  # or .jsonl / .parquet
+"""
+import csv
+import json
+import os
+
+import numpy as np
+
+METRIC_COLUMNS = ['episode', 'elapsed', 'chunk_avg_reward', 'chunk_avg_steps', 'chunk_success_rate',
+                  'chunk_trap_rate', 'avg_reward', 'reward_std', 'reward_ema', 'avg_steps', 'success_rate',
+                  'trap_rate']
+
+
+class RunningStats:
+    """Count, mean and variance of a stream, updated a block at a time (Welford/Chan merge)"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, values):
+        n = len(values)
+        if n == 0:
+            return
+        batch_mean = float(np.mean(values))
+        batch_m2 = float(np.sum((values - batch_mean) ** 2))
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean += delta * n / total
+        self._m2 += batch_m2 + delta * delta * self.count * n / total
+        self.count = total
+
+    @property
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return self.variance ** 0.5
+
+
+class ExponentialAverage:
+    """EMA with smoothing factor alpha; the first value seeds it"""
+
+    def __init__(self, alpha):
+        self.alpha = alpha
+        self.value = None
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        if self.value is None:
+            self.value = float(values[0])
+            values = values[1:]
+        n = len(values)
+        # value_n = (1 - a)^n value_0 + sum_i a (1 - a)^(n - 1 - i) x_i, in one pass
+        decay = 1.0 - self.alpha
+        weights = self.alpha * decay ** np.arange(n - 1, -1, -1, dtype=np.float64)
+        self.value = float(decay ** n * self.value + weights @ values)
+
+
+class RingBuffer:
+    """The last capacity values of a stream"""
+
+    def __init__(self, capacity, dtype=np.float64):
+        self.data = np.zeros(capacity, dtype=dtype)
+        self.capacity = capacity
+        self.size = 0
+        self._end = 0  # Index one past the newest value
+
+    def extend(self, values):
+        values = np.asarray(values)[-self.capacity:]
+        n = len(values)
+        first = min(n, self.capacity - self._end)
+        self.data[self._end:self._end + first] = values[:first]
+        self.data[:n - first] = values[first:]
+        self._end = (self._end + n) % self.capacity
+        self.size = min(self.capacity, self.size + n)
+
+    def values(self):
+        """Stored values, oldest first"""
+        if self.size < self.capacity:
+            return self.data[:self.size]
+        return np.concatenate([self.data[self._end:], self.data[:self._end]])
+
+    def mean(self):
+        return float(np.mean(self.data[:self.size])) if self.size else 0.0
+
+    def __len__(self):
+        return self.size
+
+
+class EpisodeMetrics:
+    """Constant-memory statistics over training episodes, fed a block at a time
+
+    window is the length of the recent-average ring buffers; history, if given, is the number
+    of episodes to keep per-episode reward/step arrays for (preallocated). sink, if given,
+    receives a METRIC_COLUMNS row every chunk_episodes episodes.
+    """
+
+    def __init__(self, window=100, history=None, ema_alpha=0.01, sink=None, chunk_episodes=1000):
+        if chunk_episodes < 1:
+            raise ValueError(f"chunk_episodes must be at least 1, got {chunk_episodes}")
+        self.episodes = 0
+        self.total_steps = 0
+        self.successes = 0
+        self.trap_hits = 0
+        self.rewards = RunningStats()
+        self.steps = RunningStats()
+        self.reward_ema = ExponentialAverage(ema_alpha)
+        self.recent_rewards = RingBuffer(window)
+        self.recent_steps = RingBuffer(window, dtype=np.int64)
+        self.reward_history = np.empty(history) if history else None
+        self.steps_history = np.empty(history, dtype=np.int64) if history else None
+        self.sink = sink
+        self.chunk_episodes = chunk_episodes
+        self._chunk = [0, 0.0, 0, 0, 0]  # Episodes, reward sum, step sum, successes, trap hits
+
+    def update(self, rewards, steps, succeeded, trapped, elapsed=0.0):
+        """Add a block of episode outcomes (arrays of equal length)"""
+        if self.reward_history is not None:
+            end = min(self.episodes + len(rewards), len(self.reward_history))
+            self.reward_history[self.episodes:end] = rewards[:end - self.episodes]
+            self.steps_history[self.episodes:end] = steps[:end - self.episodes]
+        if self.sink is None:
+            self._accumulate(rewards, steps, succeeded, trapped)
+            return
+
+        # Split the block at chunk boundaries so each row sees the statistics up to its last episode
+        start = 0
+        while start < len(rewards):
+            take = min(len(rewards) - start, self.chunk_episodes - self._chunk[0])
+            part = slice(start, start + take)
+            successes, trap_hits = self.successes, self.trap_hits
+            self._accumulate(rewards[part], steps[part], succeeded[part], trapped[part])
+            chunk = self._chunk
+            chunk[0] += take
+            chunk[1] += float(np.sum(rewards[part]))
+            chunk[2] += int(np.sum(steps[part]))
+            chunk[3] += self.successes - successes
+            chunk[4] += self.trap_hits - trap_hits
+            start += take
+            if chunk[0] == self.chunk_episodes:
+                self._write_chunk(elapsed)
+
+    def _accumulate(self, rewards, steps, succeeded, trapped):
+        self.episodes += len(rewards)
+        self.total_steps += int(np.sum(steps))
+        self.successes += int(np.count_nonzero(succeeded))
+        self.trap_hits += int(np.count_nonzero(trapped))
+        self.rewards.update(rewards)
+        self.steps.update(steps)
+        self.reward_ema.update(rewards)
+        self.recent_rewards.extend(rewards)
+        self.recent_steps.extend(steps)
+
+    def _write_chunk(self, elapsed):
+        count, reward_sum, step_sum, successes, trap_hits = self._chunk
+        if count == 0:
+            return
+        self.sink.write({
+            'episode': self.episodes,
+            'elapsed': elapsed,
+            'chunk_avg_reward': reward_sum / count,
+            'chunk_avg_steps': step_sum / count,
+            'chunk_success_rate': successes / count * 100,
+            'chunk_trap_rate': trap_hits / count * 100,
+            'avg_reward': self.rewards.mean,
+            'reward_std': self.rewards.std,
+            'reward_ema': self.reward_ema.value,
+            'avg_steps': self.steps.mean,
+            'success_rate': self.success_rate,
+            'trap_rate': self.trap_rate,
+        })
+        self._chunk = [0, 0.0, 0, 0, 0]
+
+    def close(self, elapsed=0.0):
+        """Write the final partial chunk and close the sink"""
+        if self.sink is not None:
+            self._write_chunk(elapsed)
+            self.sink.close()
+
+    @property
+    def success_rate(self):
+        return self.successes / max(1, self.episodes) * 100
+
+    @property
+    def trap_rate(self):
+        return self.trap_hits / max(1, self.episodes) * 100
+
+    @property
+    def avg_reward(self):
+        return self.rewards.mean
+
+    @property
+    def avg_steps(self):
+        return self.steps.mean
+
+    @property
+    def episode_rewards(self):
+        """Per-episode rewards recorded so far (empty unless history was requested)"""
+        if self.reward_history is None:
+            return np.zeros(0)
+        return self.reward_history[:min(self.episodes, len(self.reward_history))]
+
+    @property
+    def episode_steps(self):
+        if self.steps_history is None:
+            return np.zeros(0, dtype=np.int64)
+        return self.steps_history[:min(self.episodes, len(self.steps_history))]
+
+
+class CSVSink:
+    def __init__(self, path):
+        self._file = open(path, 'w', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=METRIC_COLUMNS)
+        self._writer.writeheader()
+
+    def write(self, row):
+        self._writer.writerow(row)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class JSONLSink:
+    def __init__(self, path):
+        self._file = open(path, 'w')
+
+    def write(self, row):
+        self._file.write(json.dumps(row) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetSink:
+    """Buffers rows and writes a Parquet row group every row_group_size rows (needs pyarrow)"""
+
+    def __init__(self, path, row_group_size=1000):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ValueError("Parquet metrics need pyarrow (pip install pyarrow)") from e
+        self._pa = pyarrow
+        self._schema = pyarrow.schema([(name, pyarrow.int64() if name == 'episode' else pyarrow.float64())
+                                       for name in METRIC_COLUMNS])
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+        self._rows = []
+        self.row_group_size = row_group_size
+
+    def write(self, row):
+        self._rows.append(row)
+        if len(self._rows) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if self._rows:
+            self._writer.write_table(self._pa.Table.from_pylist(self._rows, schema=self._schema))
+            self._rows = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+SINKS = {'.csv': CSVSink, '.jsonl': JSONLSink, '.parquet': ParquetSink}
+
+
+def open_sink(path):
+    """Sink for path, chosen by its extension (.csv, .jsonl or .parquet)"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in SINKS:
+        raise ValueError(f"Unsupported metrics file '{path}', expected one of {sorted(SINKS)}")
+    return SINKS[extension](path)
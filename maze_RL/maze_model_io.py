@@ -0,0 +1,150 @@
+"""Save and load trained Q-tables together with their maze layout
+
+File layout (all integers little-endian):
+
+    magic      8 bytes   b'MAZEQTBL'
+    version    uint32
+    header_len uint32
+    header     JSON (UTF-8): layout scalars plus {name: {offset, dtype, shape}} for each section
+    sections   raw C-order arrays, each starting on a 64-byte boundary:
+               trap_pos (int64), trap_penalty (float64), walls (bool, version 2+,
+               empty for an open grid), q (the selected dtype)
+
+Loading maps the Q-table with np.memmap, so opening a huge policy is instant and only
+the rows that are actually read (e.g. along the greedy path) are paged in.
+"""
+import json
+import struct
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from maze_env import NUM_ACTIONS, MazeEnv
+from maze_layouts import MazeLayout
+
+MAGIC = b'MAZEQTBL'
+FORMAT_VERSION = 2
+ALIGNMENT = 64
+Q_DTYPES = ('float64', 'float32', 'float16')
+_PREFIX = struct.Struct('<8sII')
+_CHUNK_ROWS = 1 << 20  # Rows converted per write, bounds the temporary copy
+
+
+@dataclass
+class SavedModel:
+    Q: np.ndarray  # np.memmap when opened with mmap=True
+    grid_size: int
+    treasure_pos: int
+    treasure_reward: float
+    step_reward: float
+    start_state: int
+    trap_pos: np.ndarray
+    trap_penalty: np.ndarray
+    walls: Optional[np.ndarray] = None
+    version: int = FORMAT_VERSION
+
+    @property
+    def layout(self):
+        return MazeLayout(self.grid_size, self.trap_pos, self.trap_penalty, self.treasure_pos,
+                          start_state=self.start_state, walls=self.walls)
+
+    def build_env(self):
+        return MazeEnv.from_layout(self.layout, self.treasure_reward, step_reward=self.step_reward)
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def save_model(path, Q, env, dtype='float32'):
+    """Write Q and env's layout to path, storing the table as dtype"""
+    if dtype not in Q_DTYPES:
+        raise ValueError(f"Unsupported Q-table dtype '{dtype}', expected one of {Q_DTYPES}")
+    if Q.shape != (env.num_states, NUM_ACTIONS):
+        raise ValueError(f"Q-table shape {Q.shape} doesn't match ({env.num_states}, {NUM_ACTIONS})")
+
+    trap_pos = np.flatnonzero(env.is_trap).astype('<i8')
+    trap_penalty = env.reward[trap_pos].astype('<f8')
+    walls = env.walls if env.walls is not None else np.zeros(0, dtype=bool)
+    arrays = {'trap_pos': trap_pos, 'trap_penalty': trap_penalty, 'walls': walls}
+    specs = [('trap_pos', '<i8', trap_pos.shape), ('trap_penalty', '<f8', trap_penalty.shape),
+             ('walls', '|b1', walls.shape), ('q', np.dtype(dtype).newbyteorder('<').str, Q.shape)]
+
+    header = {
+        'grid_size': env.grid_size,
+        'treasure_pos': int(env.treasure_pos),
+        'treasure_reward': float(env.treasure_reward),
+        'step_reward': float(env.step_reward),
+        'start_state': int(env.start_state),
+        'sections': {},
+    }
+    # Offsets depend on the header length, which depends on the offsets; iterate until stable
+    header_len = 0
+    while True:
+        offset = _align(_PREFIX.size + header_len)
+        for name, section_dtype, shape in specs:
+            header['sections'][name] = {'offset': offset, 'dtype': section_dtype, 'shape': list(shape)}
+            offset = _align(offset + int(np.prod(shape)) * np.dtype(section_dtype).itemsize)
+        encoded = json.dumps(header, sort_keys=True).encode('utf-8')
+        if len(encoded) == header_len:
+            break
+        header_len = len(encoded)
+
+    with open(path, 'wb') as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(encoded)))
+        f.write(encoded)
+        for name, section_dtype, _ in specs:
+            f.seek(header['sections'][name]['offset'])
+            if name == 'q':
+                for start in range(0, Q.shape[0], _CHUNK_ROWS):
+                    f.write(np.ascontiguousarray(Q[start:start + _CHUNK_ROWS], dtype=section_dtype).tobytes())
+            else:
+                f.write(np.ascontiguousarray(arrays[name]).tobytes())
+        f.truncate(offset)
+
+
+def read_header(path):
+    """Return (version, header dict) after validating the magic"""
+    with open(path, 'rb') as f:
+        prefix = f.read(_PREFIX.size)
+        if len(prefix) < _PREFIX.size:
+            raise ValueError(f"{path} is too short to be a saved maze model")
+        magic, version, header_len = _PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a saved maze model")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"{path} uses model format version {version}; "
+                             f"this version reads up to {FORMAT_VERSION}")
+        header = json.loads(f.read(header_len).decode('utf-8'))
+    return version, header
+
+
+def load_model(path, mmap=True, mode='r'):
+    """Open a saved model; with mmap the Q-table is a lazily paged np.memmap (mode 'r' or 'r+')"""
+    version, header = read_header(path)
+    sections = header['sections']
+
+    def section(name, lazy):
+        spec = sections[name]
+        shape = tuple(spec['shape'])
+        if lazy:
+            if int(np.prod(shape)) == 0:
+                return np.zeros(shape, dtype=spec['dtype'])
+            return np.memmap(path, dtype=spec['dtype'], mode=mode, offset=spec['offset'], shape=shape)
+        with open(path, 'rb') as f:
+            f.seek(spec['offset'])
+            return np.fromfile(f, dtype=spec['dtype'], count=int(np.prod(shape))).reshape(shape)
+
+    return SavedModel(
+        Q=section('q', mmap),
+        grid_size=header['grid_size'],
+        treasure_pos=header['treasure_pos'],
+        treasure_reward=header['treasure_reward'],
+        step_reward=header['step_reward'],
+        start_state=header['start_state'],
+        trap_pos=section('trap_pos', False),
+        trap_penalty=section('trap_penalty', False),
+        walls=section('walls', False) if 'walls' in sections and sections['walls']['shape'][0] else None,
+        version=version,
+    )
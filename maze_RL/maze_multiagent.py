@@ -0,0 +1,242 @@
+"""Several agents training at the same time on one maze, in worker processes
+
+    python maze_RL/maze_multiagent.py --grid-size 32 --num-traps 100 --agents 4 --mode shared --episodes 20000
+    python maze_RL/maze_multiagent.py --grid-size 32 --num-traps 100 --episodes 20000 --scaling 8
+
+Modes:
+
+    independent  every agent learns its own Q-table
+    shared       every agent updates one Q-table, Hogwild-style: without locks, concurrent
+                 writes to the same entry can occasionally lose an update; with lock_stripes,
+                 each write holds a per-state spinlock (striped over lock_stripes locks).
+                 Only the SHARED_ALGORITHMS, whose whole learned state is that one table,
+                 can share it.
+
+Q-tables and locks live in multiprocessing.shared_memory, as in maze_sweep, so only each
+agent's summary row crosses the process boundary. Agents get independent seeds spawned
+from config.seed, and config.episodes is per agent.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from multiprocessing import shared_memory
+from typing import List
+
+import numpy as np
+
+from maze_algorithms import HAVE_NUMBA
+from maze_engine import WARM_START_SOLVERS, TrainingConfig, build_env, make_layout, train
+from maze_env import NUM_ACTIONS, MazeEnv
+from maze_layouts import LAYOUT_KINDS, MazeLayout
+
+MODES = ('independent', 'shared')
+# Double Q's second table and the planning algorithms' models would stay private to each agent
+SHARED_ALGORITHMS = ('q_learning', 'sarsa', 'expected_sarsa', 'q_lambda')
+
+
+@dataclass
+class AgentResult:
+    agent: int
+    seed: int
+    episodes: int
+    steps: int
+    success_rate: float
+    trap_rate: float
+    avg_reward: float
+    avg_steps: float
+    training_time: float
+    finished: float  # time.time() when the agent's training loop ended
+
+
+@dataclass
+class MultiAgentResult:
+    Qs: List[np.ndarray]  # One table per agent, or the single shared table
+    env: MazeEnv
+    layout: MazeLayout
+    mode: str
+    agents: List[AgentResult]
+    wall_time: float  # From the first agent's training loop starting to the last one ending
+
+    @property
+    def total_steps(self):
+        return sum(agent.steps for agent in self.agents)
+
+    @property
+    def steps_per_sec(self):
+        return self.total_steps / self.wall_time if self.wall_time > 0 else 0.0
+
+    def summary(self):
+        lines = [f"{len(self.agents)} agents ({self.mode} Q) trained in {self.wall_time:.2f} seconds, "
+                 f"{self.steps_per_sec:,.0f} steps/s"]
+        for agent in self.agents:
+            lines.append(f"Agent {agent.agent}: success {agent.success_rate:.1f}%, traps {agent.trap_rate:.1f}%, "
+                         f"reward {agent.avg_reward:.1f}, steps {agent.avg_steps:.1f}")
+        return "\n".join(lines)
+
+
+def run_agent(config, layout, agent, q_name, lock_name, lock_stripes):
+    """Worker: train one agent into a shared-memory Q-table and return its AgentResult"""
+    shm = shared_memory.SharedMemory(name=q_name)
+    lock_shm = shared_memory.SharedMemory(name=lock_name) if lock_name else None
+    try:
+        Q = np.ndarray((layout.num_states, NUM_ACTIONS), dtype=np.float64, buffer=shm.buf)
+        locks = np.ndarray(lock_stripes, dtype=np.int64, buffer=lock_shm.buf) if lock_shm else None
+        result = train(config, layout=layout, Q=Q, locks=locks)
+        row = AgentResult(
+            agent=agent,
+            seed=config.seed,
+            episodes=result.episodes,
+            steps=result.total_steps,
+            success_rate=result.success_rate,
+            trap_rate=result.trap_rate,
+            avg_reward=result.avg_reward,
+            avg_steps=result.avg_steps,
+            training_time=result.training_time,
+            finished=time.time(),
+        )
+        # Drop every view onto the segments before closing them
+        del Q, locks, result
+    finally:
+        shm.close()
+        if lock_shm is not None:
+            lock_shm.close()
+    return row
+
+
+def train_agents(config: TrainingConfig, layout=None, agents=2, mode='independent', workers=None, lock_stripes=0,
+                 Q=None):
+    """Train agents concurrently on one layout (default make_layout(config)); returns a MultiAgentResult
+
+    workers defaults to one process per agent, up to the number of cores. lock_stripes > 0
+    (shared mode, q_learning, needs Numba for its atomics) guards every Q write with a spinlock.
+    Every table starts as a copy of Q if given, else zeros (or config.warm_start's solution).
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode '{mode}', expected one of {MODES}")
+    if agents < 1:
+        raise ValueError("Need at least one agent")
+    if config.q_table != 'dense':
+        raise ValueError("Multi-agent training needs a dense Q-table")
+    if mode == 'shared' and config.algorithm not in SHARED_ALGORITHMS:
+        raise ValueError(f"Shared mode needs a single-table algorithm, one of {SHARED_ALGORITHMS}")
+    if lock_stripes:
+        if mode != 'shared' or config.algorithm != 'q_learning':
+            raise ValueError("Striped locking applies to shared-mode q_learning only")
+        if not HAVE_NUMBA:
+            raise ValueError("Striped locking needs Numba for its atomic compare-and-swap")
+    if layout is None:
+        layout = make_layout(config)
+    env = build_env(config, layout)
+
+    initial_Q = np.zeros((env.num_states, NUM_ACTIONS)) if Q is None else np.array(Q, dtype=np.float64)
+    if initial_Q.shape != (env.num_states, NUM_ACTIONS):
+        raise ValueError(f"Q-table shape {initial_Q.shape} doesn't match ({env.num_states}, {NUM_ACTIONS})")
+    if config.warm_start:
+        # Solve once here rather than have every agent overwrite the table it shares
+        if config.warm_start not in WARM_START_SOLVERS:
+            raise ValueError(f"Unknown warm start '{config.warm_start}', expected one of {sorted(WARM_START_SOLVERS)}")
+        initial_Q = WARM_START_SOLVERS[config.warm_start](env, config.gamma).Q
+    seeds = [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(config.seed).spawn(agents)]
+    agent_configs = [replace(config, seed=seed, warm_start=None, episode_history=False, metrics_file=None,
+                             profile=False) for seed in seeds]
+
+    segments = []
+    try:
+        for _ in range(1 if mode == 'shared' else agents):
+            shm = shared_memory.SharedMemory(create=True, size=initial_Q.nbytes)
+            segments.append(shm)
+            np.ndarray(initial_Q.shape, dtype=np.float64, buffer=shm.buf)[:] = initial_Q
+        lock_shm = None
+        if lock_stripes:
+            lock_shm = shared_memory.SharedMemory(create=True, size=lock_stripes * 8)
+            segments.append(lock_shm)
+            np.ndarray(lock_stripes, dtype=np.int64, buffer=lock_shm.buf)[:] = 0
+
+        workers = workers or min(agents, os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_agent, agent_configs[agent], layout, agent,
+                                   segments[0 if mode == 'shared' else agent].name,
+                                   lock_shm.name if lock_shm else None, lock_stripes)
+                       for agent in range(agents)]
+            rows = [future.result() for future in futures]
+
+        tables = segments[:1] if mode == 'shared' else segments[:agents]
+        Qs = [np.ndarray(initial_Q.shape, dtype=np.float64, buffer=shm.buf).copy() for shm in tables]
+    finally:
+        for shm in segments:
+            shm.close()
+            shm.unlink()
+
+    wall_time = max(row.finished for row in rows) - min(row.finished - row.training_time for row in rows)
+    return MultiAgentResult(Qs=Qs, env=env, layout=layout, mode=mode, agents=rows, wall_time=wall_time)
+
+
+def scaling_report(config, max_agents, layout=None, mode='shared', lock_stripes=0, log=print):
+    """Aggregate steps/s with 1, 2, 4, ... max_agents agents on as many processes
+
+    Every agent runs config.episodes episodes, so the ideal is a constant time per run;
+    efficiency is the speedup over one agent divided by the agent count. Returns the rows.
+    """
+    if layout is None:
+        layout = make_layout(config)
+    counts = sorted({2 ** i for i in range(max_agents.bit_length()) if 2 ** i <= max_agents} | {max_agents})
+    rows = []
+    log(f"{'agents':>6} {'wall s':>8} {'steps/s':>12} {'speedup':>8} {'efficiency':>10} {'success':>8}")
+    for agents in counts:
+        result = train_agents(config, layout, agents=agents, mode=mode, workers=agents, lock_stripes=lock_stripes)
+        base = rows[0]['steps_per_sec'] if rows else result.steps_per_sec
+        speedup = result.steps_per_sec / base
+        row = {
+            'agents': agents,
+            'wall_time': result.wall_time,
+            'steps_per_sec': result.steps_per_sec,
+            'speedup': speedup,
+            'efficiency': speedup / agents,
+            'success_rate': float(np.mean([agent.success_rate for agent in result.agents])),
+        }
+        rows.append(row)
+        log(f"{agents:>6} {row['wall_time']:>8.2f} {row['steps_per_sec']:>12,.0f} {speedup:>8.2f} "
+            f"{row['efficiency']:>10.0%} {row['success_rate']:>7.1f}%")
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train several agents at once on one maze")
+    defaults = TrainingConfig()
+    parser.add_argument('--grid-size', type=int, default=defaults.grid_size)
+    parser.add_argument('--num-traps', type=int, default=defaults.num_traps)
+    parser.add_argument('--layout', choices=LAYOUT_KINDS, default=defaults.layout)
+    parser.add_argument('--algorithm', default=defaults.algorithm)
+    parser.add_argument('--alpha', type=float, default=defaults.alpha)
+    parser.add_argument('--gamma', type=float, default=defaults.gamma)
+    parser.add_argument('--epsilon', type=float, default=defaults.epsilon)
+    parser.add_argument('--episodes', type=int, default=defaults.episodes, help="Episodes per agent")
+    parser.add_argument('--max-steps', type=int, default=defaults.max_steps)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--agents', type=int, default=2)
+    parser.add_argument('--mode', choices=MODES, default='independent')
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: one per agent)")
+    parser.add_argument('--lock-stripes', type=int, default=0,
+                        help="Per-state spinlocks for shared mode (0: lock-free Hogwild)")
+    parser.add_argument('--scaling', type=int, metavar='N',
+                        help="Report throughput and scaling efficiency from 1 to N agents instead")
+    args = parser.parse_args(argv)
+
+    options = {'agents', 'mode', 'workers', 'lock_stripes', 'scaling'}
+    config = TrainingConfig(**{name: value for name, value in vars(args).items() if name not in options})
+    try:
+        if args.scaling:
+            scaling_report(config, args.scaling, mode=args.mode, lock_stripes=args.lock_stripes)
+            return
+        result = train_agents(config, agents=args.agents, mode=args.mode, workers=args.workers,
+                              lock_stripes=args.lock_stripes)
+    except ValueError as e:
+        parser.error(str(e))
+    print(result.summary())
+    return result
+
+
+if __name__ == "__main__":
+    main()
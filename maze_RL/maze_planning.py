@@ -0,0 +1,241 @@
+"""Model-based planning kernels: Dyna-Q and prioritized sweeping
+
+Both learn a model of the (deterministic) maze from real transitions and replay it,
+so each expensive real step feeds many cheap backups. The model is a flat array
+indexed by state * NUM_ACTIONS + action holding the observed next state (-1 while
+unseen); rewards come from env.reward since they only depend on the state entered.
+
+Dyna-Q replays planning_steps uniformly sampled observed transitions after every real
+step. Prioritized sweeping keeps a max-heap of state-action pairs keyed by the size of
+their pending update, with a position index for O(log n) increase-key, and follows a
+predecessor index backwards from every state whose value changes, so the treasure's
+value spreads back along the maze instead of waiting to be stumbled upon.
+
+The kernels take the maze_algorithms signature followed by the extra arguments from
+PlanningModel.kernel_args().
+"""
+import numpy as np
+
+from maze_algorithms import epsilon_greedy, njit
+from maze_env import NUM_ACTIONS
+
+# Slots of PlanningModel.counts
+OBSERVED, QUEUED, BACKUPS = range(3)
+
+
+class PlanningModel:
+    """Learned transition model and planning queues, kept across kernel calls"""
+
+    def __init__(self, num_states, prioritized=False):
+        size = num_states * NUM_ACTIONS
+        self.next_state = np.full(size, -1, dtype=np.int64)
+        self.observed = np.empty(size, dtype=np.int64)  # Pairs seen so far, in discovery order
+        self.counts = np.zeros(3, dtype=np.int64)  # Observed pairs, queued pairs, planning backups
+        if prioritized:
+            # Predecessor lists as linked lists: pred_head[s] -> pair -> pred_next[pair] -> ... -> -1
+            self.pred_head = np.full(num_states, -1, dtype=np.int64)
+            self.pred_next = np.full(size, -1, dtype=np.int64)
+            self.heap_priority = np.empty(size, dtype=np.float64)
+            self.heap_items = np.empty(size, dtype=np.int64)
+            self.heap_position = np.full(size, -1, dtype=np.int64)
+        else:
+            self.pred_head = self.pred_next = np.zeros(0, dtype=np.int64)
+            self.heap_priority = np.zeros(0, dtype=np.float64)
+            self.heap_items = self.heap_position = np.zeros(0, dtype=np.int64)
+
+    @property
+    def planning_backups(self):
+        return int(self.counts[BACKUPS])
+
+    def kernel_args(self, planning_steps, priority_threshold):
+        return (planning_steps, priority_threshold, self.next_state, self.observed, self.pred_head,
+                self.pred_next, self.heap_priority, self.heap_items, self.heap_position, self.counts)
+
+
+@njit(cache=True)
+def record_transition(pair, new_state, model_next, observed, pred_head, pred_next, counts):
+    """Add a newly seen (state, action) -> new_state transition to the model"""
+    if model_next[pair] >= 0:
+        return
+    model_next[pair] = new_state
+    observed[counts[OBSERVED]] = pair
+    counts[OBSERVED] += 1
+    if pred_next.shape[0]:
+        pred_next[pair] = pred_head[new_state]
+        pred_head[new_state] = pair
+
+
+@njit(cache=True)
+def heap_push(pair, priority, heap_priority, heap_items, heap_position, counts):
+    """Queue pair with priority, or raise its priority if it's already queued lower"""
+    i = heap_position[pair]
+    if i >= 0:
+        if priority <= heap_priority[i]:
+            return
+    else:
+        i = counts[QUEUED]
+        counts[QUEUED] += 1
+    while i > 0:
+        parent = (i - 1) // 2
+        if heap_priority[parent] >= priority:
+            break
+        heap_priority[i] = heap_priority[parent]
+        heap_items[i] = heap_items[parent]
+        heap_position[heap_items[i]] = i
+        i = parent
+    heap_priority[i] = priority
+    heap_items[i] = pair
+    heap_position[pair] = i
+
+
+@njit(cache=True)
+def heap_pop(heap_priority, heap_items, heap_position, counts):
+    """Remove and return the queued pair with the highest priority"""
+    top = heap_items[0]
+    heap_position[top] = -1
+    size = counts[QUEUED] - 1
+    counts[QUEUED] = size
+    if size > 0:
+        pair = heap_items[size]
+        priority = heap_priority[size]
+        i = 0
+        while True:
+            child = 2 * i + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap_priority[child + 1] > heap_priority[child]:
+                child += 1
+            if heap_priority[child] <= priority:
+                break
+            heap_priority[i] = heap_priority[child]
+            heap_items[i] = heap_items[child]
+            heap_position[heap_items[i]] = i
+            i = child
+        heap_priority[i] = priority
+        heap_items[i] = pair
+        heap_position[pair] = i
+    return top
+
+
+@njit(cache=True)
+def dyna_q(rng, Q, Q2, next_state, reward, is_trap, start_state, treasure_pos,
+           alpha, gamma, epsilon, lam, max_steps,
+           episode_rewards, episode_steps, succeeded, trapped, visits, dirty, track,
+           planning_steps, priority_threshold, model_next, observed, pred_head, pred_next,
+           heap_priority, heap_items, heap_position, counts):
+    """Q-learning plus planning_steps replayed model transitions after every real step"""
+    for episode in range(episode_rewards.shape[0]):
+        state = start_state
+        done = False
+        total = 0.0
+        steps = 0
+        hit_trap = False
+        while not done and steps < max_steps:
+            # Phase: action selection
+            action = epsilon_greedy(rng, Q[state], epsilon)
+            # Phase: move
+            new_state = next_state[state, action]
+            # Phase: reward
+            r = reward[new_state]
+            done = new_state == treasure_pos
+            if is_trap[new_state]:
+                hit_trap = True
+
+            # Phase: Q update
+            Q[state, action] += alpha * (r + gamma * np.max(Q[new_state]) - Q[state, action])
+            record_transition(state * NUM_ACTIONS + action, new_state, model_next, observed,
+                              pred_head, pred_next, counts)
+            if track:
+                visits[state] += 1
+                dirty[state] = True
+
+            # Phase: planning
+            for _ in range(planning_steps):
+                pair = observed[rng.integers(0, counts[OBSERVED])]
+                s, a = pair // NUM_ACTIONS, pair % NUM_ACTIONS
+                s_next = model_next[pair]
+                Q[s, a] += alpha * (reward[s_next] + gamma * np.max(Q[s_next]) - Q[s, a])
+                if track:
+                    dirty[s] = True
+            counts[BACKUPS] += planning_steps
+
+            # Phase: other
+            total += r
+            state = new_state
+            steps += 1
+        episode_rewards[episode] = total
+        episode_steps[episode] = steps
+        succeeded[episode] = done
+        trapped[episode] = hit_trap
+
+
+@njit(cache=True)
+def prioritized_sweeping(rng, Q, Q2, next_state, reward, is_trap, start_state, treasure_pos,
+                         alpha, gamma, epsilon, lam, max_steps,
+                         episode_rewards, episode_steps, succeeded, trapped, visits, dirty, track,
+                         planning_steps, priority_threshold, model_next, observed, pred_head, pred_next,
+                         heap_priority, heap_items, heap_position, counts):
+    """Queue each real transition by its TD error, then back up the largest errors first
+
+    After each backup of (s, a), every known predecessor pair leading into s is queued
+    with its own TD error, so changes propagate backwards through the model.
+    """
+    for episode in range(episode_rewards.shape[0]):
+        state = start_state
+        done = False
+        total = 0.0
+        steps = 0
+        hit_trap = False
+        while not done and steps < max_steps:
+            # Phase: action selection
+            action = epsilon_greedy(rng, Q[state], epsilon)
+            # Phase: move
+            new_state = next_state[state, action]
+            # Phase: reward
+            r = reward[new_state]
+            done = new_state == treasure_pos
+            if is_trap[new_state]:
+                hit_trap = True
+
+            # Phase: planning
+            pair = state * NUM_ACTIONS + action
+            record_transition(pair, new_state, model_next, observed, pred_head, pred_next, counts)
+            priority = abs(r + gamma * np.max(Q[new_state]) - Q[state, action])
+            if priority > priority_threshold:
+                heap_push(pair, priority, heap_priority, heap_items, heap_position, counts)
+            if track:
+                visits[state] += 1
+
+            for _ in range(planning_steps):
+                if counts[QUEUED] == 0:
+                    break
+                pair = heap_pop(heap_priority, heap_items, heap_position, counts)
+                s, a = pair // NUM_ACTIONS, pair % NUM_ACTIONS
+                s_next = model_next[pair]
+                Q[s, a] += alpha * (reward[s_next] + gamma * np.max(Q[s_next]) - Q[s, a])
+                counts[BACKUPS] += 1
+                if track:
+                    dirty[s] = True
+
+                value = reward[s] + gamma * np.max(Q[s])
+                predecessor = pred_head[s]
+                while predecessor >= 0:
+                    priority = abs(value - Q[predecessor // NUM_ACTIONS, predecessor % NUM_ACTIONS])
+                    if priority > priority_threshold:
+                        heap_push(predecessor, priority, heap_priority, heap_items, heap_position, counts)
+                    predecessor = pred_next[predecessor]
+
+            # Phase: other
+            total += r
+            state = new_state
+            steps += 1
+        episode_rewards[episode] = total
+        episode_steps[episode] = steps
+        succeeded[episode] = done
+        trapped[episode] = hit_trap
+
+
+PLANNING_ALGORITHMS = {
+    'dyna_q': dyna_q,
+    'prioritized_sweeping': prioritized_sweeping,
+}
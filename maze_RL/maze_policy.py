@@ -0,0 +1,173 @@
+"""Greedy-policy index for batch route queries against a trained Q-table
+
+PolicyIndex takes the greedy action of every state in one vectorized argmax and turns
+it into a successor array. One pass with memoized path compression then resolves every
+state's route at once: whether following the policy reaches the treasure, stops at a
+dead end (a state whose greedy move doesn't move, next_state == state) or cycles, and
+how many states the route visits. After that, routes from any batch of start states are
+read off by stepping the successor array for the whole batch together.
+
+Routes follow MazeRL.get_optimal_path: they include the treasure when reached, end at
+a dead-end state, and stop before revisiting a state on a loop.
+
+The index holds a few arrays per state, so it only suits dense tables of moderate size
+(see indexable). walk_route finds the same route one greedy step at a time, for a
+SparseQTable, an ImplicitMazeEnv or any grid above MAX_INDEX_STATES.
+
+    index = PolicyIndex(env, Q)
+    index.path(env.start_state)
+    index.paths([0, 17, 42])
+    index.summary()  # {'goal': ..., 'dead_end': ..., 'loop': ...}
+"""
+import numpy as np
+
+from maze_algorithms import njit
+from maze_sparse import ImplicitMazeEnv, SparseQTable
+
+GOAL, DEAD_END, LOOP = range(3)
+OUTCOMES = ('goal', 'dead_end', 'loop')
+MAX_INDEX_STATES = 1 << 22  # About 100 MB of index arrays; larger grids walk routes instead
+
+_UNSEEN, _ON_STACK, _DONE = range(3)
+
+
+@njit(cache=True)
+def resolve_routes(successor, outcome, length, status):
+    """Fill outcome/length for every state not yet _DONE, visiting each state once
+
+    Absorbing states (treasure, dead ends) must already be _DONE with length 1. Each walk
+    pushes unseen states until it meets a resolved one, whose answer is then copied back
+    along the walk, or one on its own stack, which closes a loop.
+    """
+    num_states = successor.shape[0]
+    stack = np.empty(num_states, dtype=np.int64)
+    position = np.empty(num_states, dtype=np.int64)
+    for start in range(num_states):
+        if status[start] == _DONE:
+            continue
+        top = 0
+        state = start
+        while status[state] == _UNSEEN:
+            status[state] = _ON_STACK
+            position[state] = top
+            stack[top] = state
+            top += 1
+            state = successor[state]
+        if status[state] == _ON_STACK:
+            # Every state on the cycle visits the whole cycle before repeating
+            first = position[state]
+            for i in range(first, top):
+                member = stack[i]
+                outcome[member] = LOOP
+                length[member] = top - first
+                status[member] = _DONE
+            top = first
+        for i in range(top - 1, -1, -1):
+            member = stack[i]
+            following = successor[member]
+            outcome[member] = outcome[following]
+            length[member] = length[following] + 1
+            status[member] = _DONE
+
+
+def indexable(env, Q):
+    """Whether PolicyIndex can take Q on env: dense tables with at most MAX_INDEX_STATES states"""
+    return (not isinstance(Q, SparseQTable) and not isinstance(env, ImplicitMazeEnv)
+            and env.num_states <= MAX_INDEX_STATES)
+
+
+def walk_route(env, Q, start):
+    """(route, outcome) from start, following Q's greedy action one step at a time
+
+    The route is the one PolicyIndex.path gives, at a cost of the route's length and
+    nothing per state, so it works on any table and environment that can be indexed by state.
+    """
+    route, visited, state = [], set(), int(start)
+    while state != env.treasure_pos and state not in visited:
+        visited.add(state)
+        route.append(state)
+        next_state = int(env.next_state[state, int(np.argmax(Q[state]))])
+        if next_state == state:
+            return route, DEAD_END
+        state = next_state
+    if state == env.treasure_pos:
+        route.append(state)
+        return route, GOAL
+    return route, LOOP
+
+
+class PolicyIndex:
+    """Greedy actions, successors and resolved routes of Q on a dense MazeEnv"""
+
+    def __init__(self, env, Q):
+        self.env = env
+        states = np.arange(env.num_states)
+        self.actions = np.asarray(Q).argmax(axis=1)
+        self.successor = env.next_state[states, self.actions]
+        # States whose greedy move doesn't move; the treasure ends routes instead
+        self.stuck = self.successor == states
+        self.stuck[env.treasure_pos] = False
+        self.successor[env.treasure_pos] = env.treasure_pos
+
+        self.outcome = np.empty(env.num_states, dtype=np.int8)
+        self.length = np.zeros(env.num_states, dtype=np.int64)  # States on each state's route
+        status = np.full(env.num_states, _UNSEEN, dtype=np.int8)
+        self.outcome[self.stuck] = DEAD_END
+        self.outcome[env.treasure_pos] = GOAL
+        absorbing = self.stuck.copy()
+        absorbing[env.treasure_pos] = True
+        self.length[absorbing] = 1
+        status[absorbing] = _DONE
+        resolve_routes(self.successor, self.outcome, self.length, status)
+
+    @property
+    def reaches_goal(self):
+        return self.outcome == GOAL
+
+    @property
+    def dead_ends(self):
+        """States whose route ends at a dead end"""
+        return self.outcome == DEAD_END
+
+    @property
+    def loops(self):
+        """States whose route runs into a cycle"""
+        return self.outcome == LOOP
+
+    def summary(self):
+        """Number of states per route outcome"""
+        counts = np.bincount(self.outcome, minlength=len(OUTCOMES))
+        return dict(zip(OUTCOMES, counts.tolist()))
+
+    def paths(self, starts):
+        """Route from each start state, as a list of state arrays (views into one flat array)
+
+        All routes advance together, one successor lookup per step for the routes still
+        running, so the work is the total route length.
+        """
+        starts = np.asarray(starts, dtype=np.int64).ravel()
+        if len(starts) == 0:
+            return []
+        lengths = self.length[starts]
+        offsets = np.zeros(len(starts) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        flat = np.empty(offsets[-1], dtype=np.int64)
+        # Longest routes first, so the routes still running at each step are a prefix
+        order = np.argsort(-lengths, kind='stable')
+        running = np.searchsorted(-lengths[order], -np.arange(lengths.max()), side='left')  # Routes longer than step
+        positions = offsets[order]
+        state = starts[order]
+        for step, count in enumerate(running):
+            flat[positions[:count] + step] = state[:count]
+            state = self.successor[state[:count]]
+        return np.split(flat, offsets[1:-1])
+
+    def path(self, start):
+        """Route from one start state, as a list of ints"""
+        length = int(self.length[start])
+        route = []
+        state = int(start)
+        for _ in range(length):
+            route.append(state)
+            state = int(self.successor[state])
+        return route
@@ -0,0 +1,298 @@
+"""Per-phase timers and a sampling profiler for finding where training time goes
+
+PhaseTimer accumulates wall time and call counts per named phase plus plain counters;
+train() wraps each part of its loop (kernel blocks, metrics, progress callbacks, pauses)
+in timer.phase(name). When profiling is off it gets NULL_TIMER instead, whose phase()
+hands back one shared no-op context, so the disabled cost is an attribute lookup per block
+of episodes and nothing per step.
+
+The kernels fuse action selection, the move, the reward lookup and the Q update into
+compiled code the timers can't see into. LineProfiler covers that for a sample window of
+episodes: train() runs the kernel and its helpers interpreted (see interpreted()) and the
+profiler times each kernel line through sys.settrace, subtracting the tracer's own
+calibrated cost. The kernels mark their per-step phases with '# Phase: <name>' comments,
+so each line's time also adds up into its phase (see line_phase). A background sampling
+thread can't do this under the GIL, since it only gets to look at call and loop
+boundaries. Interpreted costs aren't compiled costs, so read the shares as where the work
+is, not exact ratios.
+
+Compiling the kernels is a one-off cost that would swamp the shares of a short run, so
+summary() reports the SEPARATE_PHASES ('compile') apart from the shares.
+
+    timer = PhaseTimer()
+    with timer.phase('kernel'):
+        ...
+    print(format_profile(timer.summary()))
+"""
+import linecache
+import os
+import sys
+import time
+import types
+from collections import Counter
+from contextlib import nullcontext
+from functools import lru_cache
+
+SEPARATE_PHASES = ('compile',)  # Reported on their own, outside the share total
+PHASE_MARKER = '# Phase:'
+
+
+class _Phase:
+    __slots__ = ('timer', 'name', 'start')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.add(self.name, time.perf_counter() - self.start)
+
+
+class PhaseTimer:
+    """Wall time and call count per named phase, and named event counters"""
+
+    enabled = True
+
+    def __init__(self):
+        self.seconds = {}
+        self.calls = {}
+        self.counters = {}
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def add(self, name, seconds, calls=1):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + calls
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def summary(self):
+        """{'phases': {name: {seconds, calls, share}}, 'separate': {name: {seconds, calls}}, 'counters': {...}}
+
+        Shares are of the total time in 'phases'; the SEPARATE_PHASES go in 'separate' instead.
+        """
+        shared = {name: seconds for name, seconds in self.seconds.items() if name not in SEPARATE_PHASES}
+        total = sum(shared.values())
+        phases = {name: {'seconds': seconds, 'calls': self.calls[name],
+                         'share': seconds / total * 100 if total > 0 else 0.0}
+                  for name, seconds in sorted(shared.items(), key=lambda item: -item[1])}
+        separate = {name: {'seconds': seconds, 'calls': self.calls[name]}
+                    for name, seconds in self.seconds.items() if name in SEPARATE_PHASES}
+        return {'phases': phases, 'separate': separate, 'counters': dict(self.counters)}
+
+
+class NullTimer:
+    """PhaseTimer stand-in that records nothing"""
+
+    enabled = False
+    _context = nullcontext()
+
+    def phase(self, name):
+        return self._context
+
+    def add(self, name, seconds, calls=1):
+        pass
+
+    def count(self, name, n=1):
+        pass
+
+    def summary(self):
+        return {'phases': {}, 'separate': {}, 'counters': {}}
+
+
+NULL_TIMER = NullTimer()
+
+
+@lru_cache(maxsize=None)
+def line_phase(filename, lineno):
+    """The step phase a source line is marked with, or None if it isn't in a marked section
+
+    A line belongs to the phase named by a '# Phase: <name>' comment at its end, or else by
+    the nearest '# Phase: <name>' comment line above it in the same function.
+    """
+    line = linecache.getline(filename, lineno)
+    if PHASE_MARKER in line:
+        return line.split(PHASE_MARKER, 1)[1].strip()
+    for number in range(lineno - 1, 0, -1):
+        line = linecache.getline(filename, number).strip()
+        if line.startswith(PHASE_MARKER):
+            return line[len(PHASE_MARKER):].strip()
+        if line.startswith('def '):
+            break
+    return None
+
+
+def interpreted(function, _namespaces=None):
+    """A plain-Python copy of a compiled (Numba) function that also calls its helpers interpreted
+
+    Calling a compiled helper from interpreted code costs far more than the helper's work,
+    so the copy runs with a copy of its module's globals in which every compiled function is
+    swapped for its interpreted version, recursively. Plain functions come back unchanged.
+    """
+    python_function = getattr(function, 'py_func', None)
+    if python_function is None:
+        return function
+    namespaces = {} if _namespaces is None else _namespaces
+    original = python_function.__globals__
+    namespace = namespaces.get(id(original))
+    if namespace is None:
+        namespace = namespaces[id(original)] = dict(original)
+        for name, value in original.items():
+            if hasattr(value, 'py_func'):
+                namespace[name] = interpreted(value, namespaces)
+    return types.FunctionType(python_function.__code__, namespace, python_function.__name__,
+                              python_function.__defaults__, python_function.__closure__)
+
+
+class LineProfiler:
+    """Wall time per source line of the given functions, while started
+
+    Only the functions' own lines are timed, so time spent in anything they call (NumPy,
+    helpers) lands on the calling line. Each line is also charged to its step phase (see
+    line_phase), or 'other' outside any marked section. start() and stop() may be called
+    repeatedly to time several windows into the same totals. Tracing only covers the
+    thread that calls start().
+    """
+
+    def __init__(self, functions):
+        self._codes = {getattr(function, 'py_func', function).__code__ for function in functions}
+        self.seconds = Counter()
+        self.hits = Counter()  # Trace events charged to each (code, line)
+        self.calls = Counter()  # Untimed Python calls made from each (code, line)
+        self._frames = {}
+        self._line = None
+        self._tracing = False
+        self._previous = None
+
+    def start(self):
+        if self._tracing:
+            return
+        self.line_cost, self.call_cost = tracing_overhead()
+        self._previous = sys.gettrace()
+        sys.settrace(self._trace)
+        self._tracing = True
+
+    def stop(self):
+        if not self._tracing:
+            return
+        sys.settrace(self._previous)
+        self._tracing = False
+
+    def _trace(self, frame, event, arg):
+        if frame.f_code in self._codes:
+            self._frames[frame] = frame.f_lineno, time.perf_counter()
+            return self._trace_lines
+        if self._line is not None:
+            self.calls[self._line] += 1
+        return None
+
+    def _trace_lines(self, frame, event, arg):
+        now = time.perf_counter()
+        lineno, start = self._frames[frame]
+        line = (frame.f_code, lineno)
+        self.seconds[line] += now - start
+        self.hits[line] += 1
+        if event == 'return':
+            del self._frames[frame]
+            self._line = None
+            return None
+        self._line = (frame.f_code, frame.f_lineno)
+        self._frames[frame] = frame.f_lineno, time.perf_counter()
+        return self._trace_lines
+
+    def line_seconds(self):
+        """{(code, line): seconds} with the tracer's calibrated overhead taken off"""
+        return {line: max(0.0, seconds - self.hits[line] * self.line_cost - self.calls[line] * self.call_cost)
+                for line, seconds in self.seconds.items()}
+
+    def top(self, n=10):
+        """The n most expensive lines as dicts with location, code, seconds and share (%)"""
+        seconds = self.line_seconds()
+        total = sum(seconds.values())
+        lines = []
+        for (code, lineno), line_seconds in sorted(seconds.items(), key=lambda item: -item[1])[:n]:
+            lines.append({
+                'location': f"{os.path.basename(code.co_filename)}:{lineno} {code.co_name}",
+                'code': linecache.getline(code.co_filename, lineno).strip(),
+                'seconds': line_seconds,
+                'share': line_seconds / total * 100 if total > 0 else 0.0,
+            })
+        return lines
+
+    def phase_shares(self):
+        """{phase: {seconds, share}} over all timed lines, most expensive first"""
+        phases = Counter()
+        for (code, lineno), seconds in self.line_seconds().items():
+            phases[line_phase(code.co_filename, lineno) or 'other'] += seconds
+        total = sum(phases.values())
+        return {phase: {'seconds': seconds, 'share': seconds / total * 100 if total > 0 else 0.0}
+                for phase, seconds in phases.most_common()}
+
+
+def _idle(n):
+    for _ in range(n):
+        pass
+
+
+def _nothing():
+    pass
+
+
+def _calling(n):
+    for _ in range(n):
+        _nothing()
+
+
+@lru_cache(maxsize=None)
+def tracing_overhead(n=20000):
+    """(seconds per traced line, seconds per untimed call) that LineProfiler adds, measured once"""
+    def extra(function):
+        start = time.perf_counter()
+        function(n)
+        plain = time.perf_counter() - start
+        profiler = LineProfiler([function])
+        profiler.line_cost = profiler.call_cost = 0.0
+        previous = sys.gettrace()
+        sys.settrace(profiler._trace)
+        try:
+            function(n)
+        finally:
+            sys.settrace(previous)
+        return sum(profiler.seconds.values()) - plain, sum(profiler.hits.values()), sum(profiler.calls.values())
+
+    idle, lines, _ = extra(_idle)
+    line_cost = max(0.0, idle / lines)
+    calling, lines, calls = extra(_calling)
+    return line_cost, max(0.0, (calling - line_cost * lines) / calls)
+
+
+def format_profile(profile, lines=5):
+    """Human-readable text for a profile dict as built by train() (see TrainingResult.profile)"""
+    text = []
+    counters = profile.get('counters', {})
+    for name, phase in profile.get('phases', {}).items():
+        text.append(f"{name:<10} {phase['seconds']:8.3f} s {phase['share']:5.1f}%  ({phase['calls']} calls)")
+    for name, phase in profile.get('separate', {}).items():
+        text.append(f"{name:<10} {phase['seconds']:8.3f} s  (not in shares)")
+    kernel = profile.get('phases', {}).get('kernel')
+    if kernel and counters.get('steps'):
+        text.append(f"kernel: {kernel['seconds'] / counters['steps'] * 1e9:.0f} ns/step, "
+                    f"{counters['steps'] / kernel['seconds']:,.0f} steps/s")
+    for name, phase in profile.get('gui', {}).get('phases', {}).items():
+        text.append(f"gui {name:<6} {phase['seconds'] / phase['calls'] * 1e3:8.2f} ms/call ({phase['calls']} calls)")
+    hot_lines = profile.get('lines', [])
+    if hot_lines:
+        text.append(f"Step phases (episodes {profile['sample_window'][0]}-{profile['sample_window'][1]}, "
+                    f"interpreted):")
+        for name, phase in profile.get('step_phases', {}).items():
+            text.append(f"{phase['share']:5.1f}%  {name}")
+        text.append("Hottest lines:")
+        for line in hot_lines[:lines]:
+            text.append(f"{line['share']:5.1f}%  {line['location']}: {line['code']}")
+    return "\n".join(text)
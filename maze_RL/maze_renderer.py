@@ -0,0 +1,306 @@
+"""Canvas renderer that caches the static maze as one image and draws only overlays on top
+
+The maze (background, grid lines, walls, traps) is rasterised with NumPy into a pixel buffer at
+canvas resolution and shown as a single PhotoImage item, so its cost doesn't grow with the
+number of cells or traps. Level of detail: grid lines are dropped when cells get smaller
+than MIN_GRID_LINE_CELL_PX, several cells that share a pixel are merged into one grey level
+(their trap density), and the path becomes a single polyline below MIN_ARROW_CELL_PX.
+"""
+import base64
+
+import numpy as np
+import tkinter as tk
+
+CANVAS_SIZE = 400
+MIN_GRID_LINE_CELL_PX = 4  # Smaller cells are drawn without grid lines
+MIN_ARROW_CELL_PX = 8  # Smaller cells get the path as one polyline instead of arrows
+
+BACKGROUND_RGB = (255, 255, 255)
+TRAP_RGB = (0, 0, 0)
+WALL_RGB = (128, 128, 128)
+GRID_LINE_RGB = (0, 0, 0)
+HEATMAP_LOW_RGB = (49, 54, 149)  # Lowest value / fewest visits
+HEATMAP_HIGH_RGB = (215, 48, 39)  # Highest value / most visits
+HEATMAP_MODES = ('values', 'visits')
+
+
+def block_starts(grid_size, size):
+    """First cell index covered by each of the size pixels along one axis"""
+    return (np.arange(size, dtype=np.int64) * grid_size) // size
+
+
+def cell_mean(values, starts):
+    """Mean of a (G, G) array over the pixel blocks given by starts on both axes
+
+    Uses prefix sums along the contiguous axis (transposing in between), so each axis costs
+    one cumulative sum plus a gather. When there are more pixels than cells a block is just
+    its first cell (nearest-neighbour sampling).
+    """
+    grid_size = values.shape[0]
+    ends = np.maximum(np.append(starts[1:], grid_size), starts + 1)
+    counts = (ends - starts).astype(np.float32)
+    before = np.maximum(starts - 1, 0)
+    first = starts == 0
+
+    def row_block_sums(array):
+        prefix = np.cumsum(array, axis=1, dtype=np.float32)
+        sums = np.take(prefix, ends - 1, axis=1)
+        lower = np.take(prefix, before, axis=1)
+        lower[:, first] = 0
+        sums -= lower
+        return sums
+
+    sums = row_block_sums(np.ascontiguousarray(row_block_sums(values).T)).T
+    sums /= counts[:, None]
+    sums /= counts[None, :]
+    return sums
+
+
+def grid_line_positions(grid_size, size):
+    """Pixel rows/columns of the grid lines, or None when cells are too small for them"""
+    cell_px = size / grid_size
+    if cell_px < MIN_GRID_LINE_CELL_PX:
+        return None
+    return np.minimum(np.round(np.arange(grid_size + 1) * cell_px).astype(np.int64), size - 1)
+
+
+def colour_ramp(low_rgb, high_rgb):
+    """(256, 3) uint8 palette interpolating from low_rgb to high_rgb"""
+    ramp = np.linspace(0, 1, 256, dtype=np.float32)[:, None]
+    return (np.array(low_rgb) * (1 - ramp) + np.array(high_rgb) * ramp).round().astype(np.uint8)
+
+
+def apply_palette(palette, level):
+    """Map a uint8 level image through a (256, 3) palette into an RGB buffer"""
+    pixels = np.empty(level.shape + (3,), dtype=np.uint8)
+    for channel in range(3):
+        np.take(palette[:, channel], level, out=pixels[..., channel])
+    return pixels
+
+
+def render_maze_pixels(env, size=CANVAS_SIZE):
+    """RGB uint8 buffer (size, size, 3) of the static maze"""
+    grid_size = env.grid_size
+    starts = block_starts(grid_size, size)
+    trap_density = cell_mean(env.is_trap.reshape(grid_size, grid_size), starts)
+
+    if env.walls is None:
+        # 256-level palette from background to trap colour, indexed by quantised density
+        palette = colour_ramp(BACKGROUND_RGB, TRAP_RGB)
+        pixels = apply_palette(palette, (trap_density * 255 + 0.5).astype(np.uint8))
+    else:
+        wall_density = cell_mean(env.walls.reshape(grid_size, grid_size), starts)
+        background = np.array(BACKGROUND_RGB, dtype=np.float32)
+        mixed = (background
+                 + trap_density[..., None] * (np.array(TRAP_RGB, dtype=np.float32) - background)
+                 + wall_density[..., None] * (np.array(WALL_RGB, dtype=np.float32) - background))
+        pixels = (mixed + 0.5).astype(np.uint8)
+
+    lines = grid_line_positions(grid_size, size)
+    if lines is not None:
+        pixels[lines, :] = GRID_LINE_RGB
+        pixels[:, lines] = GRID_LINE_RGB
+    return pixels
+
+
+def ppm_data(pixels):
+    """Encode an RGB buffer as base64 PPM, which tk.PhotoImage reads without extra libraries"""
+    height, width, _ = pixels.shape
+    header = f"P6 {width} {height} 255\n".encode('ascii')
+    return base64.b64encode(header + np.ascontiguousarray(pixels).tobytes())
+
+
+class MazeRenderer:
+    """Draws a MazeEnv on a Tk canvas: one cached maze image plus tagged overlay items"""
+
+    def __init__(self, canvas, size=CANVAS_SIZE, photo_image=tk.PhotoImage):
+        self.canvas = canvas
+        self.size = size
+        self.photo_image = photo_image  # Image constructor; replaceable for headless runs
+        self.env = None
+        self.image = None  # Keep a reference, Tk doesn't
+        self.image_item = None
+
+    @property
+    def cell_size(self):
+        return self.size / self.env.grid_size
+
+    def cell_center(self, state):
+        x, y = divmod(int(state), self.env.grid_size)
+        return (y + 0.5) * self.cell_size, (x + 0.5) * self.cell_size
+
+    def draw_maze(self, env, force=False):
+        """Rasterise the static maze once per layout; later calls with the same env are free
+
+        Returns True if the canvas was redrawn (which also removes every overlay).
+        """
+        if env is self.env and not force and self.image_item is not None:
+            return False
+        self.env = env
+        self.canvas.delete("all")
+
+        self.image = self.photo_image(data=ppm_data(render_maze_pixels(env, self.size)), format='PPM')
+        self.image_item = self.canvas.create_image(0, 0, image=self.image, anchor='nw', tags='maze')
+
+        # Draw treasure (simple golden circle)
+        center_x, center_y = self.cell_center(env.treasure_pos)
+        radius = max(self.cell_size * 0.3, 2)
+        self.canvas.create_oval(
+            center_x - radius, center_y - radius,
+            center_x + radius, center_y + radius,
+            fill='gold',
+            outline='orange',
+            tags='treasure'
+        )
+        return True
+
+    def clear(self, tag):
+        self.canvas.delete(tag)
+
+    def draw_path(self, path, tag='path', color='blue', clear=True, offset=0.0):
+        """Replace the overlay with this tag by arrows along path (a polyline on small cells)
+
+        clear=False adds to the overlay instead, e.g. for several agents' paths, and offset
+        shifts the path by that many pixels along both axes.
+        """
+        if clear:
+            self.canvas.delete(tag)
+        if len(path) < 2:
+            return
+
+        cell_size = self.cell_size
+        if cell_size < MIN_ARROW_CELL_PX:
+            coords = []
+            for state in path:
+                center_x, center_y = self.cell_center(state)
+                coords.extend((center_x + offset, center_y + offset))
+            self.canvas.create_line(*coords, fill=color, width=max(1, int(cell_size // 2)), tags=tag)
+            return
+
+        arrow_length = cell_size * 0.3
+        grid_size = self.env.grid_size
+        for current_state, next_state in zip(path[:-1], path[1:]):
+            center_x, center_y = self.cell_center(current_state)
+            center_x += offset
+            center_y += offset
+            delta = int(next_state) - int(current_state)
+            if delta == -grid_size:  # Up
+                end = (center_x, center_y - arrow_length)
+            elif delta == grid_size:  # Down
+                end = (center_x, center_y + arrow_length)
+            elif delta == -1:  # Left
+                end = (center_x - arrow_length, center_y)
+            else:  # Right
+                end = (center_x + arrow_length, center_y)
+            self.canvas.create_line(center_x, center_y, *end, arrow=tk.LAST, fill=color, width=2, tags=tag)
+
+
+class HeatmapView:
+    """Live overlay colouring cells by max(Q[s]) or visit count, updated from dirty states
+
+    Cells are aggregated into at most size x size blocks (one per pixel on large grids), and
+    each update only folds the changed cells into their block sums, so the cost per refresh
+    is O(changed cells + pixels) rather than O(cells). A greedy-action arrow per state is
+    drawn when cells are large enough for arrows.
+    """
+
+    def __init__(self, renderer, mode='values', show_arrows=True):
+        if mode not in HEATMAP_MODES:
+            raise ValueError(f"Unknown heatmap mode '{mode}', expected one of {HEATMAP_MODES}")
+        self.renderer = renderer
+        self.canvas = renderer.canvas
+        self.mode = mode
+        self.show_arrows = show_arrows
+        self.palette = colour_ramp(HEATMAP_LOW_RGB, HEATMAP_HIGH_RGB)
+        self.env = None
+        self.image = None
+        self.image_item = None
+        self.arrow_items = {}
+
+    def reset(self, env, Q, visits):
+        """Start over for a (new) layout and colour every cell from scratch"""
+        self.clear()
+        self.env = env
+        size = self.renderer.size
+        grid_size = env.grid_size
+
+        # Block of each cell along one axis: cells themselves on small grids, pixels on large ones
+        blocks = min(grid_size, size)
+        starts = block_starts(grid_size, blocks)
+        axis_block = np.searchsorted(starts, np.arange(grid_size), side='right') - 1
+        self.blocks = blocks
+        self.cell_block = (axis_block[:, None] * blocks + axis_block[None, :]).ravel()
+        self.block_count = np.bincount(self.cell_block, minlength=blocks * blocks).astype(np.float64)
+        self.block_sum = np.zeros(blocks * blocks)
+        self.cell_value = np.zeros(env.num_states)
+        # Block shown at each pixel (nearest-neighbour upsampling when blocks < pixels)
+        pixel_block = block_starts(blocks, size)
+        self.pixel_index = (pixel_block[:, None] * blocks + pixel_block[None, :])
+        self.lines = grid_line_positions(grid_size, size)
+
+        self.update(Q, visits, np.arange(env.num_states))
+
+    def cell_values(self, Q, visits, states):
+        if self.mode == 'values':
+            return np.asarray(Q[states]).max(axis=1)
+        return np.log1p(visits[states])
+
+    def update(self, Q, visits, states):
+        """Recolour the given states (typically ChangeTracker.collect()) and redraw the image"""
+        if self.env is None:
+            return
+        if len(states):
+            new_values = self.cell_values(Q, visits, states)
+            np.add.at(self.block_sum, self.cell_block[states], new_values - self.cell_value[states])
+            self.cell_value[states] = new_values
+            if self.show_arrows:
+                self.update_arrows(Q, states)
+        self.draw()
+
+    def draw(self):
+        means = self.block_sum / self.block_count
+        low, high = means.min(), means.max()
+        scale = 255 / (high - low) if high > low else 0.0
+        level = ((means - low) * scale + 0.5).astype(np.uint8)
+        pixels = apply_palette(self.palette, level[self.pixel_index])
+        if self.lines is not None:
+            pixels[self.lines, :] = GRID_LINE_RGB
+            pixels[:, self.lines] = GRID_LINE_RGB
+
+        self.image = self.renderer.photo_image(data=ppm_data(pixels), format='PPM')
+        if self.image_item is None:
+            self.image_item = self.canvas.create_image(0, 0, image=self.image, anchor='nw', tags='heatmap')
+            # Keep the treasure, arrows and path above the heatmap
+            self.canvas.tag_raise('treasure')
+            self.canvas.tag_raise('greedy')
+            self.canvas.tag_raise('path')
+        else:
+            self.canvas.itemconfig(self.image_item, image=self.image)
+
+    def update_arrows(self, Q, states):
+        renderer = self.renderer
+        if renderer.cell_size < MIN_ARROW_CELL_PX:
+            return
+        arrow_length = renderer.cell_size * 0.3
+        offsets = ((0, -arrow_length), (0, arrow_length), (-arrow_length, 0), (arrow_length, 0))
+        greedy = np.asarray(Q[states]).argmax(axis=1)
+        for state, action in zip(states.tolist(), greedy.tolist()):
+            if state == self.env.treasure_pos:
+                continue
+            center_x, center_y = renderer.cell_center(state)
+            dx, dy = offsets[action]
+            coords = (center_x, center_y, center_x + dx, center_y + dy)
+            item = self.arrow_items.get(state)
+            if item is None:
+                self.arrow_items[state] = self.canvas.create_line(
+                    *coords, arrow=tk.LAST, fill='white', width=1, tags='greedy')
+            else:
+                self.canvas.coords(item, *coords)
+
+    def clear(self):
+        """Remove the heatmap and arrows from the canvas"""
+        self.canvas.delete('heatmap')
+        self.canvas.delete('greedy')
+        self.image = None
+        self.image_item = None
+        self.arrow_items = {}
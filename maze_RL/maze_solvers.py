@@ -0,0 +1,125 @@
+"""Exact dynamic-programming solvers over a compiled MazeEnv
+
+The grid world is deterministic and fully known, so the optimal Q-table can be computed
+directly instead of sampled. The model matches the Q-learning update in maze_engine:
+entering s' pays reward[s'], the treasure is terminal (its row of Q stays zero) and
+traps are ordinary, non-terminal states. Everything is vectorized over states.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class SolverResult:
+    Q: np.ndarray  # (NUM_STATES, NUM_ACTIONS)
+    V: np.ndarray  # (NUM_STATES,)
+    policy: np.ndarray  # Greedy action ID per state
+    iterations: int
+    converged: bool
+
+
+def _terminal_mask(env):
+    terminal = np.zeros(env.num_states, dtype=bool)
+    terminal[env.treasure_pos] = True
+    return terminal
+
+
+def q_from_values(env, V, gamma):
+    """One-step lookahead: Q(s, a) = r(s') + gamma * V(s'), with V = 0 on the terminal state"""
+    Q = env.reward[env.next_state] + gamma * V[env.next_state]
+    Q[env.treasure_pos] = 0
+    return Q
+
+
+def value_iteration(env, gamma, tol=1e-6, max_iterations=100000, V=None):
+    """Synchronous value iteration until the largest value change drops below tol"""
+    terminal = _terminal_mask(env)
+    # Per-action contiguous columns keep the gathers cache friendly on large grids
+    next_state = [np.ascontiguousarray(env.next_state[:, a]) for a in range(env.next_state.shape[1])]
+    next_reward = [env.reward[ns] for ns in next_state]
+
+    V = np.zeros(env.num_states) if V is None else np.array(V, dtype=np.float64)
+    V[terminal] = 0
+    new_V = np.empty_like(V)
+    backup = np.empty_like(V)
+    converged = False
+    iterations = 0
+    while iterations < max_iterations:
+        iterations += 1
+        for a, (ns, r) in enumerate(zip(next_state, next_reward)):
+            out = new_V if a == 0 else backup
+            np.take(V, ns, out=out)
+            out *= gamma
+            out += r
+            if a:
+                np.maximum(new_V, backup, out=new_V)
+        new_V[terminal] = 0
+        np.subtract(new_V, V, out=backup)
+        np.abs(backup, out=backup)
+        delta = backup.max()
+        V, new_V = new_V, V
+        if delta < tol:
+            converged = True
+            break
+
+    Q = q_from_values(env, V, gamma)
+    return SolverResult(Q=Q, V=V, policy=Q.argmax(axis=1), iterations=iterations, converged=converged)
+
+
+def policy_evaluation(env, policy, gamma, tol=1e-9):
+    """Exact value of a deterministic policy by pointer doubling along its successor chain
+
+    After k rounds each state holds the discounted reward of its next 2**k steps, so
+    the cost is O(NUM_STATES * log(horizon)) with no per-state Python loops.
+    """
+    terminal = _terminal_mask(env)
+    states = np.arange(env.num_states)
+    succ = env.next_state[states, policy]
+    acc = env.reward[succ].astype(np.float64)
+    # The terminal state absorbs with zero reward
+    succ[terminal] = states[terminal]
+    acc[terminal] = 0
+
+    discount = gamma
+    bound = np.max(np.abs(acc)) if len(acc) else 0.0
+    # 64 rounds cover 2**64 steps, which also bounds the gamma == 1 case
+    for _ in range(64):
+        if discount * bound / max(1e-300, 1 - gamma) < tol:
+            break
+        acc = acc + discount * acc[succ]
+        succ = succ[succ]
+        discount *= discount
+    return acc
+
+
+def policy_iteration(env, gamma, max_iterations=1000, tol=1e-9, policy=None):
+    """Howard policy iteration: exact evaluation, greedy improvement, stop when stable"""
+    if policy is None:
+        policy = np.zeros(env.num_states, dtype=np.int64)
+    states = np.arange(env.num_states)
+    converged = False
+    iterations = 0
+    while iterations < max_iterations:
+        iterations += 1
+        V = policy_evaluation(env, policy, gamma, tol)
+        Q = q_from_values(env, V, gamma)
+        best = Q.argmax(axis=1)
+        # Only switch where the new action is strictly better, so ties can't cycle
+        improve = Q[states, best] > Q[states, policy] + tol
+        if not improve.any():
+            converged = True
+            break
+        policy = np.where(improve, best, policy)
+
+    V = policy_evaluation(env, policy, gamma, tol)
+    return SolverResult(Q=q_from_values(env, V, gamma), V=V, policy=policy,
+                        iterations=iterations, converged=converged)
+
+
+def regret(env, Q, V_star, gamma, states=None):
+    """V*(s) - V^pi(s) for the greedy policy of Q, at env.start_state or the given states"""
+    V_pi = policy_evaluation(env, np.asarray(Q).argmax(axis=1), gamma)
+    if states is None:
+        states = env.start_state
+    return V_star[states] - V_pi[states]
@@ -0,0 +1,289 @@
+"""Sparse Q-table and implicit environment for huge, mostly unvisited grids
+
+A dense (NUM_STATES, NUM_ACTIONS) Q-table and the MazeEnv transition table both grow
+with the grid, but an agent starting at state 0 with a short step limit only ever
+reaches a tiny corner of a 100k x 100k maze. SparseQTable stores rows only for states
+that have been updated, in an open-addressing hash (linear probing, power-of-two
+capacity, kept at most half full); unseen states read as a row of `default`.
+ImplicitMazeEnv computes moves arithmetically and looks rewards up in a sorted trap
+array, so neither side allocates anything per state.
+
+Both expose the indexing the dense versions do (Q[state], Q[state, action],
+env.next_state[state, action], env.reward[state], env.is_trap[state]), so code that
+steps through states one at a time, like maze_policy.walk_route, works unchanged.
+Whole-table passes (PolicyIndex, the solvers) need the dense versions.
+"""
+import numpy as np
+
+from maze_algorithms import epsilon_greedy, njit
+from maze_env import DOWN, LEFT, NUM_ACTIONS, RIGHT, UP
+
+EMPTY = -1
+MAX_LOAD = 0.5  # Grow before the hash is more than half full
+MAX_STATES = 1 << 36  # The hash below stays within int64 for states up to this
+
+
+@njit(cache=True)
+def hash_slot(state, mask):
+    h = (state ^ (state >> 17)) * 0x45D9F3B
+    return (h ^ (h >> 29)) & mask
+
+
+@njit(cache=True)
+def find_slot(keys, state):
+    """Slot holding state, or EMPTY if the state has no row"""
+    mask = keys.shape[0] - 1
+    slot = hash_slot(state, mask)
+    while keys[slot] != EMPTY:
+        if keys[slot] == state:
+            return slot
+        slot = (slot + 1) & mask
+    return EMPTY
+
+
+@njit(cache=True)
+def insert_slot(keys, values, counts, state, default):
+    """Slot holding state, adding a row of default values if it has none (the caller keeps room)"""
+    mask = keys.shape[0] - 1
+    slot = hash_slot(state, mask)
+    while keys[slot] != EMPTY:
+        if keys[slot] == state:
+            return slot
+        slot = (slot + 1) & mask
+    keys[slot] = state
+    values[slot, :] = default
+    counts[0] += 1
+    return slot
+
+
+@njit(cache=True)
+def rehash(old_keys, old_values, keys, values):
+    mask = keys.shape[0] - 1
+    for i in range(old_keys.shape[0]):
+        state = old_keys[i]
+        if state == EMPTY:
+            continue
+        slot = hash_slot(state, mask)
+        while keys[slot] != EMPTY:
+            slot = (slot + 1) & mask
+        keys[slot] = state
+        values[slot, :] = old_values[i, :]
+
+
+class SparseQTable:
+    """(num_states, NUM_ACTIONS) Q-table that only stores rows for states it has seen"""
+
+    def __init__(self, num_states, default=0.0, capacity=1024):
+        if num_states > MAX_STATES:
+            raise ValueError(f"Sparse Q-tables support up to {MAX_STATES} states")
+        self.num_states = num_states
+        self.default = float(default)
+        capacity = 1 << max(4, int(capacity - 1).bit_length())
+        self.keys = np.full(capacity, EMPTY, dtype=np.int64)
+        self.values = np.full((capacity, NUM_ACTIONS), self.default)
+        self.counts = np.zeros(1, dtype=np.int64)  # Stored rows
+
+    @property
+    def shape(self):
+        return (self.num_states, NUM_ACTIONS)
+
+    @property
+    def capacity(self):
+        return len(self.keys)
+
+    @property
+    def max_fill(self):
+        """Rows the hash can hold before it must grow"""
+        return int(self.capacity * MAX_LOAD)
+
+    @property
+    def nbytes(self):
+        return self.keys.nbytes + self.values.nbytes + self.counts.nbytes
+
+    def __len__(self):
+        return int(self.counts[0])
+
+    def reserve(self, rows):
+        """Make room for at least rows more states without growing"""
+        needed = len(self) + rows
+        if needed <= self.max_fill:
+            return
+        capacity = self.capacity
+        while int(capacity * MAX_LOAD) < needed:
+            capacity *= 2
+        old_keys, old_values = self.keys, self.values
+        self.keys = np.full(capacity, EMPTY, dtype=np.int64)
+        self.values = np.full((capacity, NUM_ACTIONS), self.default)
+        rehash(old_keys, old_values, self.keys, self.values)
+
+    def __getitem__(self, index):
+        if isinstance(index, tuple):
+            state, action = index
+            return self[state][action]
+        slot = find_slot(self.keys, int(index))
+        if slot == EMPTY:
+            return np.full(NUM_ACTIONS, self.default)
+        return self.values[slot]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, tuple):
+            state, action = index
+        else:
+            state, action = index, slice(None)
+        self.reserve(1)
+        slot = insert_slot(self.keys, self.values, self.counts, int(state), self.default)
+        self.values[slot, action] = value
+
+    def states(self):
+        """States with a stored row, and those rows"""
+        used = self.keys != EMPTY
+        return self.keys[used], self.values[used]
+
+    def to_dense(self):
+        Q = np.full(self.shape, self.default)
+        states, rows = self.states()
+        Q[states] = rows
+        return Q
+
+
+class _Transitions:
+    """next_state[state, action] computed from the grid coordinates"""
+
+    def __init__(self, grid_size):
+        self.grid_size = grid_size
+
+    def __getitem__(self, index):
+        state, action = index
+        state = np.asarray(state, dtype=np.int64)
+        action = np.asarray(action)
+        g = self.grid_size
+        row, col = state // g, state % g
+        result = np.select(
+            [action == UP, action == DOWN, action == LEFT, action == RIGHT],
+            [np.where(row > 0, state - g, state), np.where(row < g - 1, state + g, state),
+             np.where(col > 0, state - 1, state), np.where(col < g - 1, state + 1, state)],
+            state)
+        return result[()]
+
+
+class _StateLookup:
+    """reward[state] / is_trap[state] looked up in the env's sorted trap array"""
+
+    def __init__(self, env, field):
+        self.env = env
+        self.field = field
+
+    def __getitem__(self, state):
+        env = self.env
+        state = np.asarray(state, dtype=np.int64)
+        index = np.minimum(np.searchsorted(env.trap_pos, state), max(len(env.trap_pos) - 1, 0))
+        is_trap = (env.trap_pos[index] == state) if len(env.trap_pos) else np.zeros(state.shape, dtype=bool)
+        if self.field == 'is_trap':
+            return is_trap[()]
+        penalty = env.trap_penalty[index] if len(env.trap_pos) else 0.0
+        reward = np.where(state == env.treasure_pos, float(env.treasure_reward),
+                          np.where(is_trap, penalty, float(env.step_reward)))
+        return reward[()]
+
+
+class ImplicitMazeEnv:
+    """Open-grid maze computed on demand: no per-state transition, reward or trap tables"""
+
+    def __init__(self, grid_size, trap_pos, trap_penalty, treasure_pos, treasure_reward, step_reward=-1,
+                 start_state=0):
+        self.grid_size = grid_size
+        self.num_states = grid_size * grid_size
+        self.treasure_pos = treasure_pos
+        self.treasure_reward = treasure_reward
+        self.step_reward = step_reward
+        self.start_state = start_state
+        self.walls = None
+        # Sorted for binary search; np.unique keeps the first penalty given for a repeated position
+        trap_pos = np.asarray(trap_pos, dtype=np.int64)
+        trap_penalty = np.broadcast_to(np.asarray(trap_penalty, dtype=np.float64), trap_pos.shape)
+        self.trap_pos, first = np.unique(trap_pos, return_index=True)
+        self.trap_penalty = trap_penalty[first]
+
+        self.next_state = _Transitions(grid_size)
+        self.reward = _StateLookup(self, 'reward')
+        self.is_trap = _StateLookup(self, 'is_trap')
+
+    @classmethod
+    def from_layout(cls, layout, treasure_reward, step_reward=-1):
+        if layout.walls is not None and layout.walls.any():
+            raise ValueError("The implicit environment only supports open grids (no walls)")
+        return cls(layout.grid_size, layout.trap_pos, layout.trap_penalty, layout.treasure_pos, treasure_reward,
+                   step_reward=step_reward, start_state=layout.start_state)
+
+    @property
+    def nbytes(self):
+        return self.trap_pos.nbytes + self.trap_penalty.nbytes
+
+    def step(self, state, action):
+        """Return (next_state, reward, done, hit_trap) for an integer action ID"""
+        next_state = self.next_state[state, action]
+        return next_state, self.reward[next_state], next_state == self.treasure_pos, self.is_trap[next_state]
+
+
+@njit(cache=True)
+def implicit_move(state, action, grid_size):
+    row, col = state // grid_size, state % grid_size
+    if action == UP:
+        return state - grid_size if row > 0 else state
+    if action == DOWN:
+        return state + grid_size if row < grid_size - 1 else state
+    if action == LEFT:
+        return state - 1 if col > 0 else state
+    return state + 1 if col < grid_size - 1 else state
+
+
+@njit(cache=True)
+def sparse_q_learning(rng, keys, values, counts, default, max_fill,
+                      grid_size, trap_pos, trap_penalty, step_reward, start_state, treasure_pos, treasure_reward,
+                      alpha, gamma, epsilon, max_steps,
+                      episode_rewards, episode_steps, succeeded, trapped):
+    """maze_algorithms.q_learning on a SparseQTable and an ImplicitMazeEnv
+
+    Stops early at an episode boundary when the next episode could overfill the hash and
+    returns the number of episodes completed, so the caller can grow the table and resume.
+    With default 0 this makes the same moves and values as the dense kernel for a seed.
+    """
+    for episode in range(episode_rewards.shape[0]):
+        if counts[0] + max_steps > max_fill:
+            return episode
+        state = start_state
+        done = False
+        total = 0.0
+        steps = 0
+        hit_trap = False
+        while not done and steps < max_steps:
+            # Phase: action selection
+            slot = insert_slot(keys, values, counts, state, default)
+            action = epsilon_greedy(rng, values[slot], epsilon)
+            # Phase: move
+            new_state = implicit_move(state, action, grid_size)
+
+            # Phase: reward
+            r = step_reward
+            index = np.searchsorted(trap_pos, new_state)
+            if index < trap_pos.shape[0] and trap_pos[index] == new_state:
+                r = trap_penalty[index]
+                hit_trap = True
+            done = new_state == treasure_pos
+            if done:
+                r = treasure_reward
+
+            # Phase: Q update
+            next_slot = find_slot(keys, new_state)
+            next_max = default if next_slot == EMPTY else np.max(values[next_slot])
+            values[slot, action] = (1 - alpha) * values[slot, action] + alpha * (r + gamma * next_max)
+
+            # Phase: other
+            total += r
+            state = new_state
+            steps += 1
+        episode_rewards[episode] = total
+        episode_steps[episode] = steps
+        succeeded[episode] = done
+        trapped[episode] = hit_trap
+    return episode_rewards.shape[0]
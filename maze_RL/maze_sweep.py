@@ -0,0 +1,288 @@
+"""Multi-process hyperparameter sweep over TrainingConfig grids
+
+    python maze_RL/maze_sweep.py --alpha 0.05 0.1 0.2 --gamma 0.9 0.99 \
+        --trap-density 0.05 0.1 --grid-size 8 --max-steps 32 --episodes 2000 \
+        --seeds 0 1 2 --out sweep_results
+
+Each run trains into a Q-table held in multiprocessing.shared_memory, so only the
+small metrics row crosses the process boundary. Completed runs are appended to
+<out>/results.csv as they finish; re-running the same command skips them, which
+makes a crashed sweep resumable. A run that raises, or can't be started, or whose
+worker process dies, is recorded with its error message and empty metrics instead of
+stopping the sweep; re-running the command retries it and replaces its row. Results
+files from older versions are upgraded to the current columns when resumed.
+"""
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import fields
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from maze_engine import TrainingConfig, train
+from maze_env import NUM_ACTIONS
+
+RESULT_COLUMNS = ['run_id', 'seed', 'grid_size', 'num_traps', 'trap_density', 'alpha', 'gamma', 'epsilon',
+                  'max_steps', 'episodes', 'success_rate', 'trap_rate', 'avg_reward', 'avg_steps',
+                  'training_time', 'error']
+CONFIG_FIELDS = {f.name for f in fields(TrainingConfig)}
+
+
+def expand_grid(param_grid, seeds):
+    """Cartesian product of parameter lists x seeds, as a list of run dicts with stable run_ids
+
+    param_grid maps TrainingConfig field names (plus 'trap_density', the fraction of
+    non-start/non-treasure cells that are traps) to lists of values.
+    """
+    names = sorted(param_grid)
+    runs = []
+    for values in itertools.product(*(param_grid[name] for name in names)):
+        for seed in seeds:
+            params = dict(zip(names, values), seed=seed)
+            key = json.dumps(params, sort_keys=True)
+            params['run_id'] = hashlib.sha1(key.encode()).hexdigest()[:12]
+            runs.append(params)
+    return runs
+
+
+def make_config(params):
+    """TrainingConfig for one run, resolving trap_density into num_traps"""
+    config = TrainingConfig(**{name: value for name, value in params.items() if name in CONFIG_FIELDS})
+    config.episode_history = False  # Only the summary statistics are recorded
+    if 'trap_density' in params:
+        config.num_traps = int(params['trap_density'] * (config.num_states - 2))
+    return config
+
+
+def config_row(params, config):
+    """The parameter columns of a results row"""
+    return {
+        'run_id': params['run_id'],
+        'seed': config.seed,
+        'grid_size': config.grid_size,
+        'num_traps': config.num_traps,
+        'trap_density': params.get('trap_density', ''),
+        'alpha': config.alpha,
+        'gamma': config.gamma,
+        'epsilon': config.epsilon,
+        'max_steps': config.max_steps,
+        'episodes': config.episodes,
+    }
+
+
+def run_shard(params, shm_name):
+    """Worker: train one configuration into the shared Q-table and return its metrics row"""
+    config = make_config(params)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        Q = np.ndarray((config.num_states, NUM_ACTIONS), dtype=np.float64, buffer=shm.buf)
+        result = train(config, Q=Q)
+        row = {
+            **config_row(params, config),
+            'success_rate': result.success_rate,
+            'trap_rate': result.trap_rate,
+            'avg_reward': result.avg_reward,
+            'avg_steps': result.avg_steps,
+            'training_time': result.training_time,
+        }
+        # Drop every view onto the segment before closing it
+        del Q, result
+    finally:
+        shm.close()
+    return row
+
+
+def failed_row(run, error):
+    """Results row for a run that raised: its parameters and the error, no metrics"""
+    try:
+        row = config_row(run, make_config(run))
+    except Exception:
+        row = {name: run[name] for name in RESULT_COLUMNS if name in run}
+    row['error'] = f"{type(error).__name__}: {error}"
+    return row
+
+
+def read_results(results_path):
+    """(rows, header) of a results table; both empty if it doesn't exist yet"""
+    if not os.path.exists(results_path):
+        return [], []
+    with open(results_path, newline='') as f:
+        reader = csv.DictReader(f)
+        return list(reader), reader.fieldnames or []
+
+
+def write_results(results_path, fieldnames, rows):
+    """Replace a results table in one step, so an interruption leaves the old file intact"""
+    temporary = results_path + '.tmp'
+    with open(temporary, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, restval='')
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(temporary, results_path)
+
+
+def completed_runs(results_path):
+    """run_ids already present in a results table without an error"""
+    return {row['run_id'] for row in read_results(results_path)[0] if not row.get('error')}
+
+
+def run_sweep(runs, out_dir, workers=None, save_q=True, log=print):
+    """Run every not-yet-completed run on a process pool; returns the number of runs executed (failed ones included)"""
+    os.makedirs(out_dir, exist_ok=True)
+    results_path = os.path.join(out_dir, 'results.csv')
+    q_dir = os.path.join(out_dir, 'q')
+    if save_q:
+        os.makedirs(q_dir, exist_ok=True)
+
+    rows, header = read_results(results_path)
+    done = {row['run_id'] for row in rows if not row.get('error')}
+    pending = [run for run in runs if run['run_id'] not in done]
+    if len(done):
+        log(f"Resuming: {len(runs) - len(pending)} of {len(runs)} runs already complete")
+    # A retried run's new row replaces its failed one, and older files gain any columns added since
+    retried = {run['run_id'] for run in pending}
+    kept = [row for row in rows if not (row.get('error') and (row['run_id'] in retried or row['run_id'] in done))]
+    fieldnames = RESULT_COLUMNS + [name for name in header if name not in RESULT_COLUMNS]
+    if header and (header != fieldnames or len(kept) != len(rows)):
+        write_results(results_path, fieldnames, kept)
+    if not pending:
+        return 0
+
+    workers = workers or os.cpu_count() or 1
+    new_file = not os.path.exists(results_path)
+    start_time = time.time()
+    finished = failed = 0
+    pool = ProcessPoolExecutor(max_workers=workers)
+
+    with open(results_path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, restval='')
+        if new_file:
+            writer.writeheader()
+
+        queue = iter(pending)
+        in_flight = {}  # future -> (run, shared memory segment)
+
+        def record(run, row):
+            nonlocal finished, failed
+            # Flush per row so a crash loses at most the runs still in flight
+            writer.writerow(row)
+            f.flush()
+            finished += 1
+            if row.get('error'):
+                failed += 1
+                log(f"[{finished}/{len(pending)}] {run['run_id']} failed: {row['error']}")
+            else:
+                log(f"[{finished}/{len(pending)}] {run['run_id']} "
+                    f"success={row['success_rate']:.1f}% reward={row['avg_reward']:.2f}")
+
+        def submit(run, shm):
+            nonlocal pool
+            try:
+                return pool.submit(run_shard, run, shm.name)
+            except BrokenProcessPool:
+                # A worker died (its runs are recorded as failed); carry on with a fresh pool
+                pool.shutdown(wait=False)
+                pool = ProcessPoolExecutor(max_workers=workers)
+                return pool.submit(run_shard, run, shm.name)
+
+        def submit_next():
+            """Start the next pending run, recording any that can't be started; False once none are left"""
+            for run in queue:
+                shm = None
+                try:
+                    num_states = make_config(run).num_states
+                    shm = shared_memory.SharedMemory(create=True, size=num_states * NUM_ACTIONS * 8)
+                    np.ndarray((num_states, NUM_ACTIONS), dtype=np.float64, buffer=shm.buf)[:] = 0
+                    in_flight[submit(run, shm)] = (run, shm)
+                    return True
+                except Exception as e:
+                    if shm is not None:
+                        shm.close()
+                        shm.unlink()
+                    record(run, failed_row(run, e))
+            return False
+
+        try:
+            # Keep a couple of runs queued per worker without allocating every table up front
+            for _ in range(2 * workers):
+                if not submit_next():
+                    break
+
+            while in_flight:
+                ready, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in ready:
+                    run, shm = in_flight.pop(future)
+                    try:
+                        row = future.result()
+                        if save_q:
+                            num_states = row['grid_size'] * row['grid_size']
+                            Q = np.ndarray((num_states, NUM_ACTIONS), dtype=np.float64, buffer=shm.buf)
+                            np.save(os.path.join(q_dir, f"{run['run_id']}.npy"), Q)
+                            del Q
+                    except Exception as e:
+                        # One bad configuration, or a worker dying, shouldn't cost the rest of the sweep
+                        row = failed_row(run, e)
+                    finally:
+                        shm.close()
+                        shm.unlink()
+                    record(run, row)
+                    submit_next()
+        finally:
+            for run, shm in in_flight.values():
+                shm.close()
+                shm.unlink()
+            pool.shutdown()
+
+    log(f"Sweep finished {finished} runs in {time.time() - start_time:.1f} seconds"
+        + (f", {failed} failed (re-run to retry)" if failed else ""))
+    return finished
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hyperparameter sweep for the maze Q-learning engine")
+    defaults = TrainingConfig()
+    parser.add_argument('--grid-size', type=int, nargs='+', default=[defaults.grid_size])
+    parser.add_argument('--trap-density', type=float, nargs='+',
+                        help="Fraction of free cells that are traps (overrides --num-traps)")
+    parser.add_argument('--num-traps', type=int, nargs='+', default=[defaults.num_traps])
+    parser.add_argument('--alpha', type=float, nargs='+', default=[defaults.alpha])
+    parser.add_argument('--gamma', type=float, nargs='+', default=[defaults.gamma])
+    parser.add_argument('--epsilon', type=float, nargs='+', default=[defaults.epsilon])
+    parser.add_argument('--max-steps', type=int, nargs='+', default=[defaults.max_steps])
+    parser.add_argument('--episodes', type=int, nargs='+', default=[defaults.episodes])
+    parser.add_argument('--seeds', type=int, nargs='+', default=[0])
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--out', default='sweep_results', help="Output directory")
+    parser.add_argument('--no-save-q', action='store_true', help="Don't write trained Q-tables")
+    args = parser.parse_args(argv)
+
+    param_grid = {
+        'grid_size': args.grid_size,
+        'alpha': args.alpha,
+        'gamma': args.gamma,
+        'epsilon': args.epsilon,
+        'max_steps': args.max_steps,
+        'episodes': args.episodes,
+    }
+    if args.trap_density:
+        param_grid['trap_density'] = args.trap_density
+    else:
+        param_grid['num_traps'] = args.num_traps
+
+    runs = expand_grid(param_grid, args.seeds)
+    for run in runs:
+        config = make_config(run)
+        if config.num_traps > config.num_states - 2:
+            parser.error(f"Too many traps for grid size {config.grid_size}")
+    run_sweep(runs, args.out, workers=args.workers, save_q=not args.no_save_q)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from batch_env import BatchMazeEnv, train_batch
+from maze_env import DOWN, LEFT, NUM_ACTIONS, RIGHT, MazeEnv
+
+
+@pytest.fixture
+def env():
+    # 3x3: start 0, a trap at 1, treasure at 8
+    return MazeEnv(3, [(1, -10)], 8, 10)
+
+
+def test_step_returns_only_the_active_slots(env):
+    batch = BatchMazeEnv(env, 3, max_steps=5)
+    batch.active[1] = False
+    idx, states, next_states, rewards, reached, finished = batch.step(np.array([RIGHT, RIGHT, DOWN]))
+    np.testing.assert_array_equal(idx, [0, 2])
+    np.testing.assert_array_equal(states, [0, 0])
+    np.testing.assert_array_equal(next_states, [1, 3])
+    np.testing.assert_array_equal(rewards, [-10, -1])
+    assert not reached.any() and not finished.any()
+    np.testing.assert_array_equal(batch.hit_trap, [True, False, False])
+    np.testing.assert_array_equal(batch.steps, [1, 0, 1])  # The inactive slot doesn't move
+
+
+def test_episodes_finish_at_the_treasure_or_the_step_limit(env):
+    batch = BatchMazeEnv(env, 2, max_steps=4)
+    route = [RIGHT, RIGHT, DOWN, DOWN]
+    for step, action in enumerate(route):
+        # Slot 0 walks to the treasure, slot 1 bumps into the left wall
+        idx, _, _, _, reached, finished = batch.step(np.array([action, LEFT]))
+    np.testing.assert_array_equal(reached, [True, False])
+    np.testing.assert_array_equal(finished, [True, True])
+    np.testing.assert_array_equal(batch.episode_reward, [-10 - 1 - 1 + 10, -4])
+
+    batch.reset(np.array([True, False]))
+    assert batch.states[0] == env.start_state and batch.steps[0] == 0 and not batch.hit_trap[0]
+    assert batch.steps[1] == 4
+
+
+def test_zero_step_limit_is_rejected(env):
+    with pytest.raises(ValueError):
+        BatchMazeEnv(env, 2, max_steps=0)
+
+
+@pytest.mark.parametrize('num_envs', [1, 7, 64])
+def test_train_batch_runs_every_episode_and_learns(num_envs):
+    env = MazeEnv(4, [(5, -10), (10, -10)], 15, 10)
+    Q = np.zeros((env.num_states, NUM_ACTIONS))
+    stats = train_batch(env, Q, 600, num_envs, alpha=0.5, gamma=0.9, epsilon=0.1, max_steps=20,
+                        rng=np.random.default_rng(0))
+    assert len(stats['episode_rewards']) == len(stats['episode_steps']) == 600
+    assert ((1 <= stats['episode_steps']) & (stats['episode_steps'] <= 20)).all()
+    assert 0 < stats['successful_episodes'] <= 600
+
+    # The greedy route from the start reaches the treasure in the fewest steps
+    state, steps = env.start_state, 0
+    while state != env.treasure_pos and steps < 20:
+        state = env.next_state[state, np.argmax(Q[state])]
+        steps += 1
+    assert state == env.treasure_pos and steps == 6
@@ -0,0 +1,91 @@
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from maze_engine import TrainingConfig, build_env, make_layout
+from maze_incremental import changed_states, move_traps, remap_q, retrain
+from maze_layouts import MazeLayout
+from maze_solvers import value_iteration
+
+GAMMA = 0.95
+
+
+def solved(layout):
+    env = build_env(TrainingConfig(), layout)
+    return env, value_iteration(env, GAMMA, tol=1e-10).Q
+
+
+@pytest.mark.parametrize('seed', range(6))
+@pytest.mark.parametrize('kind', ['uniform', 'rooms'])
+def test_replan_from_solved_table_matches_cold_solve(seed, kind):
+    layout = make_layout(TrainingConfig(grid_size=16, num_traps=30, layout=kind, seed=seed))
+    old_env, Q = solved(layout)
+    new_layout = move_traps(layout, 3, np.random.default_rng(seed))
+    new_env, expected = solved(new_layout)
+
+    result = retrain(old_env, new_env, Q, GAMMA, tol=1e-10, compare=True)
+    np.testing.assert_allclose(result.Q, expected, atol=1e-6)
+    assert result.seed_converged
+    assert result.regret == pytest.approx(0, abs=1e-6)
+    assert result.region < new_env.num_states
+
+
+def test_replan_after_resize_matches_cold_solve():
+    layout = make_layout(TrainingConfig(grid_size=10, num_traps=12, seed=2))
+    old_env, Q = solved(layout)
+    # Same traps by (row, col) on a grid two cells larger, treasure in the new corner
+    rows, cols = layout.trap_pos // 10, layout.trap_pos % 10
+    grown = MazeLayout(12, rows * 12 + cols, layout.trap_penalty, 12 * 12 - 1)
+    new_env, expected = solved(grown)
+
+    result = retrain(old_env, new_env, Q, GAMMA, tol=1e-10)
+    np.testing.assert_allclose(result.Q, expected, atol=1e-6)
+
+
+def test_unchanged_maze_keeps_the_table():
+    layout = make_layout(TrainingConfig(grid_size=8, num_traps=6, seed=0))
+    env, Q = solved(layout)
+    result = retrain(env, build_env(TrainingConfig(), layout), Q, GAMMA)
+    assert result.changed == 0
+    np.testing.assert_allclose(result.Q, Q, atol=1e-9)
+    assert result.cold_backups is None
+
+
+def test_changed_states_marks_moved_traps_only():
+    layout = make_layout(TrainingConfig(grid_size=8, num_traps=6, seed=1))
+    old_pos = int(layout.trap_pos[0])
+    taken = set(layout.trap_pos.tolist()) | {layout.start_state, layout.treasure_pos}
+    new_pos = min(set(range(layout.num_states)) - taken)
+    moved = replace(layout, trap_pos=np.where(layout.trap_pos == old_pos, new_pos, layout.trap_pos))
+    changed = changed_states(build_env(TrainingConfig(), layout), build_env(TrainingConfig(), moved))
+    assert sorted(np.flatnonzero(changed).tolist()) == sorted([old_pos, new_pos])
+
+
+def test_remap_q_carries_rows_by_coordinates():
+    Q = np.arange(9 * 4, dtype=np.float64).reshape(9, 4)
+    grown = remap_q(Q, 3, 4)
+    np.testing.assert_array_equal(grown[1 * 4 + 2], Q[1 * 3 + 2])
+    np.testing.assert_array_equal(grown[3 * 4 + 3], 0)
+    np.testing.assert_array_equal(remap_q(grown, 4, 3), Q)
+
+
+def test_unconverged_seed_is_flagged():
+    layout = make_layout(TrainingConfig(grid_size=8, num_traps=6, seed=3))
+    old_env, Q = solved(layout)
+    new_env = build_env(TrainingConfig(), move_traps(layout, 2, np.random.default_rng(0)))
+    result = retrain(old_env, new_env, Q * 0.5, GAMMA)
+    assert not result.seed_converged
+    assert 'not converged' in result.summary()
+
+
+def test_cold_start_comparison_is_opt_in():
+    layout = make_layout(TrainingConfig(grid_size=8, num_traps=6, seed=4))
+    old_env, Q = solved(layout)
+    new_env = build_env(TrainingConfig(), move_traps(layout, 2, np.random.default_rng(4)))
+    plain = retrain(old_env, new_env, Q, GAMMA)
+    assert plain.cold_backups is None and plain.regret is None
+    assert 'Cold start' not in plain.summary()
+    compared = retrain(old_env, new_env, Q, GAMMA, compare=True)
+    assert compared.cold_backups > compared.backups
+    np.testing.assert_array_equal(plain.Q, compared.Q)
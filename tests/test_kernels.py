@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from maze_algorithms import ALGORITHMS, HAVE_NUMBA, compare_and_swap, njit, striped_q_learning
+from maze_engine import TrainingConfig, build_env, make_layout
+from maze_env import NUM_ACTIONS
+from maze_planning import OBSERVED, PLANNING_ALGORITHMS, PlanningModel
+
+pytestmark = pytest.mark.skipif(not HAVE_NUMBA, reason="compiled kernels need Numba")
+
+KERNELS = {**ALGORITHMS, **PLANNING_ALGORITHMS}
+EPISODES = 60
+
+
+@pytest.fixture(scope='module')
+def env():
+    config = TrainingConfig(grid_size=8, num_traps=8, seed=5)
+    return build_env(config, make_layout(config))
+
+
+def run_kernel(kernel, name, env, seed, extra_args=None):
+    """Run EPISODES episodes from zeros; returns the arrays the kernel writes"""
+    rng = np.random.default_rng(seed)
+    Q = np.zeros((env.num_states, NUM_ACTIONS))
+    Q2 = Q.copy() if name == 'double_q' else np.zeros((0, NUM_ACTIONS))
+    outputs = [np.empty(EPISODES), np.empty(EPISODES, dtype=np.int64), np.empty(EPISODES, dtype=bool),
+               np.empty(EPISODES, dtype=bool), np.zeros(env.num_states, dtype=np.int64),
+               np.zeros(env.num_states, dtype=bool)]
+    model = None
+    if extra_args is None:
+        extra_args = ()
+        if name in PLANNING_ALGORITHMS:
+            model = PlanningModel(env.num_states, prioritized=name == 'prioritized_sweeping')
+            extra_args = model.kernel_args(5, 1e-4)
+    kernel(rng, Q, Q2, env.next_state, env.reward, env.is_trap, env.start_state, env.treasure_pos,
+           0.1, 0.95, 0.2, 0.9, 4 * env.grid_size, *outputs, True, *extra_args)
+    arrays = [Q, Q2, *outputs]
+    if model is not None:
+        # The heap arrays are scratch space; only the learned model has to agree
+        arrays += [model.next_state, model.observed[:model.counts[OBSERVED]], model.pred_head, model.pred_next,
+                   model.counts]
+    return arrays
+
+
+@pytest.mark.parametrize('name', sorted(KERNELS))
+def test_compiled_kernel_matches_interpreted(env, name):
+    kernel = KERNELS[name]
+    compiled = run_kernel(kernel, name, env, seed=11)
+    interpreted = run_kernel(kernel.py_func, name, env, seed=11)
+    for got, expected in zip(compiled, interpreted):
+        np.testing.assert_allclose(got, expected, rtol=1e-12, atol=1e-12)
+    assert compiled[2].sum() != 0  # Episodes actually ran
+
+
+def test_striped_kernel_matches_q_learning_on_one_writer(env):
+    locks = np.zeros(7, dtype=np.int64)
+    striped = run_kernel(striped_q_learning, 'q_learning', env, seed=3, extra_args=(locks,))
+    plain = run_kernel(ALGORITHMS['q_learning'], 'q_learning', env, seed=3)
+    for got, expected in zip(striped, plain):
+        np.testing.assert_array_equal(got, expected)
+    np.testing.assert_array_equal(locks, 0)  # Every lock was released
+
+
+@njit
+def try_swap(array, index, expected, value):
+    return compare_and_swap(array, index, expected, value)
+
+
+def test_compare_and_swap_only_swaps_the_expected_value():
+    locks = np.zeros(3, dtype=np.int64)
+    assert try_swap(locks, 1, 0, 1) == 0
+    assert try_swap(locks, 1, 0, 1) == 1  # Held: no swap, returns the current value
+    np.testing.assert_array_equal(locks, [0, 1, 0])
+    assert try_swap(locks, 1, 1, 0) == 1
+    np.testing.assert_array_equal(locks, 0)
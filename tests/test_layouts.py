@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from maze_layouts import (LAYOUT_KINDS, WALL, generate_layout, is_solvable, layout_from_codes, load_layout,
+                          reachable_states)
+
+
+@pytest.mark.parametrize('kind', LAYOUT_KINDS)
+def test_generators_are_seeded(kind):
+    first = generate_layout(kind, 21, 30, -10, seed=7)
+    second = generate_layout(kind, 21, 30, -10, seed=7)
+    np.testing.assert_array_equal(first.trap_pos, second.trap_pos)
+    np.testing.assert_array_equal(first.wall_mask(), second.wall_mask())
+    assert first.treasure_pos == second.treasure_pos
+
+
+@pytest.mark.parametrize('kind', LAYOUT_KINDS)
+@pytest.mark.parametrize('seed', range(5))
+def test_traps_are_distinct_free_cells_and_treasure_is_reachable(kind, seed):
+    layout = generate_layout(kind, 17, 25, -10, seed=seed)
+    walls = layout.wall_mask()
+    assert len(layout.trap_pos) == 25
+    assert len(np.unique(layout.trap_pos)) == 25
+    assert layout.start_state not in layout.trap_pos
+    assert layout.treasure_pos not in layout.trap_pos
+    assert not walls[layout.trap_pos].any()
+    assert not walls[layout.start_state] and not walls[layout.treasure_pos]
+    assert is_solvable(layout)
+    np.testing.assert_array_equal(layout.trap_penalty, -10)
+
+
+@pytest.mark.parametrize('kind', ['dfs', 'kruskal'])
+def test_perfect_mazes_connect_every_open_cell(kind):
+    layout = generate_layout(kind, 15, 0, -10, seed=1)
+    np.testing.assert_array_equal(reachable_states(layout), ~layout.wall_mask())
+
+
+def test_dense_trap_sampling_fills_every_free_cell():
+    layout = generate_layout('uniform', 6, 34, -10, seed=0)
+    assert sorted(layout.trap_pos.tolist()) == list(range(1, 35))
+
+
+def test_text_layout_round_trips_codes(tmp_path):
+    path = tmp_path / 'maze.txt'
+    path.write_text("S.#\n.T#\n..G\n")
+    layout = load_layout(str(path), trap_penalty=-5)
+    assert layout.grid_size == 3
+    assert layout.start_state == 0 and layout.treasure_pos == 8
+    assert layout.traps == [(4, -5.0)]
+    assert np.flatnonzero(layout.wall_mask()).tolist() == [2, 5]
+    assert is_solvable(layout)
+
+
+@pytest.mark.parametrize('codes', [
+    [[0, 0, 0], [0, 0, 4]],  # Not square
+    [[3, 0], [0, 3]],  # Two starts
+    [[1, 0], [0, 4]],  # Wall on the default start
+    [[0, 9], [0, 4]],  # Unknown code
+])
+def test_invalid_codes_are_rejected(codes):
+    with pytest.raises(ValueError):
+        layout_from_codes(codes, -10)
+
+
+def test_walled_off_treasure_is_not_solvable():
+    codes = np.zeros((3, 3), dtype=np.int64)
+    codes[1, :] = WALL
+    assert not is_solvable(layout_from_codes(codes, -10))
@@ -0,0 +1,104 @@
+import csv
+
+import numpy as np
+import pytest
+
+from maze_engine import TrainingConfig, train
+from maze_metrics import EpisodeMetrics, ExponentialAverage, RingBuffer, RunningStats, open_sink
+
+
+class ListSink:
+    def __init__(self):
+        self.rows = []
+        self.closed = False
+
+    def write(self, row):
+        self.rows.append(row)
+
+    def close(self):
+        self.closed = True
+
+
+def outcomes(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.normal(size=n), rng.integers(1, 20, size=n), rng.random(n) < 0.5, rng.random(n) < 0.2)
+
+
+def test_chunked_sink_rows_match_the_episodes():
+    rewards, steps, succeeded, trapped = outcomes(25)
+    sink = ListSink()
+    metrics = EpisodeMetrics(window=10, sink=sink, chunk_episodes=4)
+    # Uneven blocks straddle the chunk boundaries
+    for start, end in [(0, 3), (3, 11), (11, 12), (12, 25)]:
+        metrics.update(rewards[start:end], steps[start:end], succeeded[start:end], trapped[start:end])
+    metrics.close()
+
+    assert sink.closed
+    assert [row['episode'] for row in sink.rows] == [4, 8, 12, 16, 20, 24, 25]
+    for row in sink.rows:
+        first = row['episode'] - 1 - (row['episode'] - 1) % 4
+        part = slice(first, row['episode'])
+        assert row['chunk_avg_reward'] == pytest.approx(rewards[part].mean())
+        assert row['chunk_avg_steps'] == pytest.approx(steps[part].mean())
+        assert row['chunk_success_rate'] == pytest.approx(succeeded[part].mean() * 100)
+        assert row['chunk_trap_rate'] == pytest.approx(trapped[part].mean() * 100)
+        assert row['avg_reward'] == pytest.approx(rewards[:row['episode']].mean())
+    assert metrics.episodes == 25 and metrics.successes == int(succeeded.sum())
+
+
+@pytest.mark.parametrize('chunk', [0, -1])
+def test_chunk_size_must_be_positive(chunk):
+    with pytest.raises(ValueError):
+        EpisodeMetrics(chunk_episodes=chunk)
+    with pytest.raises(ValueError, match='metrics_chunk'):
+        train(TrainingConfig(metrics_chunk=chunk))
+
+
+def test_train_rejects_a_zero_step_limit():
+    with pytest.raises(ValueError, match='max_steps'):
+        train(TrainingConfig(max_steps=0))
+
+
+def test_running_stats_match_numpy():
+    values = np.random.default_rng(1).normal(3, 2, size=101)
+    stats = RunningStats()
+    for block in np.array_split(values, [1, 40, 41, 90]):
+        stats.update(block)
+    assert stats.count == 101
+    assert stats.mean == pytest.approx(values.mean())
+    assert stats.variance == pytest.approx(values.var(ddof=1))
+
+
+def test_exponential_average_matches_the_recurrence():
+    values = np.random.default_rng(2).normal(size=30)
+    ema = ExponentialAverage(0.1)
+    ema.update(values[:7])
+    ema.update(values[7:])
+    expected = values[0]
+    for value in values[1:]:
+        expected = 0.9 * expected + 0.1 * value
+    assert ema.value == pytest.approx(expected)
+
+
+def test_ring_buffer_keeps_the_newest_values():
+    buffer = RingBuffer(5)
+    buffer.extend([1, 2, 3])
+    np.testing.assert_array_equal(buffer.values(), [1, 2, 3])
+    buffer.extend([4, 5, 6, 7])
+    np.testing.assert_array_equal(buffer.values(), [3, 4, 5, 6, 7])
+    buffer.extend(np.arange(10, 22))
+    np.testing.assert_array_equal(buffer.values(), np.arange(17, 22))
+    assert buffer.mean() == pytest.approx(19)
+
+
+def test_training_streams_csv_rows(tmp_path):
+    path = tmp_path / 'metrics.csv'
+    train(TrainingConfig(episodes=250, metrics_file=str(path), metrics_chunk=100, seed=0))
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [int(row['episode']) for row in rows] == [100, 200, 250]
+
+
+def test_unknown_sink_extension_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        open_sink(str(tmp_path / 'metrics.txt'))
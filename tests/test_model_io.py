@@ -0,0 +1,77 @@
+import struct
+
+import numpy as np
+import pytest
+
+from maze_engine import TrainingConfig, build_env, make_layout
+from maze_env import NUM_ACTIONS
+from maze_model_io import FORMAT_VERSION, MAGIC, load_model, read_header, save_model
+
+
+def make_env(layout='uniform', seed=0):
+    config = TrainingConfig(grid_size=11, num_traps=9, layout=layout, seed=seed)
+    return build_env(config, make_layout(config))
+
+
+def assert_same_env(loaded, env):
+    np.testing.assert_array_equal(loaded.next_state, env.next_state)
+    np.testing.assert_array_equal(loaded.reward, env.reward)
+    np.testing.assert_array_equal(loaded.is_trap, env.is_trap)
+    assert loaded.treasure_pos == env.treasure_pos
+    assert loaded.start_state == env.start_state
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+@pytest.mark.parametrize('layout', ['uniform', 'dfs'])
+def test_float64_round_trip_is_exact(tmp_path, mmap, layout):
+    env = make_env(layout)
+    Q = np.random.default_rng(1).normal(size=(env.num_states, NUM_ACTIONS))
+    path = tmp_path / 'model.mazeq'
+    save_model(path, Q, env, dtype='float64')
+
+    model = load_model(path, mmap=mmap)
+    assert model.version == FORMAT_VERSION
+    assert isinstance(model.Q, np.memmap) == mmap
+    np.testing.assert_array_equal(model.Q, Q)
+    assert (model.walls is None) == (env.walls is None)
+    assert_same_env(model.build_env(), env)
+
+
+@pytest.mark.parametrize('dtype, rtol', [('float32', 1e-6), ('float16', 1e-3)])
+def test_narrow_dtypes_round_trip_within_precision(tmp_path, dtype, rtol):
+    env = make_env()
+    Q = np.random.default_rng(2).uniform(-10, 10, size=(env.num_states, NUM_ACTIONS))
+    path = tmp_path / 'model.mazeq'
+    save_model(path, Q, env, dtype=dtype)
+
+    model = load_model(path)
+    assert model.Q.dtype == np.dtype(dtype)
+    np.testing.assert_allclose(model.Q, Q, rtol=rtol)
+
+
+def test_sections_are_aligned(tmp_path):
+    env = make_env()
+    path = tmp_path / 'model.mazeq'
+    save_model(path, np.zeros((env.num_states, NUM_ACTIONS)), env)
+    _, header = read_header(path)
+    assert all(spec['offset'] % 64 == 0 for spec in header['sections'].values())
+
+
+def test_rejects_mismatched_shape_and_dtype(tmp_path):
+    env = make_env()
+    with pytest.raises(ValueError):
+        save_model(tmp_path / 'a', np.zeros((env.num_states - 1, NUM_ACTIONS)), env)
+    with pytest.raises(ValueError):
+        save_model(tmp_path / 'b', np.zeros((env.num_states, NUM_ACTIONS)), env, dtype='int8')
+
+
+def test_rejects_foreign_and_newer_files(tmp_path):
+    foreign = tmp_path / 'foreign'
+    foreign.write_bytes(b'not a model at all')
+    with pytest.raises(ValueError, match='not a saved maze model'):
+        load_model(foreign)
+
+    newer = tmp_path / 'newer'
+    newer.write_bytes(struct.pack('<8sII', MAGIC, FORMAT_VERSION + 1, 2) + b'{}')
+    with pytest.raises(ValueError, match='version'):
+        load_model(newer)
@@ -0,0 +1,31 @@
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from maze_engine import TrainingConfig, make_layout, train
+from maze_multiagent import SHARED_ALGORITHMS, train_agents
+
+
+@pytest.mark.parametrize('algorithm', ['double_q', 'dyna_q', 'prioritized_sweeping'])
+def test_shared_mode_rejects_algorithms_with_private_state(algorithm):
+    with pytest.raises(ValueError, match='single-table'):
+        train_agents(TrainingConfig(algorithm=algorithm), agents=2, mode='shared')
+
+
+def test_agent_steps_are_the_exact_totals():
+    config = TrainingConfig(grid_size=6, num_traps=4, episodes=300, max_steps=20, seed=3)
+    layout = make_layout(config)
+    result = train_agents(config, layout, agents=2, workers=1)
+    for agent in result.agents:
+        alone = train(replace(config, seed=agent.seed), layout=layout)
+        assert agent.steps == int(alone.episode_steps.sum()) == alone.total_steps
+    assert result.total_steps == sum(agent.steps for agent in result.agents)
+
+
+@pytest.mark.parametrize('algorithm', SHARED_ALGORITHMS)
+def test_shared_agents_learn_one_table(algorithm):
+    config = TrainingConfig(grid_size=5, num_traps=2, episodes=200, max_steps=25, algorithm=algorithm, seed=0)
+    result = train_agents(config, agents=2, mode='shared', workers=1)
+    assert len(result.Qs) == 1
+    assert np.any(result.Qs[0] != 0)
@@ -0,0 +1,35 @@
+import pytest
+
+from maze_engine import TrainingConfig, train
+from maze_solvers import regret, value_iteration
+
+GAMMA = 0.95
+
+
+def start_regret(algorithm, seed, **overrides):
+    config = TrainingConfig(grid_size=10, num_traps=10, alpha=0.5, gamma=GAMMA, max_steps=100, episodes=40,
+                            algorithm=algorithm, seed=seed, **overrides)
+    result = train(config)
+    V_star = value_iteration(result.env, GAMMA, tol=1e-10).V
+    return float(regret(result.env, result.Q, V_star, GAMMA)), result
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_planning_converges_where_q_learning_has_not(seed):
+    # 40 episodes leave plain Q-learning far from optimal at the start state
+    assert start_regret('q_learning', seed)[0] > 1
+    for algorithm in ('dyna_q', 'prioritized_sweeping'):
+        value, result = start_regret(algorithm, seed)
+        assert value == pytest.approx(0, abs=1e-9)
+        assert result.planning_backups > 0
+
+
+def test_dyna_q_without_planning_is_q_learning():
+    dyna, _ = start_regret('dyna_q', 0, planning_steps=0)
+    plain, _ = start_regret('q_learning', 0)
+    assert dyna == pytest.approx(plain)
+
+
+def test_prioritized_sweeping_needs_planning_steps():
+    with pytest.raises(ValueError, match='planning_steps'):
+        train(TrainingConfig(algorithm='prioritized_sweeping', planning_steps=0))
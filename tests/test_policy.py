@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+import maze_policy
+from maze_engine import TrainingConfig, build_env, make_layout, train
+from maze_policy import OUTCOMES, PolicyIndex, indexable, walk_route
+
+
+def walk(env, Q, start):
+    """The greedy route as MazeRL.get_optimal_path walked it before the index"""
+    path, visited, state = [], set(), start
+    while state != env.treasure_pos and state not in visited:
+        visited.add(state)
+        path.append(state)
+        next_state = int(env.next_state[state, np.argmax(Q[state])])
+        if next_state == state:
+            break
+        state = next_state
+    if state == env.treasure_pos:
+        path.append(state)
+    return path
+
+
+@pytest.mark.parametrize('kind', ['uniform', 'dfs', 'rooms'])
+@pytest.mark.parametrize('seed', range(4))
+def test_routes_match_step_by_step_walk(kind, seed):
+    config = TrainingConfig(grid_size=13, num_traps=15, layout=kind, seed=seed)
+    env = build_env(config, make_layout(config))
+    rng = np.random.default_rng(seed)
+    for Q in (rng.normal(size=(env.num_states, 4)), np.zeros((env.num_states, 4))):
+        index = PolicyIndex(env, Q)
+        routes = index.paths(np.arange(env.num_states))
+        for state in range(env.num_states):
+            expected = walk(env, Q, state)
+            assert index.path(state) == expected
+            assert routes[state].tolist() == expected
+            assert index.length[state] == len(expected)
+            assert walk_route(env, Q, state) == (expected, index.outcome[state])
+
+
+def test_outcomes_partition_the_states():
+    config = TrainingConfig(grid_size=10, num_traps=10, seed=0)
+    env = build_env(config, make_layout(config))
+    index = PolicyIndex(env, np.random.default_rng(0).normal(size=(env.num_states, 4)))
+    summary = index.summary()
+    assert set(summary) == set(OUTCOMES)
+    assert sum(summary.values()) == env.num_states
+    assert (index.reaches_goal.astype(int) + index.dead_ends + index.loops == 1).all()
+
+
+def test_paths_of_an_empty_batch():
+    config = TrainingConfig(grid_size=4, seed=0)
+    env = build_env(config, make_layout(config))
+    assert PolicyIndex(env, np.zeros((env.num_states, 4))).paths([]) == []
+
+
+def test_sparse_tables_walk_the_same_routes():
+    config = TrainingConfig(grid_size=12, num_traps=10, episodes=300, max_steps=60, q_table='sparse', seed=1)
+    result = train(config)
+    assert not indexable(result.env, result.Q)
+    dense_env = build_env(config, result.layout)
+    dense_Q = np.array([result.Q[state] for state in range(dense_env.num_states)])
+    index = PolicyIndex(dense_env, dense_Q)
+    for state in range(dense_env.num_states):
+        assert walk_route(result.env, result.Q, state) == (index.path(state), index.outcome[state])
+
+
+def test_large_grids_are_not_indexed(monkeypatch):
+    config = TrainingConfig(grid_size=6, seed=0)
+    env = build_env(config, make_layout(config))
+    Q = np.zeros((env.num_states, 4))
+    assert indexable(env, Q)
+    monkeypatch.setattr(maze_policy, 'MAX_INDEX_STATES', env.num_states - 1)
+    assert not indexable(env, Q)
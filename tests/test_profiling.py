@@ -0,0 +1,94 @@
+import sys
+import time
+
+import numpy as np
+import pytest
+
+from maze_algorithms import HAVE_NUMBA, q_learning
+from maze_engine import TrainingConfig, build_env, make_layout, train
+from maze_env import NUM_ACTIONS
+from maze_profiling import NULL_TIMER, LineProfiler, PhaseTimer, format_profile, interpreted, line_phase
+
+
+def marked(n):
+    total = 0
+    for _ in range(n):
+        # Phase: move
+        time.sleep(0.002)
+        # Phase: reward
+        total += 1
+        total += sum(range(3))  # Phase: Q update
+        total -= 1
+    return total
+
+
+def test_lines_take_the_phase_marked_above_or_on_them():
+    first = marked.__code__.co_firstlineno
+    filename = marked.__code__.co_filename
+    assert line_phase(filename, first + 2) is None  # Before any marker
+    assert line_phase(filename, first + 4) == 'move'
+    assert line_phase(filename, first + 6) == 'reward'
+    assert line_phase(filename, first + 7) == 'Q update'
+    assert line_phase(filename, first + 8) == 'reward'
+
+
+def test_line_profiler_charges_time_to_its_phase():
+    previous = sys.gettrace()
+    profiler = LineProfiler([marked])
+    profiler.start()
+    marked(20)
+    profiler.stop()
+    assert sys.gettrace() is previous
+    shares = profiler.phase_shares()
+    assert set(shares) <= {'move', 'reward', 'Q update', 'other'}
+    assert shares['move']['share'] > 80
+    assert profiler.top(1)[0]['code'] == 'time.sleep(0.002)'
+
+
+def test_compile_time_is_reported_outside_the_shares():
+    timer = PhaseTimer()
+    timer.add('compile', 10.0)
+    timer.add('kernel', 3.0, calls=4)
+    timer.add('metrics', 1.0)
+    summary = timer.summary()
+    assert set(summary['phases']) == {'kernel', 'metrics'}
+    assert summary['phases']['kernel']['share'] == pytest.approx(75)
+    assert summary['separate'] == {'compile': {'seconds': 10.0, 'calls': 1}}
+    assert 'not in shares' in format_profile(summary)
+    assert NULL_TIMER.summary()['phases'] == {}
+
+
+@pytest.mark.skipif(not HAVE_NUMBA, reason="needs compiled kernels to strip")
+def test_interpreted_kernel_matches_compiled():
+    config = TrainingConfig(grid_size=6, num_traps=4, seed=0)
+    env = build_env(config, make_layout(config))
+
+    def run(kernel):
+        Q = np.zeros((env.num_states, NUM_ACTIONS))
+        outputs = [np.empty(20), np.empty(20, dtype=np.int64), np.empty(20, dtype=bool), np.empty(20, dtype=bool)]
+        kernel(np.random.default_rng(1), Q, Q, env.next_state, env.reward, env.is_trap, env.start_state,
+               env.treasure_pos, 0.1, 0.9, 0.2, 0.9, 30, *outputs, np.zeros(0, dtype=np.int64),
+               np.zeros(0, dtype=bool), False)
+        return Q
+
+    plain = interpreted(q_learning)
+    assert not hasattr(plain, 'py_func')
+    assert not hasattr(plain.__globals__['epsilon_greedy'], 'py_func')  # Helpers run interpreted too
+    np.testing.assert_allclose(run(plain), run(q_learning), rtol=1e-12)
+
+
+@pytest.mark.parametrize('algorithm', ['q_learning', 'dyna_q'])
+def test_profiled_run_breaks_steps_into_phases(algorithm):
+    result = train(TrainingConfig(grid_size=8, num_traps=6, episodes=300, max_steps=64, algorithm=algorithm,
+                                  profile=True, sample_start=100, sample_episodes=20, seed=0))
+    profile = result.profile
+    assert 'compile' not in profile['phases'] and 'compile' in profile['separate']
+    assert sum(phase['share'] for phase in profile['phases'].values()) == pytest.approx(100)
+    assert profile['sample_window'] == [100, 120]
+    expected = {'action selection', 'move', 'reward', 'Q update'}
+    if algorithm == 'dyna_q':
+        expected.add('planning')
+    assert expected <= set(profile['step_phases'])
+    assert sum(phase['share'] for phase in profile['step_phases'].values()) == pytest.approx(100)
+    assert profile['counters']['episodes'] == 280  # Sampled episodes aren't counted with the compiled ones
+    assert result.episodes == 300
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from maze_env import NUM_ACTIONS, MazeEnv
+from maze_solvers import policy_evaluation, policy_iteration, q_from_values, regret, value_iteration
+
+GAMMA = 0.9
+
+
+def random_env(seed, grid_size=7, num_traps=8):
+    rng = np.random.default_rng(seed)
+    cells = rng.choice(np.arange(1, grid_size * grid_size - 1), size=num_traps, replace=False)
+    return MazeEnv(grid_size, [(int(cell), -10) for cell in cells], grid_size * grid_size - 1, 10)
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_value_and_policy_iteration_agree_on_a_bellman_fixed_point(seed):
+    env = random_env(seed)
+    vi = value_iteration(env, GAMMA, tol=1e-12)
+    pi = policy_iteration(env, GAMMA)
+    assert vi.converged and pi.converged
+    np.testing.assert_allclose(vi.V, pi.V, atol=1e-8)
+    np.testing.assert_allclose(vi.Q, pi.Q, atol=1e-8)
+
+    # V = max_a r(s') + gamma V(s') everywhere but the terminal treasure
+    backup = q_from_values(env, vi.V, GAMMA).max(axis=1)
+    np.testing.assert_allclose(backup, vi.V, atol=1e-9)
+    assert vi.V[env.treasure_pos] == 0
+
+
+def test_open_grid_value_is_the_shortest_route():
+    env = MazeEnv(4, [], 15, 10)
+    V = value_iteration(env, GAMMA, tol=1e-12).V
+    # Six moves from corner to corner: five steps at -1, then the treasure
+    expected = -sum(GAMMA ** k for k in range(5)) + GAMMA ** 5 * 10
+    assert V[env.start_state] == pytest.approx(expected)
+
+
+def test_policy_evaluation_matches_iterative_evaluation():
+    env = random_env(5)
+    policy = np.random.default_rng(5).integers(NUM_ACTIONS, size=env.num_states)
+    V = np.zeros(env.num_states)
+    successor = env.next_state[np.arange(env.num_states), policy]
+    for _ in range(2000):
+        V = env.reward[successor] + GAMMA * V[successor]
+        V[env.treasure_pos] = 0
+    np.testing.assert_allclose(policy_evaluation(env, policy, GAMMA), V, atol=1e-8)
+
+
+def test_regret_is_zero_only_for_an_optimal_table():
+    env = random_env(1)
+    optimal = value_iteration(env, GAMMA, tol=1e-12)
+    assert regret(env, optimal.Q, optimal.V, GAMMA) == pytest.approx(0, abs=1e-8)
+    # All-zero Q picks UP everywhere, which stays put in the top row
+    assert regret(env, np.zeros_like(optimal.Q), optimal.V, GAMMA) > 1
@@ -0,0 +1,60 @@
+import numpy as np
+
+from maze_engine import TrainingConfig, make_layout, train
+from maze_env import NUM_ACTIONS, MazeEnv
+from maze_sparse import EMPTY, ImplicitMazeEnv, SparseQTable, find_slot
+
+
+def test_sparse_table_matches_dict_through_growth():
+    rng = np.random.default_rng(0)
+    table = SparseQTable(1 << 30, default=-1.5, capacity=16)
+    expected = {}
+    for state in rng.integers(0, 1 << 30, size=2000):
+        row = rng.normal(size=NUM_ACTIONS)
+        table[int(state)] = row
+        expected[int(state)] = row
+    table[7, 2] = 3.0
+    expected.setdefault(7, np.full(NUM_ACTIONS, -1.5))[2] = 3.0
+
+    assert len(table) == len(expected)
+    assert len(table) <= table.max_fill
+    for state, row in expected.items():
+        np.testing.assert_array_equal(table[state], row)
+    np.testing.assert_array_equal(table[8], np.full(NUM_ACTIONS, -1.5))
+    assert find_slot(table.keys, 8) == EMPTY
+
+    states, rows = table.states()
+    assert sorted(states.tolist()) == sorted(expected)
+
+
+def test_to_dense_fills_unseen_rows_with_default():
+    table = SparseQTable(10, default=2.0)
+    table[3] = [1, 2, 3, 4]
+    dense = table.to_dense()
+    assert dense.shape == (10, NUM_ACTIONS)
+    np.testing.assert_array_equal(dense[3], [1, 2, 3, 4])
+    np.testing.assert_array_equal(np.delete(dense, 3, axis=0), 2.0)
+
+
+def test_implicit_env_matches_compiled_tables():
+    layout = make_layout(TrainingConfig(grid_size=9, num_traps=12, seed=4))
+    dense = MazeEnv.from_layout(layout, 10)
+    implicit = ImplicitMazeEnv.from_layout(layout, 10)
+    for state in range(dense.num_states):
+        assert implicit.reward[state] == dense.reward[state]
+        assert implicit.is_trap[state] == dense.is_trap[state]
+        for action in range(NUM_ACTIONS):
+            assert implicit.next_state[state, action] == dense.next_state[state, action]
+
+
+def test_sparse_training_matches_dense_for_a_seed():
+    config = TrainingConfig(grid_size=12, num_traps=15, episodes=400, max_steps=48, seed=3)
+    layout = make_layout(config)
+    dense = train(config, layout=layout)
+    sparse = train(TrainingConfig(**{**vars(config), 'q_table': 'sparse'}), layout=layout)
+
+    np.testing.assert_array_equal(sparse.Q.to_dense(), dense.Q)
+    np.testing.assert_array_equal(sparse.episode_rewards, dense.episode_rewards)
+    np.testing.assert_array_equal(sparse.episode_steps, dense.episode_steps)
+    assert sparse.successful_episodes == dense.successful_episodes
+    assert sparse.trap_hits == dense.trap_hits
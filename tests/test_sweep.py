@@ -0,0 +1,89 @@
+import csv
+import os
+
+import numpy as np
+
+import maze_sweep
+from maze_sweep import RESULT_COLUMNS, completed_runs, expand_grid, run_shard, run_sweep
+
+GRID = {'grid_size': [5], 'num_traps': [2], 'episodes': [50], 'max_steps': [16]}
+
+
+def read_rows(out_dir):
+    with open(out_dir / 'results.csv', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def test_sweep_records_failures_and_resumes(tmp_path):
+    # 30 traps don't fit on a 5x5 grid, so train() raises in the worker
+    runs = expand_grid({**GRID, 'num_traps': [2, 30]}, seeds=[0, 1])
+    assert run_sweep(runs, tmp_path, workers=1, log=lambda message: None) == 4
+
+    rows = read_rows(tmp_path)
+    failed = [row for row in rows if row['error']]
+    assert len(rows) == 4 and len(failed) == 2
+    assert all('Number of traps' in row['error'] and row['success_rate'] == '' for row in failed)
+    assert all(row['alpha'] for row in failed)  # Parameters are still recorded
+
+    good = {run['run_id'] for run in runs if run['num_traps'] == 2}
+    assert completed_runs(tmp_path / 'results.csv') == good
+    for run_id in good:
+        assert np.load(tmp_path / 'q' / f'{run_id}.npy').shape == (25, 4)
+
+    # Only the failed runs are tried again, and their new rows replace the old ones
+    assert run_sweep(runs, tmp_path, workers=1, log=lambda message: None) == 2
+    rows = read_rows(tmp_path)
+    assert sorted(row['run_id'] for row in rows) == sorted(run['run_id'] for run in runs)
+    assert sum(1 for row in rows if row['error']) == 2
+
+
+def test_run_ids_are_stable_and_distinct():
+    runs = expand_grid({'alpha': [0.1, 0.2], 'gamma': [0.9]}, seeds=[0, 1])
+    again = expand_grid({'gamma': [0.9], 'alpha': [0.1, 0.2]}, seeds=[0, 1])
+    assert [run['run_id'] for run in runs] == [run['run_id'] for run in again]
+    assert len({run['run_id'] for run in runs}) == 4
+
+
+def test_resume_upgrades_a_results_file_without_the_error_column(tmp_path):
+    runs = expand_grid({**GRID, 'alpha': [0.1, 0.2]}, seeds=[0])
+    old_columns = [name for name in RESULT_COLUMNS if name != 'error']
+    with open(tmp_path / 'results.csv', 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=old_columns)
+        writer.writeheader()
+        writer.writerow({name: 1 for name in old_columns} | {'run_id': runs[0]['run_id']})
+
+    assert run_sweep(runs, tmp_path, workers=1, save_q=False, log=lambda message: None) == 1
+    rows = read_rows(tmp_path)
+    assert list(rows[0]) == RESULT_COLUMNS
+    assert [row['run_id'] for row in rows] == [run['run_id'] for run in runs]
+    assert rows[0]['error'] == '' and rows[0]['success_rate'] == '1'
+
+
+def test_runs_that_cannot_start_are_recorded(tmp_path):
+    # A zero-sized grid already fails in the parent, allocating its shared Q-table
+    runs = expand_grid({**GRID, 'grid_size': [0, 5]}, seeds=[0])
+    assert run_sweep(runs, tmp_path, workers=1, save_q=False, log=lambda message: None) == 2
+    rows = {row['grid_size']: row for row in read_rows(tmp_path)}
+    assert rows['0']['error'] and not rows['5']['error']
+
+
+def crash_on_high_alpha(params, shm_name):
+    if params['alpha'] > 0.5:
+        os._exit(1)
+    return run_shard(params, shm_name)
+
+
+def test_a_dying_worker_fails_its_runs_not_the_sweep(tmp_path, monkeypatch):
+    runs = expand_grid({**GRID, 'alpha': [0.9, 0.1, 0.2, 0.3, 0.4]}, seeds=[0])
+    monkeypatch.setattr(maze_sweep, 'run_shard', crash_on_high_alpha)
+    assert run_sweep(runs, tmp_path, workers=1, save_q=False, log=lambda message: None) == 5
+    rows = read_rows(tmp_path)
+    crashed = [row for row in rows if row['error']]
+    assert crashed and all('BrokenProcessPool' in row['error'] for row in crashed)
+    assert any(row['alpha'] == '0.9' for row in crashed)
+    assert len(crashed) < len(runs)  # Runs after the crash went to a fresh pool
+
+    monkeypatch.setattr(maze_sweep, 'run_shard', run_shard)
+    assert run_sweep(runs, tmp_path, workers=1, save_q=False, log=lambda message: None) == len(crashed)
+    assert completed_runs(tmp_path / 'results.csv') == {run['run_id'] for run in runs}
+    assert len(read_rows(tmp_path)) == len(runs)